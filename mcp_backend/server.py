@@ -2,52 +2,185 @@ from __future__ import annotations
 
 from typing import Any, Dict, List, Optional
 
+import logging
 import os
+import time
+from collections import Counter
 
+import anyio
 import httpx
 from mcp.server.fastmcp import FastMCP
+from starlette.requests import Request
+from starlette.responses import JSONResponse
 
 
 BACKEND_API_BASE_URL = os.getenv("BACKEND_API_BASE_URL", "http://backend:8000")
 MCP_BACKEND_PORT = int(os.getenv("MCP_BACKEND_PORT", "8000"))
 
+# Shared connection pool to the backend API
+BACKEND_MAX_CONNECTIONS = int(os.getenv("BACKEND_MAX_CONNECTIONS", "100"))
+BACKEND_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("BACKEND_MAX_KEEPALIVE_CONNECTIONS", "20"))
+BACKEND_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("BACKEND_KEEPALIVE_EXPIRY_SECONDS", "30"))
+BACKEND_CONNECT_TIMEOUT_SECONDS = float(os.getenv("BACKEND_CONNECT_TIMEOUT_SECONDS", "3"))
+BACKEND_POOL_TIMEOUT_SECONDS = float(os.getenv("BACKEND_POOL_TIMEOUT_SECONDS", "5"))
+BACKEND_TIMEOUT_SECONDS = float(os.getenv("BACKEND_TIMEOUT_SECONDS", "10"))
+# HTTP/2 needs the `h2` package (httpx[http2]) and a backend that speaks it.
+BACKEND_HTTP2 = os.getenv("BACKEND_HTTP2", "false").lower() in ("1", "true", "yes")
+# Per-tool overrides of BACKEND_TIMEOUT_SECONDS, e.g. "list_menu=5,confirm_order=20"
+BACKEND_TOOL_TIMEOUTS = os.getenv("BACKEND_TOOL_TIMEOUTS", "")
+
+
+logger = logging.getLogger("mcp_backend")
 
 mcp = FastMCP("backend-tools", host="0.0.0.0", port=MCP_BACKEND_PORT)
 
 
+def _parse_tool_timeouts(spec: str) -> Dict[str, float]:
+    timeouts: Dict[str, float] = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        name, _, seconds = part.partition("=")
+        try:
+            timeouts[name.strip()] = float(seconds)
+        except ValueError:
+            logger.warning("Ignoring invalid BACKEND_TOOL_TIMEOUTS entry '%s'", part)
+    return timeouts
+
+
+TOOL_TIMEOUTS = _parse_tool_timeouts(BACKEND_TOOL_TIMEOUTS)
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class BackendPool:
+    """One keep-alive `httpx.AsyncClient` shared by every tool call.
+
+    Created on first use (or at server start) and closed when the server
+    stops. Counts requests, new TCP connections (the rest reused a pooled
+    one), pool timeouts and errors per tool.
+    """
+
+    def __init__(self) -> None:
+        self._client: Optional[httpx.AsyncClient] = None
+        self.http2 = BACKEND_HTTP2 and _http2_available()
+        if BACKEND_HTTP2 and not self.http2:
+            logger.warning("BACKEND_HTTP2 is set but the 'h2' package is missing; using HTTP/1.1")
+        self.in_flight = 0
+        self.requests: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.seconds: Counter = Counter()
+        self.connections_opened = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=BACKEND_API_BASE_URL.rstrip("/"),
+                http2=self.http2,
+                limits=httpx.Limits(
+                    max_connections=BACKEND_MAX_CONNECTIONS,
+                    max_keepalive_connections=BACKEND_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=BACKEND_KEEPALIVE_EXPIRY_SECONDS,
+                ),
+                timeout=self.timeout_for(None),
+                headers={"accept": "application/json"},
+            )
+        return self._client
+
+    @staticmethod
+    def timeout_for(tool: Optional[str]) -> httpx.Timeout:
+        seconds = TOOL_TIMEOUTS.get(tool or "", BACKEND_TIMEOUT_SECONDS)
+        return httpx.Timeout(seconds, connect=BACKEND_CONNECT_TIMEOUT_SECONDS, pool=BACKEND_POOL_TIMEOUT_SECONDS)
+
+    async def _trace(self, event: str, info: Dict[str, Any]) -> None:
+        if event == "connection.connect_tcp.complete":
+            self.connections_opened += 1
+
+    async def request(self, tool: str, method: str, path: str, **kwargs: Any) -> httpx.Response:
+        self.in_flight += 1
+        self.requests[tool] += 1
+        started = time.perf_counter()
+        try:
+            return await self.client.request(
+                method,
+                path,
+                timeout=self.timeout_for(tool),
+                extensions={"trace": self._trace},
+                **kwargs,
+            )
+        except httpx.HTTPError as exc:
+            self.errors[f"{tool}:{type(exc).__name__}"] += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self.seconds[tool] += time.perf_counter() - started
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> Dict[str, Any]:
+        # httpcore keeps the pool on the transport; there is no public accessor.
+        pool = getattr(getattr(self._client, "_transport", None), "_pool", None)
+        connections = list(getattr(pool, "connections", []))
+        total = sum(self.requests.values())
+        return {
+            "http2": self.http2,
+            "max_connections": BACKEND_MAX_CONNECTIONS,
+            "max_keepalive_connections": BACKEND_MAX_KEEPALIVE_CONNECTIONS,
+            "open_connections": len(connections),
+            "idle_connections": sum(1 for conn in connections if conn.is_idle()),
+            "in_flight": self.in_flight,
+            "requests": total,
+            "connections_opened": self.connections_opened,
+            "reuse_ratio": round(1 - self.connections_opened / total, 4) if total else 0.0,
+            "errors": dict(self.errors),
+            "per_tool": {
+                tool: {"requests": count, "avg_ms": round(self.seconds[tool] / count * 1000, 1)}
+                for tool, count in sorted(self.requests.items())
+            },
+        }
+
+
+backend_pool = BackendPool()
+
+
 async def _backend_request(
+    tool: str,
     method: str,
     path: str,
     *,
     access_token: Optional[str] = None,
     params: Optional[Dict[str, Any]] = None,
     json: Optional[Dict[str, Any]] = None,
-    timeout_seconds: float = 10.0,
 ) -> Dict[str, Any]:
 
-    url = BACKEND_API_BASE_URL.rstrip("/") + path
-    timeout = httpx.Timeout(timeout_seconds)
-
-    headers: Dict[str, str] = {"accept": "application/json"}
+    headers: Dict[str, str] = {}
     if access_token:
         headers["Authorization"] = f"Bearer {access_token}"
 
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        try:
-            response = await client.request(
-                method,
-                url,
-                params=params,
-                json=json,
-                headers=headers,
-            )
-        except httpx.HTTPError as exc:  
-            return {
-                "ok": False,
-                "status_code": None,
-                "error": str(exc),
-                "data": None,
-            }
+    try:
+        response = await backend_pool.request(
+            tool,
+            method,
+            path,
+            params=params,
+            json=json,
+            headers=headers,
+        )
+    except httpx.HTTPError as exc:  
+        return {
+            "ok": False,
+            "status_code": None,
+            "error": str(exc) or type(exc).__name__,
+            "data": None,
+        }
 
     try:
         content_type = response.headers.get("content-type", "")
@@ -72,6 +205,11 @@ async def _backend_request(
     }
 
 
+@mcp.custom_route("/backend_pool/stats", methods=["GET"])
+async def backend_pool_stats(request: Request) -> JSONResponse:
+    return JSONResponse(backend_pool.stats())
+
+
 
 
 
@@ -79,7 +217,7 @@ async def _backend_request(
 async def backend_health() -> Dict[str, Any]:
     """Check health of the food-ordering backend service."""
 
-    return await _backend_request("GET", "/health")
+    return await _backend_request("backend_health", "GET", "/health")
 
 
 @mcp.tool()
@@ -89,7 +227,7 @@ async def list_categories() -> Dict[str, Any]:
     Wraps GET /api/categories.
     """
 
-    return await _backend_request("GET", "/api/categories")
+    return await _backend_request("list_categories", "GET", "/api/categories")
 
 
 @mcp.tool()
@@ -112,7 +250,7 @@ async def list_menu(
     if q:
         params["q"] = q
 
-    return await _backend_request("GET", "/api/menu", params=params)
+    return await _backend_request("list_menu", "GET", "/api/menu", params=params)
 
 
 @mcp.tool()
@@ -122,7 +260,7 @@ async def get_menu_item(item_id: int) -> Dict[str, Any]:
     Wraps GET /api/menu/{item_id}.
     """
 
-    return await _backend_request("GET", f"/api/menu/{item_id}")
+    return await _backend_request("get_menu_item", "GET", f"/api/menu/{item_id}")
 
 
 @mcp.tool()
@@ -136,7 +274,7 @@ async def list_faqs(q: Optional[str] = None) -> Dict[str, Any]:
     if q:
         params["q"] = q
 
-    return await _backend_request("GET", "/api/faqs", params=params)
+    return await _backend_request("list_faqs", "GET", "/api/faqs", params=params)
 
 
 
@@ -154,6 +292,7 @@ async def get_order_history(
 
     params = {"limit": limit}
     return await _backend_request(
+        "get_order_history",
         "GET",
         "/api/orders/history",
         access_token=access_token,
@@ -179,6 +318,7 @@ async def create_draft_order(
         payload["note"] = note
 
     return await _backend_request(
+        "create_draft_order",
         "POST",
         "/api/orders/draft",
         access_token=access_token,
@@ -197,40 +337,42 @@ async def get_order(
     """
 
     return await _backend_request(
+        "get_order",
         "GET",
         f"/api/orders/{order_id}",
         access_token=access_token,
     )
 
 
-    @mcp.tool()
-    async def add_item_to_order(
-        order_id: int,
-        item_id: int,
-        quantity: int = 1,
-        option_ids: Optional[List[int]] = None,
-        access_token: Optional[str] = None,
-    ) -> Dict[str, Any]:
-        """Add an item (and optional options) to a draft order.
+@mcp.tool()
+async def add_item_to_order(
+    order_id: int,
+    item_id: int,
+    quantity: int = 1,
+    option_ids: Optional[List[int]] = None,
+    access_token: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Add an item (and optional options) to a draft order.
 
-        Wraps POST /api/orders/{order_id}/items.
-        """
+    Wraps POST /api/orders/{order_id}/items.
+    """
 
-        if option_ids is None:
-            option_ids = []
+    if option_ids is None:
+        option_ids = []
 
-        payload = {
-            "item_id": item_id,
-            "quantity": quantity,
-            "option_ids": option_ids,
-        }
+    payload = {
+        "item_id": item_id,
+        "quantity": quantity,
+        "option_ids": option_ids,
+    }
 
-        return await _backend_request(
-            "POST",
-            f"/api/orders/{order_id}/items",
-            access_token=access_token,
-            json=payload,
-        )
+    return await _backend_request(
+        "add_item_to_order",
+        "POST",
+        f"/api/orders/{order_id}/items",
+        access_token=access_token,
+        json=payload,
+    )
 
 
 @mcp.tool()
@@ -253,6 +395,7 @@ async def update_order_item(
         payload["option_ids"] = option_ids
 
     return await _backend_request(
+        "update_order_item",
         "PATCH",
         f"/api/orders/{order_id}/items/{order_item_id}",
         access_token=access_token,
@@ -272,6 +415,7 @@ async def remove_order_item(
     """
 
     return await _backend_request(
+        "remove_order_item",
         "DELETE",
         f"/api/orders/{order_id}/items/{order_item_id}",
         access_token=access_token,
@@ -289,6 +433,7 @@ async def confirm_order(
     """
 
     return await _backend_request(
+        "confirm_order",
         "POST",
         f"/api/orders/{order_id}/confirm",
         access_token=access_token,
@@ -306,6 +451,7 @@ async def cancel_order(
     """
 
     return await _backend_request(
+        "cancel_order",
         "POST",
         f"/api/orders/{order_id}/cancel",
         access_token=access_token,
@@ -361,8 +507,15 @@ async def estimate_delivery_fee(
     }
 
 
+async def _serve() -> None:
+    try:
+        await mcp.run_streamable_http_async()
+    finally:
+        await backend_pool.aclose()
+
+
 def main() -> None:
-    mcp.run(transport="streamable-http")
+    anyio.run(_serve)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from utils.config import ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL_SECONDS
+from utils.logging_utils import get_logger
+
+from .business_context import on_data_version_change
+from .fast_extract import fold_text
+from .tool_dispatch import resolve_order_id
+
+logger = get_logger("multi_agent.answer_cache")
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+BYPASS_HEADER = "X-Answer-Cache"
+BYPASS_VALUES = ("bypass", "no-cache", "off")
+
+
+def normalize_question(text: str) -> str:
+    """"Phở bao nhiêu tiền?" and "pho bao nhieu tien" share one key."""
+    return " ".join(_PUNCTUATION.sub(" ", fold_text(text)).split())
+
+
+def is_stateless(values: Optional[Dict[str, Any]]) -> bool:
+    """True when the session has no cart, no order the turn could touch and no
+    customer details; the cache is shared by every user, and the synthesis
+    prompt includes the session's name, phone and address."""
+    if not values:
+        return True
+    user_info = values.get("user_info") or {}
+    return not values.get("cart") and not any(user_info.values()) and resolve_order_id(values) is None
+
+
+class AnswerCache:
+    """LRU of final answers for stateless fast-path turns.
+
+    Keys carry the menu/FAQ data version, and entries of older versions are
+    dropped as soon as a business context refresh sees the data change.
+    """
+
+    def __init__(self, max_entries: int = ANSWER_CACHE_MAX_ENTRIES, ttl_seconds: float = ANSWER_CACHE_TTL_SECONDS) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.stores = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(text: str, data_version: str) -> Tuple[str, str]:
+        return normalize_question(text), data_version
+
+    def get(self, text: str, data_version: str) -> Optional[str]:
+        key = self.key(text, data_version)
+        entry = self._entries.get(key)
+        if entry is None or (self.ttl_seconds > 0 and time.monotonic() - entry[0] > self.ttl_seconds):
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, text: str, data_version: str, answer: str) -> None:
+        if self.max_entries <= 0 or not answer:
+            return
+        key = self.key(text, data_version)
+        self._entries[key] = (time.monotonic(), answer)
+        self._entries.move_to_end(key)
+        self.stores += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def record_bypass(self) -> None:
+        self.bypassed += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def invalidate(self, data_version: str) -> None:
+        """Drop every answer computed from data other than `data_version`."""
+        stale = [key for key in self._entries if key[1] != data_version]
+        for key in stale:
+            del self._entries[key]
+        self.invalidations += len(stale)
+        if stale:
+            logger.info("Answer cache: dropped %d answers after a data change", len(stale))
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "bypassed": self.bypassed,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+answer_cache = AnswerCache()
+on_data_version_change(answer_cache.invalidate)
@@ -0,0 +1,656 @@
+"""Offline benchmark of the agent graph.
+
+Compiles the real `workflow` with a scripted chat model and an in-memory
+copy of the MCP backend tools, then drives many multi-turn conversations to
+measure what the graph itself costs (state handling, checkpointing,
+logging, prompt building) apart from model and backend latency. Needs no
+network, GPU or running services:
+
+    python -m multi_agent.benchmark --conversations 2000 --concurrency 1,16,64
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import itertools
+import json
+import logging
+import os
+import statistics
+import time
+import tracemalloc
+from collections import Counter, OrderedDict, deque
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import Runnable, RunnableLambda
+from langchain_core.tools import BaseTool, StructuredTool
+from pydantic import BaseModel
+
+from utils.config import MAX_ITERATIONS
+
+from .business_context import refresh_business_context
+from .checkpointers import checkpointer_stats, create_checkpointer
+from .graph import workflow
+from .llm_scheduler import llm_scheduler
+from .logger import trace_logger
+from .metrics import METRICS, add_turn_timing, start_turn_timings
+from .model_provider import set_model_registry
+from .state import OrchestratorDecision
+from .turn_budget import new_deadline
+
+BENCH_TOKEN = "bench-token"
+NODES = tuple(workflow.nodes)
+
+# Mirrors backend/app/seed.py.
+MENU = [
+    {"id": 1, "category_id": 1, "name": "Cơm Tấm", "price": 55000, "is_available": True,
+     "description": "Cơm tấm sườn nướng than hoa, bì, chả, mỡ hành"},
+    {"id": 2, "category_id": 1, "name": "Bún Bò", "price": 60000, "is_available": True,
+     "description": "Bún bò Huế đầy đủ nạm, gân, giò heo"},
+    {"id": 3, "category_id": 1, "name": "Phở", "price": 60000, "is_available": True,
+     "description": "Phở bò tái nạm nước dùng hầm xương 24h"},
+    {"id": 4, "category_id": 1, "name": "Mì Quảng", "price": 55000, "is_available": True,
+     "description": "Mì Quảng tôm thịt trứng, bánh đa giòn rụm"},
+]
+CATEGORIES = [{"id": 1, "name": "Món Chính"}, {"id": 2, "name": "Đồ uống"}]
+FAQS = [
+    {"id": 1, "question": "Giờ mở cửa của quán là khi nào?",
+     "answer": "Quán mở cửa từ 6h00 sáng đến 22h00 tối mỗi ngày."},
+    {"id": 2, "question": "Quán có giao hàng khu vực nào?",
+     "answer": "Hiện tại quán giao hàng trong bán kính 10km."},
+    {"id": 3, "question": "Chính sách hủy đơn như thế nào?",
+     "answer": "Bạn chỉ có thể hủy đơn khi trạng thái là 'Chờ xác nhận' (Pending)."},
+]
+
+
+async def _simulated_latency(part: str, seconds: float) -> None:
+    if seconds > 0:
+        started = time.perf_counter()
+        await asyncio.sleep(seconds)
+        add_turn_timing(part, time.perf_counter() - started)
+
+
+def _envelope(data: Any, status_code: int = 200, error: Optional[str] = None) -> str:
+    ok = error is None
+    payload = {"ok": ok, "status_code": status_code, "error": error, "parse_error": None, "data": data if ok else None}
+    # The MCP adapter hands tool results back as JSON text.
+    return json.dumps(payload, ensure_ascii=False)
+
+
+class FakeBackend:
+    """In-memory stand-in for the tools in mcp_backend/server.py.
+
+    Same names, arguments and `{"ok", "status_code", "error", "data"}`
+    envelopes; every call sleeps `latency_seconds` first.
+    """
+
+    # Only recent orders are kept so the fake itself does not show up as growth.
+    MAX_ORDERS = 1024
+
+    def __init__(self, latency_seconds: float = 0.0) -> None:
+        self.latency_seconds = latency_seconds
+        self.orders: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._order_ids = itertools.count(1)
+        self._order_item_ids = itertools.count(1)
+        self.calls: Counter = Counter()
+
+    async def _enter(self, name: str) -> None:
+        self.calls[name] += 1
+        await _simulated_latency("backend", self.latency_seconds)
+
+    def _order(self, order_id: int) -> Optional[Dict[str, Any]]:
+        return self.orders.get(int(order_id))
+
+    def _transition(self, order_id: int, allowed: Tuple[str, ...], status: str) -> str:
+        order = self._order(order_id)
+        if order is None:
+            return _envelope(None, 404, "Order not found")
+        if order["status"] not in allowed:
+            return _envelope(None, 400, f"Cannot change order in status {order['status']}")
+        order["status"] = status
+        return _envelope(order)
+
+    async def backend_health(self) -> str:
+        """Check health of the food-ordering backend service."""
+        await self._enter("backend_health")
+        return _envelope({"status": "ok"})
+
+    async def list_categories(self) -> str:
+        """List all menu categories from the backend."""
+        await self._enter("list_categories")
+        return _envelope(CATEGORIES)
+
+    async def list_menu(self, category_id: Optional[int] = None, q: Optional[str] = None) -> str:
+        """List available menu items, optionally filtered."""
+        await self._enter("list_menu")
+        items = [item for item in MENU if category_id is None or item["category_id"] == category_id]
+        if q:
+            items = [item for item in items if q.lower() in item["name"].lower()]
+        return _envelope(items)
+
+    async def get_menu_item(self, item_id: int) -> str:
+        """Get details of a single menu item by id."""
+        await self._enter("get_menu_item")
+        item = next((item for item in MENU if item["id"] == item_id), None)
+        return _envelope(item) if item else _envelope(None, 404, "Menu item not found")
+
+    async def list_faqs(self, q: Optional[str] = None) -> str:
+        """List FAQs, optionally filtered by a search keyword."""
+        await self._enter("list_faqs")
+        faqs = [faq for faq in FAQS if not q or q.lower() in faq["question"].lower()]
+        return _envelope(faqs)
+
+    async def get_order_history(self, limit: int = 10, access_token: Optional[str] = None) -> str:
+        """Get recent orders for the currently authenticated user."""
+        await self._enter("get_order_history")
+        return _envelope(list(reversed(self.orders.values()))[:limit])
+
+    async def create_draft_order(
+        self,
+        access_token: Optional[str] = None,
+        address: Optional[str] = None,
+        note: Optional[str] = None,
+    ) -> str:
+        """Create a new draft order for the authenticated user."""
+        await self._enter("create_draft_order")
+        order_id = next(self._order_ids)
+        order = {"id": order_id, "user_id": 1, "status": "DRAFT", "address": address, "note": note, "items": []}
+        self.orders[order_id] = order
+        while len(self.orders) > self.MAX_ORDERS:
+            self.orders.popitem(last=False)
+        return _envelope(order, 201)
+
+    async def get_order(self, order_id: int, access_token: Optional[str] = None) -> str:
+        """Get details of a specific order for the authenticated user."""
+        await self._enter("get_order")
+        order = self._order(order_id)
+        return _envelope(order) if order else _envelope(None, 404, "Order not found")
+
+    async def add_item_to_order(
+        self,
+        order_id: int,
+        item_id: int,
+        quantity: int = 1,
+        option_ids: Optional[List[int]] = None,
+        access_token: Optional[str] = None,
+    ) -> str:
+        """Add an item (and optional options) to a draft order."""
+        await self._enter("add_item_to_order")
+        order = self._order(order_id)
+        item = next((item for item in MENU if item["id"] == item_id), None)
+        if order is None or item is None:
+            return _envelope(None, 404, "Order or menu item not found")
+        order["items"].append({
+            "id": next(self._order_item_ids),
+            "item_id": item_id,
+            "quantity": quantity,
+            "unit_price": item["price"],
+            "total_price": item["price"] * quantity,
+            "options": [],
+        })
+        return _envelope(order)
+
+    async def update_order_item(
+        self,
+        order_id: int,
+        order_item_id: int,
+        quantity: Optional[int] = None,
+        option_ids: Optional[List[int]] = None,
+        access_token: Optional[str] = None,
+    ) -> str:
+        """Update quantity and/or options for an item in a draft order."""
+        await self._enter("update_order_item")
+        order = self._order(order_id)
+        line = next((line for line in (order or {}).get("items", []) if line["id"] == order_item_id), None)
+        if line is None:
+            return _envelope(None, 404, "Order item not found")
+        if quantity is not None:
+            line["quantity"] = quantity
+            line["total_price"] = line["unit_price"] * quantity
+        return _envelope(order)
+
+    async def remove_order_item(self, order_id: int, order_item_id: int, access_token: Optional[str] = None) -> str:
+        """Remove an item from a draft order."""
+        await self._enter("remove_order_item")
+        order = self._order(order_id)
+        if order is None:
+            return _envelope(None, 404, "Order not found")
+        order["items"] = [line for line in order["items"] if line["id"] != order_item_id]
+        return _envelope(order)
+
+    async def confirm_order(self, order_id: int, access_token: Optional[str] = None) -> str:
+        """Confirm a draft order for the authenticated user."""
+        await self._enter("confirm_order")
+        return self._transition(order_id, ("DRAFT",), "PENDING")
+
+    async def cancel_order(self, order_id: int, access_token: Optional[str] = None) -> str:
+        """Cancel an order for the authenticated user if allowed by status."""
+        await self._enter("cancel_order")
+        return self._transition(order_id, ("DRAFT", "PENDING"), "CANCELLED")
+
+    async def calculate_bill(self, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Calculate the total bill amount accurately."""
+        await self._enter("calculate_bill")
+        total = float(sum(float(item.get("price", 0)) * int(item.get("quantity", 1)) for item in items))
+        return {"total_amount": total, "formatted_total": f"{total:,.0f} VND", "breakdown": f"= {total:,.0f}"}
+
+    async def estimate_delivery_fee(self, order_id: int, access_token: Optional[str] = None) -> str:
+        """Estimate delivery fee for an order."""
+        await self._enter("estimate_delivery_fee")
+        return _envelope({"delivery_fee": 10000})
+
+    TOOL_NAMES = (
+        "backend_health", "list_categories", "list_menu", "get_menu_item", "list_faqs",
+        "get_order_history", "create_draft_order", "get_order", "add_item_to_order",
+        "update_order_item", "remove_order_item", "confirm_order", "cancel_order",
+        "calculate_bill", "estimate_delivery_fee",
+    )
+
+    def tools(self) -> List[BaseTool]:
+        return [
+            StructuredTool.from_function(coroutine=getattr(self, name), name=name)
+            for name in self.TOOL_NAMES
+        ]
+
+
+# Planner decisions left for the turn running in the current task.
+_script: ContextVar[Optional[Deque[OrchestratorDecision]]] = ContextVar("benchmark_script", default=None)
+
+FINISH = OrchestratorDecision(next_step="synthesis_agent", current_action="finish", updated_queue=[], plan="done")
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Chat model that answers every prompt with the same reply after a fixed delay."""
+
+    reply: str = "Dạ, mình đã xử lý xong yêu cầu của bạn ạ."
+    delay_seconds: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.reply))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        await _simulated_latency("model", self.delay_seconds)
+        return self._generate(messages, stop=stop)
+
+
+class ScriptedModelRegistry:
+    """Same interface as ModelRegistry, backed by scripted responses.
+
+    The planner's structured output comes from the script of the current
+    turn; other schemas (LLM fallbacks of the output mappers) get an empty
+    instance, and tool selection never returns tool calls.
+    """
+
+    llm_cache = None
+
+    def __init__(self, delay_seconds: float = 0.0) -> None:
+        self.delay_seconds = delay_seconds
+        self.chat_model = ScriptedChatModel(delay_seconds=delay_seconds)
+        self._structured: Dict[type, Runnable] = {}
+        self.calls: Counter = Counter()
+
+    def structured(self, schema: type) -> Runnable:
+        runnable = self._structured.get(schema)
+        if runnable is None:
+            async def _respond(messages: Any) -> BaseModel:
+                self.calls[schema.__name__] += 1
+                await _simulated_latency("model", self.delay_seconds)
+                if schema is OrchestratorDecision:
+                    script = _script.get()
+                    return script.popleft() if script else FINISH
+                return schema.model_construct()
+
+            runnable = self._structured[schema] = RunnableLambda(_respond)
+        return runnable
+
+    def with_tools(self, tools: Sequence[BaseTool], **kwargs: Any) -> Runnable:
+        async def _choose(messages: Any) -> AIMessage:
+            self.calls["tool_selection"] += 1
+            await _simulated_latency("model", self.delay_seconds)
+            return AIMessage(content="")
+
+        return RunnableLambda(_choose)
+
+    async def aclose(self) -> None:
+        return None
+
+
+@dataclass(frozen=True)
+class ScriptedTurn:
+    message: str
+    # Planner actions in order; "finish" is appended.
+    actions: Tuple[str, ...] = ()
+    clear_memory: bool = False
+    refusal_reason: Optional[str] = None
+
+    def decisions(self) -> Deque[OrchestratorDecision]:
+        plan = f"{self.message} -> {', '.join(self.actions) or 'finish'}"
+        steps: Deque[OrchestratorDecision] = deque(
+            OrchestratorDecision(
+                next_step="tool_agent",
+                current_action=action,
+                updated_queue=list(self.actions[index + 1:]) + ["finish"],
+                plan=plan,
+            )
+            for index, action in enumerate(self.actions)
+        )
+        steps.append(OrchestratorDecision(
+            next_step="synthesis_agent",
+            current_action="finish",
+            updated_queue=[],
+            plan=plan,
+            clear_memory=self.clear_memory,
+            refusal_reason=self.refusal_reason,
+        ))
+        return steps
+
+
+SCENARIOS: Dict[str, Tuple[ScriptedTurn, ...]] = {
+    "order": (
+        ScriptedTurn("Cho 2 Cơm Tấm và 1 Phở, giao đến 12 Lê Duẩn, sđt 0901234567",
+                     ("create_order", "add_item", "calculate_total")),
+        ScriptedTurn("Ok, xác nhận đơn giúp mình", ("confirm_order",), clear_memory=True),
+    ),
+    "cancel": (
+        ScriptedTurn("Đặt 1 Bún Bò giao đến 45 Nguyễn Huệ, sđt 0912345678",
+                     ("create_order", "add_item", "calculate_total")),
+        ScriptedTurn("Thôi hủy đơn vừa rồi nhé", ("cancel_order",), clear_memory=True),
+    ),
+    "price": (ScriptedTurn("Phở bao nhiêu tiền?", ("search_menu",)),),
+    "faq": (ScriptedTurn("Quán mở cửa mấy giờ?", ("ask_faq",)),),
+    "out_of_scope": (
+        ScriptedTurn("Bán cho mình cái điện thoại", refusal_reason="Ngoài phạm vi phục vụ."),
+    ),
+}
+DEFAULT_MIX = "order=4,cancel=1,price=2,faq=2,out_of_scope=1"
+
+
+def parse_mix(mix: str) -> List[str]:
+    """"order=4,faq=1" -> the scenario names, each repeated by its weight."""
+    names: List[str] = []
+    for part in filter(None, (p.strip() for p in mix.split(","))):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario '{name}' (known: {', '.join(SCENARIOS)})")
+        names += [name] * int(weight or 1)
+    if not names:
+        raise ValueError("Empty scenario mix")
+    return names
+
+
+def _percentile(values: Sequence[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _node_totals() -> Dict[str, Tuple[int, float]]:
+    return {
+        dict(labels).get("node", ""): (snap["count"], snap["sum"])
+        for labels, snap in METRICS.snapshot("node_duration_seconds").items()
+    }
+
+
+@dataclass
+class LevelResult:
+    concurrency: int
+    conversations: int
+    turns: int = 0
+    errors: Dict[str, int] = field(default_factory=dict)
+    wall_seconds: float = 0.0
+    latency_ms: Dict[str, float] = field(default_factory=dict)
+    loop_lag_ms: Dict[str, float] = field(default_factory=dict)
+    # part -> mean / p50 / p95 ms per turn
+    per_turn_ms: Dict[str, Dict[str, float]] = field(default_factory=dict)
+    # node -> calls per turn and mean ms per call
+    per_node: Dict[str, Dict[str, float]] = field(default_factory=dict)
+    memory: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def turns_per_second(self) -> float:
+        return self.turns / self.wall_seconds if self.wall_seconds else 0.0
+
+
+class GraphBenchmark:
+    def __init__(
+        self,
+        mix: Sequence[str],
+        llm_delay: float = 0.0,
+        tool_delay: float = 0.0,
+        checkpointer_backend: str = "memory",
+    ) -> None:
+        self.mix = list(mix)
+        self.backend = FakeBackend(tool_delay)
+        self.models = ScriptedModelRegistry(llm_delay)
+        self.tools = self.backend.tools()
+        self.tool_map = {tool.name: tool for tool in self.tools}
+        self.checkpointer_backend = checkpointer_backend
+
+    async def setup(self) -> None:
+        set_model_registry(self.models)
+        await refresh_business_context(self.tool_map)
+
+    def _config(self, thread_id: str) -> Dict[str, Any]:
+        # Same shape as the server's _build_turn.
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "mcp_tools": self.tools,
+                "mcp_tool_map": self.tool_map,
+                "backend_access_token": BENCH_TOKEN,
+                "deadline": new_deadline(),
+            },
+            "recursion_limit": 2 * MAX_ITERATIONS + 10,
+        }
+
+    async def run_level(self, concurrency: int, conversations: int, level: int = 0) -> LevelResult:
+        checkpointer = create_checkpointer(self.checkpointer_backend)
+        graph = workflow.compile(checkpointer=checkpointer)
+        result = LevelResult(concurrency=concurrency, conversations=conversations)
+        latencies: List[float] = []
+        turn_timings: List[Dict[str, float]] = []
+        errors: Counter = Counter()
+        remaining = iter(range(conversations))
+        rss_samples: List[Tuple[int, int]] = []
+        sample_every = max(1, conversations // 10)
+        done = 0
+
+        async def _conversation(index: int) -> None:
+            thread_id = f"bench-{level}-{index}"
+            for turn in SCENARIOS[self.mix[index % len(self.mix)]]:
+                _script.set(turn.decisions())
+                timings = start_turn_timings()
+                started = time.perf_counter()
+                try:
+                    await graph.ainvoke(
+                        {"user_input": turn.message, "messages": [HumanMessage(content=turn.message)]},
+                        config=self._config(thread_id),
+                    )
+                except Exception as exc:
+                    errors[type(exc).__name__] += 1
+                    continue
+                timings["total"] = time.perf_counter() - started
+                latencies.append(timings["total"])
+                turn_timings.append(timings)
+
+        async def _worker() -> None:
+            nonlocal done
+            for index in remaining:
+                await _conversation(index)
+                done += 1
+                if done % sample_every == 0:
+                    rss_samples.append((done, _rss_bytes()))
+
+        gc.collect()
+        rss_before = _rss_bytes()
+        traced_before = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+        nodes_before = _node_totals()
+
+        stop = asyncio.Event()
+        lags: List[float] = []
+        monitor = asyncio.create_task(_monitor_loop_lag(stop, lags))
+        started = time.perf_counter()
+        await asyncio.gather(*(_worker() for _ in range(concurrency)))
+        result.wall_seconds = time.perf_counter() - started
+        stop.set()
+        await monitor
+
+        result.turns = len(latencies)
+        result.errors = dict(errors)
+        result.latency_ms = {
+            name: round(_percentile(latencies, q) * 1000, 2)
+            for name, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))
+        }
+        result.loop_lag_ms = {
+            "mean": round(statistics.mean(lags) * 1000, 2) if lags else 0.0,
+            "p99": round(_percentile(lags, 0.99) * 1000, 2),
+        }
+
+        for timings in turn_timings:
+            timings["outside_nodes"] = timings["total"] - sum(timings.get(node, 0.0) for node in NODES)
+            # Parallel tool calls overlap, so their summed latency can exceed the batch wall time.
+            backend = min(timings.get("backend", 0.0), timings.get("tools", 0.0))
+            timings["overhead"] = timings["total"] - timings.get("model", 0.0) - backend
+        parts = list(NODES) + ["outside_nodes", "tools", "model", "backend", "overhead", "total"]
+        for part in parts:
+            samples = [timings.get(part, 0.0) * 1000 for timings in turn_timings]
+            if samples:
+                result.per_turn_ms[part] = {
+                    "mean": round(statistics.mean(samples), 3),
+                    "p50": round(_percentile(samples, 0.5), 3),
+                    "p95": round(_percentile(samples, 0.95), 3),
+                }
+
+        nodes_after = _node_totals()
+        for node in NODES:
+            count_before, sum_before = nodes_before.get(node, (0, 0.0))
+            count, total = nodes_after.get(node, (0, 0.0))
+            calls = count - count_before
+            result.per_node[node] = {
+                "calls_per_turn": round(calls / result.turns, 3) if result.turns else 0.0,
+                "mean_ms_per_call": round((total - sum_before) / calls * 1000, 3) if calls else 0.0,
+            }
+
+        gc.collect()
+        rss_after = _rss_bytes()
+        result.memory = {
+            "rss_before_mb": round(rss_before / 2**20, 1),
+            "rss_after_mb": round(rss_after / 2**20, 1),
+            "rss_growth_mb": round((rss_after - rss_before) / 2**20, 1),
+            "rss_curve_mb": [(n, round(rss / 2**20, 1)) for n, rss in rss_samples],
+            "checkpointer": checkpointer_stats(checkpointer),
+        }
+        if traced_before is not None:
+            traced_after, traced_peak = tracemalloc.get_traced_memory()
+            result.memory["traced_growth_mb"] = round((traced_after - traced_before) / 2**20, 2)
+            result.memory["traced_peak_mb"] = round(traced_peak / 2**20, 2)
+        return result
+
+
+async def _monitor_loop_lag(stop: asyncio.Event, lags: List[float], interval: float = 0.005) -> None:
+    """How late the event loop wakes a short sleep; blocking work shows up here."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, time.perf_counter() - started - interval))
+
+
+def format_level(result: LevelResult) -> str:
+    lines = [
+        f"== concurrency={result.concurrency} conversations={result.conversations} "
+        f"turns={result.turns} errors={sum(result.errors.values())} {result.errors or ''}".rstrip(),
+        f"   wall={result.wall_seconds:.2f}s throughput={result.turns_per_second:.1f} turns/s "
+        f"latency p50={result.latency_ms['p50']}ms p95={result.latency_ms['p95']}ms p99={result.latency_ms['p99']}ms "
+        f"loop-lag mean={result.loop_lag_ms['mean']}ms p99={result.loop_lag_ms['p99']}ms",
+        f"   {'part (ms per turn)':<22}{'mean':>10}{'p50':>10}{'p95':>10}   {'calls/turn':>10}{'ms/call':>10}",
+    ]
+    for part, row in result.per_turn_ms.items():
+        node = result.per_node.get(part)
+        extra = f"   {node['calls_per_turn']:>10.2f}{node['mean_ms_per_call']:>10.3f}" if node else ""
+        lines.append(f"   {part:<22}{row['mean']:>10.3f}{row['p50']:>10.3f}{row['p95']:>10.3f}{extra}")
+    memory = result.memory
+    lines.append(
+        f"   memory rss {memory['rss_before_mb']} -> {memory['rss_after_mb']} MiB "
+        f"(+{memory['rss_growth_mb']}) curve={memory['rss_curve_mb']}"
+    )
+    if "traced_growth_mb" in memory:
+        lines.append(f"   traced python heap +{memory['traced_growth_mb']} MiB, peak {memory['traced_peak_mb']} MiB")
+    lines.append(f"   checkpointer {memory['checkpointer']}")
+    return "\n".join(lines)
+
+
+async def run_benchmark(args: argparse.Namespace) -> List[LevelResult]:
+    bench = GraphBenchmark(
+        parse_mix(args.mix),
+        llm_delay=args.llm_delay_ms / 1000,
+        tool_delay=args.tool_delay_ms / 1000,
+        checkpointer_backend=args.checkpointer,
+    )
+    await bench.setup()
+    if args.llm_slots:
+        llm_scheduler.max_concurrency = args.llm_slots
+    if args.warmup:
+        await bench.run_level(1, args.warmup, level=-1)
+
+    results = []
+    for level, concurrency in enumerate(int(c) for c in args.concurrency.split(",")):
+        result = await bench.run_level(concurrency, args.conversations, level=level)
+        print(format_level(result), flush=True)
+        results.append(result)
+    return results
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Offline benchmark of the agent graph (no network, no GPU).")
+    parser.add_argument("--conversations", type=int, default=500, help="conversations per concurrency level")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated concurrent session counts")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"weighted scenario mix, e.g. '{DEFAULT_MIX}'")
+    parser.add_argument("--llm-delay-ms", type=float, default=0.0, help="scripted latency of every LLM call")
+    parser.add_argument("--tool-delay-ms", type=float, default=0.0, help="scripted latency of every tool call")
+    parser.add_argument("--llm-slots", type=int, default=0, help="override LLM_SCHEDULER_MAX_CONCURRENCY")
+    parser.add_argument("--checkpointer", default="memory", help="memory | memory_unbounded | redis")
+    parser.add_argument("--warmup", type=int, default=20, help="conversations run before measuring")
+    parser.add_argument("--tracemalloc", action="store_true", help="also trace Python heap growth (slower)")
+    parser.add_argument("--log-level", default="WARNING",
+                        help="root and agent trace log level; INFO includes log formatting in the cost")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args(argv)
+
+    level = getattr(logging, args.log_level.upper(), logging.WARNING)
+    logging.getLogger().setLevel(level)
+    trace_logger.setLevel(level)
+    if args.tracemalloc:
+        tracemalloc.start()
+
+    results = asyncio.run(run_benchmark(args))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as out:
+            json.dump([{**asdict(r), "turns_per_second": r.turns_per_second} for r in results], out, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.logging_utils import get_logger
+
+from .output_mappers import MapperError, parse_tool_envelope
+from .tools_utils import invoke_tool
+
+logger = get_logger("multi_agent.business_context")
+
+
+@dataclass(frozen=True)
+class BusinessContext:
+    """Stable restaurant data appended to every agent's system prompt.
+
+    It only changes when the menu changes, so together with the static system
+    prompt it forms a prefix the inference server can keep in its KV cache.
+    """
+
+    text: str
+    version: str
+    # (id, name, price) of every available menu item
+    menu: Tuple[Tuple[int, str, float], ...] = ()
+    # FAQ content hash; not part of the prompt, only of cached answers
+    faq_version: str = "none"
+
+    @property
+    def data_version(self) -> str:
+        """Changes whenever the menu or the FAQ data changes."""
+        return f"{self.version}:{self.faq_version}"
+
+
+EMPTY_CONTEXT = BusinessContext(text="", version="none")
+
+_current: BusinessContext = EMPTY_CONTEXT
+# Called with the new data_version whenever the menu or FAQ data changes.
+_data_version_listeners: List[Callable[[str], None]] = []
+
+
+def get_business_context() -> BusinessContext:
+    return _current
+
+
+def on_data_version_change(listener: Callable[[str], None]) -> None:
+    """Register `listener` to run with the new data_version when the data changes."""
+    _data_version_listeners.append(listener)
+
+
+def set_business_context(context: BusinessContext) -> bool:
+    """Install `context`; returns True when the version changed."""
+    global _current
+    changed = context.version != _current.version
+    data_changed = context.data_version != _current.data_version
+    _current = context
+    if data_changed:
+        for listener in _data_version_listeners:
+            listener(context.data_version)
+    return changed
+
+
+def available_menu(menu: Any) -> Tuple[Tuple[int, str, float], ...]:
+    return tuple(
+        (int(item["id"]), item["name"], float(item["price"]))
+        for item in sorted(menu, key=lambda item: item["id"])
+        if item.get("is_available", True)
+    )
+
+
+def render_menu(menu: Tuple[Tuple[int, str, float], ...]) -> str:
+    lines = ["THỰC ĐƠN HIỆN TẠI (id | tên | giá):"]
+    for item_id, name, price in menu:
+        lines.append(f"- {item_id} | {name} | {price:,.0f}")
+    return "\n".join(lines)
+
+
+async def _faq_version(tool_map: Dict[str, Any]) -> str:
+    tool = tool_map.get("list_faqs")
+    if tool is None:
+        return "none"
+    try:
+        faqs = parse_tool_envelope(await invoke_tool(tool=tool, args={}))
+    except (MapperError, KeyError, TypeError, ValueError) as exc:
+        logger.warning("Could not load FAQs for business context: %s", exc)
+        return "none"
+    payload = json.dumps(faqs, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+
+async def load_business_context(tool_map: Dict[str, Any]) -> Optional[BusinessContext]:
+    tool = tool_map.get("list_menu")
+    if tool is None:
+        return None
+    try:
+        menu = available_menu(parse_tool_envelope(await invoke_tool(tool=tool, args={})))
+        text = render_menu(menu)
+    except (MapperError, KeyError, TypeError, ValueError) as exc:
+        logger.warning("Could not load menu for business context: %s", exc)
+        return None
+    version = hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+    return BusinessContext(text=text, version=version, menu=menu, faq_version=await _faq_version(tool_map))
+
+
+async def refresh_business_context(tool_map: Dict[str, Any]) -> bool:
+    context = await load_business_context(tool_map)
+    if context is None:
+        return False
+    previous = get_business_context()
+    changed = set_business_context(context)
+    if changed:
+        logger.info("Business context updated to version %s", context.version)
+    if context.faq_version != previous.faq_version:
+        logger.info("FAQ data updated to version %s", context.faq_version)
+    return changed
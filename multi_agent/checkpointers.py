@@ -0,0 +1,597 @@
+from __future__ import annotations
+
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+)
+from langgraph.checkpoint.memory import MemorySaver
+
+from utils.config import (
+    CHECKPOINTER_BACKEND,
+    REDIS_CHECKPOINT_COMPRESS_MIN_BYTES,
+    REDIS_CHECKPOINT_KEEP,
+    REDIS_CHECKPOINT_TTL_SECONDS,
+    REDIS_PREFIX,
+    REDIS_URL,
+    SESSION_MAX_BYTES,
+    SESSION_MAX_CHECKPOINTS,
+    SESSION_TTL_SECONDS,
+)
+from utils.logging_utils import get_logger
+
+logger = get_logger("multi_agent.checkpointers")
+
+_COMPRESSED = b"z"
+_PLAIN = b"p"
+
+
+class _PackedSerdeMixin:
+    """Encode checkpoint records as one serde blob, zlib-compressed when large."""
+
+    serde: Any
+    compress_min_bytes: int
+
+    def _pack(self, obj: Any) -> bytes:
+        type_, data = self.serde.dumps_typed(obj)
+        blob = type_.encode() + b"\0" + data
+        if len(blob) >= self.compress_min_bytes:
+            return _COMPRESSED + zlib.compress(blob, 1)
+        return _PLAIN + blob
+
+    def _unpack(self, packed: bytes) -> Any:
+        marker, blob = packed[:1], packed[1:]
+        if marker == _COMPRESSED:
+            blob = zlib.decompress(blob)
+        type_, _, data = blob.partition(b"\0")
+        return self.serde.loads_typed((type_.decode(), data))
+
+    @staticmethod
+    def _config(thread_id: str, checkpoint_ns: str, checkpoint_id: Optional[str]) -> Optional[RunnableConfig]:
+        if not checkpoint_id:
+            return None
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint_id,
+            }
+        }
+
+    def _to_tuple(
+        self,
+        thread_id: str,
+        checkpoint_ns: str,
+        checkpoint_id: str,
+        packed: bytes,
+        packed_writes: Dict[Any, bytes],
+    ) -> CheckpointTuple:
+        record = self._unpack(packed)
+        pending_writes = []
+        for _, value in sorted(packed_writes.items()):
+            task_id, channel, write, _task_path = self._unpack(value)
+            pending_writes.append((task_id, channel, write))
+
+        return CheckpointTuple(
+            config=self._config(thread_id, checkpoint_ns, checkpoint_id),
+            checkpoint=record["checkpoint"],
+            metadata=record["metadata"],
+            parent_config=self._config(thread_id, checkpoint_ns, record["parent_checkpoint_id"]),
+            pending_writes=pending_writes,
+        )
+
+    def _pack_writes(
+        self,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str,
+    ) -> List[Tuple[str, bytes, bool]]:
+        """Return (field, packed, overwrite) per write.
+
+        Regular writes are idempotent per (task, idx); special channels overwrite.
+        """
+        packed_writes = []
+        for idx, (channel, value) in enumerate(writes):
+            write_idx = WRITES_IDX_MAP.get(channel, idx)
+            field = f"{task_id}:{write_idx:010d}" if write_idx >= 0 else f"{task_id}:{write_idx}"
+            packed_writes.append((field, self._pack((task_id, channel, value, task_path)), write_idx < 0))
+        return packed_writes
+
+
+class RedisCheckpointSaver(_PackedSerdeMixin, BaseCheckpointSaver):
+    """Async LangGraph checkpointer backed by Redis.
+
+    Layout per (thread_id, checkpoint_ns):
+      `{prefix}ckpt:{thread}:{ns}`        hash checkpoint_id -> packed record
+      `{prefix}writes:{thread}:{ns}:{id}`  hash "task_id:idx" -> packed write
+      `{prefix}ns:{thread}`               set of namespaces, for delete_thread
+
+    Every key of a thread gets its TTL refreshed on write, and only the newest
+    `keep` checkpoints are retained. Any `redis.asyncio`-compatible client
+    works (e.g. `fakeredis.aioredis.FakeRedis()` in tests); it must be created
+    with `decode_responses=False`.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        *,
+        prefix: str = REDIS_PREFIX,
+        ttl_seconds: int = REDIS_CHECKPOINT_TTL_SECONDS,
+        keep: int = REDIS_CHECKPOINT_KEEP,
+        compress_min_bytes: int = REDIS_CHECKPOINT_COMPRESS_MIN_BYTES,
+        serde: Any = None,
+    ) -> None:
+        super().__init__(serde=serde)
+        self.client = client
+        self.prefix = prefix
+        self.ttl_seconds = ttl_seconds
+        self.keep = max(1, keep)
+        self.compress_min_bytes = compress_min_bytes
+
+    @classmethod
+    def from_url(cls, url: str = REDIS_URL, **kwargs: Any) -> "RedisCheckpointSaver":
+        from redis.asyncio import Redis
+
+        return cls(Redis.from_url(url, decode_responses=False), **kwargs)
+
+    async def aclose(self) -> None:
+        close = getattr(self.client, "aclose", None) or getattr(self.client, "close", None)
+        if close is not None:
+            await close()
+
+    # ---- keys & encoding ----
+
+    def _checkpoints_key(self, thread_id: str, checkpoint_ns: str) -> str:
+        return f"{self.prefix}ckpt:{thread_id}:{checkpoint_ns}"
+
+    def _writes_key(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> str:
+        return f"{self.prefix}writes:{thread_id}:{checkpoint_ns}:{checkpoint_id}"
+
+    def _namespaces_key(self, thread_id: str) -> str:
+        return f"{self.prefix}ns:{thread_id}"
+
+    # ---- reads ----
+
+    async def _load_tuple(
+        self,
+        thread_id: str,
+        checkpoint_ns: str,
+        checkpoint_id: str,
+        packed: bytes,
+    ) -> CheckpointTuple:
+        raw_writes = await self.client.hgetall(self._writes_key(thread_id, checkpoint_ns, checkpoint_id))
+        return self._to_tuple(thread_id, checkpoint_ns, checkpoint_id, packed, raw_writes)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        key = self._checkpoints_key(thread_id, checkpoint_ns)
+
+        checkpoint_id = get_checkpoint_id(config)
+        if checkpoint_id:
+            packed = await self.client.hget(key, checkpoint_id)
+        else:
+            records = await self.client.hgetall(key)
+            if not records:
+                return None
+            # Checkpoint ids are time-ordered (uuid6), so the max is the latest.
+            raw_id = max(records)
+            checkpoint_id, packed = raw_id.decode(), records[raw_id]
+
+        if packed is None:
+            return None
+        return await self._load_tuple(thread_id, checkpoint_ns, checkpoint_id, packed)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        if config is not None:
+            thread_id = config["configurable"]["thread_id"]
+            namespaces = [config["configurable"].get("checkpoint_ns")]
+            if namespaces[0] is None:
+                raw = await self.client.smembers(self._namespaces_key(thread_id))
+                namespaces = [ns.decode() for ns in raw] or [""]
+            targets = [(thread_id, ns) for ns in namespaces]
+        else:
+            head = f"{self.prefix}ckpt:"
+            targets = []
+            async for raw_key in self.client.scan_iter(match=f"{head}*"):
+                thread_id, _, ns = raw_key.decode()[len(head):].partition(":")
+                targets.append((thread_id, ns))
+
+        config_checkpoint_id = get_checkpoint_id(config) if config else None
+        before_id = get_checkpoint_id(before) if before else None
+
+        for thread_id, checkpoint_ns in targets:
+            records = await self.client.hgetall(self._checkpoints_key(thread_id, checkpoint_ns))
+            for raw_id in sorted(records, reverse=True):
+                checkpoint_id = raw_id.decode()
+                if config_checkpoint_id and checkpoint_id != config_checkpoint_id:
+                    continue
+                if before_id and checkpoint_id >= before_id:
+                    continue
+                result = await self._load_tuple(thread_id, checkpoint_ns, checkpoint_id, records[raw_id])
+                if filter and not all(result.metadata.get(k) == v for k, v in filter.items()):
+                    continue
+                if limit is not None:
+                    if limit <= 0:
+                        return
+                    limit -= 1
+                yield result
+
+    # ---- writes ----
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        key = self._checkpoints_key(thread_id, checkpoint_ns)
+        record = {
+            "checkpoint": checkpoint,
+            "metadata": metadata,
+            "parent_checkpoint_id": config["configurable"].get("checkpoint_id"),
+        }
+
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hset(key, checkpoint["id"], self._pack(record))
+        pipe.expire(key, self.ttl_seconds)
+        pipe.sadd(self._namespaces_key(thread_id), checkpoint_ns)
+        pipe.expire(self._namespaces_key(thread_id), self.ttl_seconds)
+        pipe.hlen(key)
+        *_, count = await pipe.execute()
+
+        if count > self.keep:
+            await self._prune(thread_id, checkpoint_ns)
+
+        return self._config(thread_id, checkpoint_ns, checkpoint["id"])
+
+    async def _prune(self, thread_id: str, checkpoint_ns: str) -> None:
+        key = self._checkpoints_key(thread_id, checkpoint_ns)
+        ids = sorted(raw.decode() for raw in await self.client.hkeys(key))
+        stale = ids[: -self.keep]
+        if not stale:
+            return
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hdel(key, *stale)
+        for checkpoint_id in stale:
+            pipe.delete(self._writes_key(thread_id, checkpoint_ns, checkpoint_id))
+        await pipe.execute()
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        key = self._writes_key(thread_id, checkpoint_ns, checkpoint_id)
+
+        pipe = self.client.pipeline(transaction=False)
+        for field, packed, overwrite in self._pack_writes(writes, task_id, task_path):
+            if overwrite:
+                pipe.hset(key, field, packed)
+            else:
+                pipe.hsetnx(key, field, packed)
+        pipe.expire(key, self.ttl_seconds)
+        await pipe.execute()
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        namespaces = await self.client.smembers(self._namespaces_key(thread_id))
+        keys: List[Any] = [self._namespaces_key(thread_id)]
+        for raw_ns in namespaces:
+            keys.append(self._checkpoints_key(thread_id, raw_ns.decode()))
+        async for raw_key in self.client.scan_iter(match=f"{self.prefix}writes:{thread_id}:*"):
+            keys.append(raw_key)
+        await self.client.delete(*keys)
+
+
+@dataclass
+class _Session:
+    last_access: float
+    # checkpoint_ns -> checkpoint_id -> packed record, oldest first
+    checkpoints: Dict[str, "OrderedDict[str, bytes]"] = field(default_factory=dict)
+    # (checkpoint_ns, checkpoint_id) -> field -> packed write
+    writes: Dict[Tuple[str, str], Dict[str, bytes]] = field(default_factory=dict)
+    nbytes: int = 0
+
+
+class BoundedMemorySaver(_PackedSerdeMixin, BaseCheckpointSaver):
+    """In-process checkpointer that cannot grow without bound.
+
+    Keeps the newest `max_checkpoints` per thread/namespace, drops sessions idle
+    for longer than `ttl_seconds`, and evicts least-recently-used sessions while
+    the packed size of all sessions exceeds `max_bytes`. Records are stored
+    serialized, so `stats()` reports real bytes rather than an estimate of
+    Python object sizes.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_checkpoints: int = SESSION_MAX_CHECKPOINTS,
+        ttl_seconds: float = SESSION_TTL_SECONDS,
+        max_bytes: int = SESSION_MAX_BYTES,
+        compress_min_bytes: int = REDIS_CHECKPOINT_COMPRESS_MIN_BYTES,
+        serde: Any = None,
+    ) -> None:
+        super().__init__(serde=serde)
+        self.max_checkpoints = max(1, max_checkpoints)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.compress_min_bytes = compress_min_bytes
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._total_bytes = 0
+        self._evicted = {"ttl": 0, "lru": 0}
+        self._lock = threading.Lock()
+
+    # ---- bookkeeping ----
+
+    def _touch(self, thread_id: str, create: bool = False) -> Optional[_Session]:
+        session = self._sessions.get(thread_id)
+        if session is None:
+            if not create:
+                return None
+            session = _Session(last_access=time.monotonic())
+            self._sessions[thread_id] = session
+        session.last_access = time.monotonic()
+        self._sessions.move_to_end(thread_id)
+        return session
+
+    def _drop(self, thread_id: str) -> None:
+        session = self._sessions.pop(thread_id, None)
+        if session is not None:
+            self._total_bytes -= session.nbytes
+
+    def _resize(self, session: _Session, delta: int) -> None:
+        session.nbytes += delta
+        self._total_bytes += delta
+
+    def _evict(self, keep_thread: Optional[str] = None) -> None:
+        deadline = time.monotonic() - self.ttl_seconds
+        # Sessions are ordered by last access, so expired ones sit at the front.
+        while self._sessions:
+            thread_id, session = next(iter(self._sessions.items()))
+            if session.last_access >= deadline or thread_id == keep_thread:
+                break
+            self._drop(thread_id)
+            self._evicted["ttl"] += 1
+
+        while self._total_bytes > self.max_bytes and len(self._sessions) > 1:
+            thread_id = next(iter(self._sessions))
+            if thread_id == keep_thread:
+                break
+            self._drop(thread_id)
+            self._evicted["lru"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "sessions": len(self._sessions),
+                "checkpoints": sum(
+                    len(checkpoints)
+                    for session in self._sessions.values()
+                    for checkpoints in session.checkpoints.values()
+                ),
+                "approx_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "evicted_ttl": self._evicted["ttl"],
+                "evicted_lru": self._evicted["lru"],
+            }
+
+    # ---- sync API ----
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+
+        with self._lock:
+            self._evict()
+            session = self._touch(thread_id)
+            if session is None:
+                return None
+            checkpoints = session.checkpoints.get(checkpoint_ns)
+            if not checkpoints:
+                return None
+            if not checkpoint_id:
+                checkpoint_id = next(reversed(checkpoints))
+            packed = checkpoints.get(checkpoint_id)
+            if packed is None:
+                return None
+            packed_writes = dict(session.writes.get((checkpoint_ns, checkpoint_id), {}))
+
+        return self._to_tuple(thread_id, checkpoint_ns, checkpoint_id, packed, packed_writes)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        config_checkpoint_id = get_checkpoint_id(config) if config else None
+        before_id = get_checkpoint_id(before) if before else None
+
+        with self._lock:
+            if config is not None:
+                thread_ids = [config["configurable"]["thread_id"]]
+            else:
+                thread_ids = list(self._sessions)
+            snapshot = []
+            for thread_id in thread_ids:
+                session = self._sessions.get(thread_id)
+                if session is None:
+                    continue
+                wanted_ns = config["configurable"].get("checkpoint_ns") if config else None
+                for checkpoint_ns, checkpoints in session.checkpoints.items():
+                    if wanted_ns is not None and checkpoint_ns != wanted_ns:
+                        continue
+                    for checkpoint_id in reversed(checkpoints):
+                        packed_writes = dict(session.writes.get((checkpoint_ns, checkpoint_id), {}))
+                        snapshot.append((thread_id, checkpoint_ns, checkpoint_id, checkpoints[checkpoint_id], packed_writes))
+
+        for thread_id, checkpoint_ns, checkpoint_id, packed, packed_writes in snapshot:
+            if config_checkpoint_id and checkpoint_id != config_checkpoint_id:
+                continue
+            if before_id and checkpoint_id >= before_id:
+                continue
+            result = self._to_tuple(thread_id, checkpoint_ns, checkpoint_id, packed, packed_writes)
+            if filter and not all(result.metadata.get(k) == v for k, v in filter.items()):
+                continue
+            if limit is not None:
+                if limit <= 0:
+                    return
+                limit -= 1
+            yield result
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        packed = self._pack({
+            "checkpoint": checkpoint,
+            "metadata": metadata,
+            "parent_checkpoint_id": config["configurable"].get("checkpoint_id"),
+        })
+
+        with self._lock:
+            session = self._touch(thread_id, create=True)
+            checkpoints = session.checkpoints.setdefault(checkpoint_ns, OrderedDict())
+            previous = checkpoints.pop(checkpoint["id"], None)
+            if previous is not None:
+                self._resize(session, -len(previous))
+            checkpoints[checkpoint["id"]] = packed
+            self._resize(session, len(packed))
+
+            while len(checkpoints) > self.max_checkpoints:
+                stale_id, stale = checkpoints.popitem(last=False)
+                self._resize(session, -len(stale))
+                stale_writes = session.writes.pop((checkpoint_ns, stale_id), {})
+                self._resize(session, -sum(len(value) for value in stale_writes.values()))
+
+            self._evict(keep_thread=thread_id)
+
+        return self._config(thread_id, checkpoint_ns, checkpoint["id"])
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        packed_writes = self._pack_writes(writes, task_id, task_path)
+
+        with self._lock:
+            session = self._touch(thread_id, create=True)
+            stored = session.writes.setdefault((checkpoint_ns, checkpoint_id), {})
+            for key, packed, overwrite in packed_writes:
+                if key in stored:
+                    if not overwrite:
+                        continue
+                    self._resize(session, -len(stored[key]))
+                stored[key] = packed
+                self._resize(session, len(packed))
+
+            self._evict(keep_thread=thread_id)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self._drop(thread_id)
+
+    # ---- async API: everything is in memory, so delegate to the sync methods ----
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self.get_tuple(config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        for item in self.list(config, filter=filter, before=before, limit=limit):
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return self.put(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        self.put_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        self.delete_thread(thread_id)
+
+
+def create_checkpointer(backend: str = CHECKPOINTER_BACKEND) -> BaseCheckpointSaver:
+    if backend == "redis":
+        logger.info("Using Redis checkpointer at %s", REDIS_URL)
+        return RedisCheckpointSaver.from_url(REDIS_URL)
+    if backend == "memory_unbounded":
+        return MemorySaver()
+    if backend != "memory":
+        logger.warning("Unknown CHECKPOINTER_BACKEND '%s'; using memory", backend)
+    return BoundedMemorySaver()
+
+
+def checkpointer_stats(checkpointer: BaseCheckpointSaver) -> Dict[str, Any]:
+    stats = getattr(checkpointer, "stats", None)
+    if stats is not None:
+        return stats()
+    return {"backend": type(checkpointer).__name__}
+
+
+async def close_checkpointer(checkpointer: BaseCheckpointSaver) -> None:
+    close = getattr(checkpointer, "aclose", None)
+    if close is not None:
+        await close()
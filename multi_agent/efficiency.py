@@ -0,0 +1,295 @@
+"""Efficiency regression suite for the agent graph.
+
+Runs fixed conversations (order, cancel, price, FAQ, out-of-scope) through
+the real graph and prompts and counts, per scenario, LLM calls by agent,
+executed tool calls, orchestrator iterations and prompt/completion tokens.
+The model is the in-process LLM stand-in (deterministic, no network); with
+`--live` it is the configured endpoint, which combined with
+`LLM_CACHE_MODE=replay` replays recorded responses. Tools are the in-memory
+backend of the offline benchmark.
+
+    python -m multi_agent.efficiency --baseline multi_agent/data/efficiency_baseline.json   # exit 1 on regression
+    python -m multi_agent.efficiency --out multi_agent/data/efficiency_baseline.json        # accept a new baseline
+    python -m multi_agent.efficiency --compare before.json after.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import threading
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+import httpx
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import BaseMessage, HumanMessage
+from langchain_core.outputs import LLMResult
+
+from utils.config import MAX_ITERATIONS
+
+from .benchmark import BENCH_TOKEN, SCENARIOS, FakeBackend
+from .business_context import refresh_business_context
+from .checkpointers import create_checkpointer
+from .graph import workflow
+from .llm_standin import StandinSettings, create_app
+from .logger import trace_logger
+from .model_provider import ModelRegistry, close_model_registry, set_model_registry
+from .prompt_cache import PromptCacheStats
+from .turn_budget import new_deadline
+
+# Counted per scenario; any increase beyond --max-count-increase is a regression.
+COUNT_METRICS = ("llm_calls", "tool_calls", "iterations")
+# Compared relative to the baseline with --max-token-increase.
+TOKEN_METRICS = ("prompt_tokens", "completion_tokens")
+
+
+class LLMUsageCounter(BaseCallbackHandler):
+    """Chat model calls and token usage per agent, reset between scenarios."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._inflight: Dict[UUID, str] = {}
+        self.calls: Counter = Counter()
+        self.prompt_tokens: Counter = Counter()
+        self.completion_tokens: Counter = Counter()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.calls.clear()
+            self.prompt_tokens.clear()
+            self.completion_tokens.clear()
+
+    def on_chat_model_start(
+        self,
+        serialized: Dict[str, Any],
+        messages: List[List[BaseMessage]],
+        *,
+        run_id: UUID,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        if PromptCacheStats._is_warmup(metadata):
+            return
+        agent = PromptCacheStats._agent(metadata)
+        with self._lock:
+            self._inflight[run_id] = agent
+            self.calls[agent] += 1
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        usage = None
+        if response.generations and response.generations[0]:
+            message = getattr(response.generations[0][0], "message", None)
+            usage = getattr(message, "usage_metadata", None)
+        with self._lock:
+            if run_id not in self._inflight:
+                return  # a warmup call
+            agent = self._inflight.pop(run_id)
+            if usage:
+                self.prompt_tokens[agent] += usage.get("input_tokens", 0)
+                self.completion_tokens[agent] += usage.get("output_tokens", 0)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            self._inflight.pop(run_id, None)
+
+
+@dataclass
+class ScenarioResult:
+    scenario: str
+    turns: int = 0
+    llm_calls: int = 0
+    tool_calls: int = 0
+    iterations: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    llm_calls_by_agent: Dict[str, int] = field(default_factory=dict)
+    prompt_tokens_by_agent: Dict[str, int] = field(default_factory=dict)
+    tools_by_name: Dict[str, int] = field(default_factory=dict)
+    errors: List[str] = field(default_factory=list)
+
+
+class EfficiencySuite:
+    def __init__(self, live: bool = False) -> None:
+        self.live = live
+        self.usage = LLMUsageCounter()
+        self.backend = FakeBackend()
+        self.tools = self.backend.tools()
+        self.tool_map = {tool.name: tool for tool in self.tools}
+        self.models: Optional[ModelRegistry] = None
+
+    async def setup(self) -> None:
+        http_client = None
+        if not self.live:
+            # No latency: only the counts matter here.
+            standin = create_app(StandinSettings(ttft_ms=0, prefill_tokens_per_second=0, tokens_per_second=0, rules_path=""))
+            http_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=standin), timeout=30)
+        self.models = ModelRegistry(http_async_client=http_client, callbacks=[self.usage])
+        set_model_registry(self.models)
+        await refresh_business_context(self.tool_map)
+
+    async def close(self) -> None:
+        await close_model_registry()
+
+    def _config(self, thread_id: str) -> Dict[str, Any]:
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "mcp_tools": self.tools,
+                "mcp_tool_map": self.tool_map,
+                "backend_access_token": BENCH_TOKEN,
+                "deadline": new_deadline(),
+            },
+            "recursion_limit": 2 * MAX_ITERATIONS + 10,
+        }
+
+    async def run_scenario(self, name: str) -> ScenarioResult:
+        graph = workflow.compile(checkpointer=create_checkpointer("memory"))
+        result = ScenarioResult(scenario=name)
+        self.usage.reset()
+        tools_before = Counter(self.backend.calls)
+
+        for turn in SCENARIOS[name]:
+            try:
+                state = await graph.ainvoke(
+                    {"user_input": turn.message, "messages": [HumanMessage(content=turn.message)]},
+                    config=self._config(f"efficiency-{name}"),
+                )
+            except Exception as exc:
+                result.errors.append(f"{type(exc).__name__}: {exc}")
+                continue
+            result.turns += 1
+            result.iterations += state.get("iterations") or 0
+
+        tools = Counter(self.backend.calls)
+        tools.subtract(tools_before)
+        result.tools_by_name = {tool: count for tool, count in sorted(tools.items()) if count}
+        result.tool_calls = sum(result.tools_by_name.values())
+        result.llm_calls_by_agent = dict(sorted(self.usage.calls.items()))
+        result.llm_calls = sum(self.usage.calls.values())
+        result.prompt_tokens_by_agent = dict(sorted(self.usage.prompt_tokens.items()))
+        result.prompt_tokens = sum(self.usage.prompt_tokens.values())
+        result.completion_tokens = sum(self.usage.completion_tokens.values())
+        return result
+
+
+async def run_suite(scenarios: Sequence[str], live: bool = False) -> Dict[str, ScenarioResult]:
+    suite = EfficiencySuite(live=live)
+    await suite.setup()
+    try:
+        # Sequential on purpose: the usage counter is shared.
+        return {name: await suite.run_scenario(name) for name in scenarios}
+    finally:
+        await suite.close()
+
+
+def compare(
+    baseline: Dict[str, Dict[str, Any]],
+    current: Dict[str, Dict[str, Any]],
+    max_count_increase: int = 0,
+    max_token_increase: float = 0.05,
+) -> Tuple[List[Tuple[str, str, Any, Any, str, bool]], bool]:
+    """Rows of (scenario, metric, baseline, current, delta, regressed) and whether any row regressed."""
+    rows = []
+    failed = False
+    for scenario in sorted(set(baseline) | set(current)):
+        before, after = baseline.get(scenario), current.get(scenario)
+        if before is None or after is None:
+            rows.append((scenario, "(scenario)", "-" if before is None else "present",
+                         "-" if after is None else "present", "", False))
+            continue
+        if after.get("errors"):
+            rows.append((scenario, "errors", len(before.get("errors", [])), len(after["errors"]), "", True))
+            failed = True
+        for metric in COUNT_METRICS + TOKEN_METRICS:
+            old, new = before.get(metric, 0), after.get(metric, 0)
+            diff = new - old
+            if metric in COUNT_METRICS:
+                regressed = diff > max_count_increase
+                delta = f"{diff:+d}" if diff else ""
+            else:
+                ratio = diff / old if old else (1.0 if new else 0.0)
+                regressed = ratio > max_token_increase
+                delta = f"{diff:+d} ({ratio:+.1%})" if diff else ""
+            failed |= regressed
+            rows.append((scenario, metric, old, new, delta, regressed))
+    return rows, failed
+
+
+def format_table(rows: Sequence[Tuple[str, str, Any, Any, str, bool]]) -> str:
+    lines = [f"{'scenario':<14}{'metric':<20}{'baseline':>10}{'current':>10}  {'delta':<18}"]
+    for scenario, metric, old, new, delta, regressed in rows:
+        flag = "REGRESSED" if regressed else ""
+        lines.append(f"{scenario:<14}{metric:<20}{old!s:>10}{new!s:>10}  {delta:<18}{flag}".rstrip())
+    return "\n".join(lines)
+
+
+def format_results(results: Dict[str, ScenarioResult]) -> str:
+    lines = [f"{'scenario':<14}{'turns':>6}{'llm':>6}{'tools':>7}{'iters':>7}{'prompt':>9}{'compl':>8}  llm calls by agent"]
+    for result in results.values():
+        agents = ", ".join(f"{agent}={count}" for agent, count in result.llm_calls_by_agent.items())
+        errors = f"  errors={result.errors}" if result.errors else ""
+        lines.append(
+            f"{result.scenario:<14}{result.turns:>6}{result.llm_calls:>6}{result.tool_calls:>7}{result.iterations:>7}"
+            f"{result.prompt_tokens:>9}{result.completion_tokens:>8}  {agents}{errors}"
+        )
+    return "\n".join(lines)
+
+
+def _load(path: str) -> Dict[str, Dict[str, Any]]:
+    with open(path, encoding="utf-8") as handle:
+        return json.load(handle)["scenarios"]
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Count LLM calls, tool calls and tokens per agent scenario.")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated scenario names")
+    parser.add_argument("--live", action="store_true",
+                        help="use the configured model endpoint (set LLM_CACHE_MODE=replay for recorded responses)")
+    parser.add_argument("--out", help="write this run to a JSON file (use it as the next baseline)")
+    parser.add_argument("--baseline", help="compare against this run file and exit 1 on regression")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two run files and exit")
+    parser.add_argument("--max-count-increase", type=int, default=0,
+                        help="allowed increase of LLM calls, tool calls or iterations per scenario")
+    parser.add_argument("--max-token-increase", type=float, default=0.05,
+                        help="allowed relative increase of prompt or completion tokens per scenario")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        rows, failed = compare(_load(args.compare[0]), _load(args.compare[1]),
+                               args.max_count_increase, args.max_token_increase)
+        print(format_table(rows))
+        sys.exit(1 if failed else 0)
+
+    names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s) {unknown} (known: {', '.join(SCENARIOS)})")
+
+    logging.getLogger().setLevel(logging.WARNING)
+    trace_logger.setLevel(logging.WARNING)
+    results = asyncio.run(run_suite(names, live=args.live))
+    print(format_results(results))
+
+    current = {name: asdict(result) for name, result in results.items()}
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as out:
+            json.dump({"model": "live" if args.live else "standin", "scenarios": current},
+                      out, indent=2, ensure_ascii=False)
+    if args.baseline:
+        rows, failed = compare(_load(args.baseline), current, args.max_count_increase, args.max_token_increase)
+        print()
+        print(format_table(rows))
+        if failed:
+            sys.exit(1)
+    elif any(result.errors for result in results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence, Tuple
+
+from .state import CartItem, UserInfo
+
+MenuEntry = Tuple[int, str, float]
+
+_PHONE = re.compile(r"(?<!\d)(?:\+?84[\s.\-]?|0)[35789](?:[\s.\-]?\d){8}(?!\d)")
+
+_ADDRESS_LABEL = re.compile(
+    r"(?:địa chỉ|đ/c|dia chi)\s*(?:là|:)?\s*(?P<address>[^;\n]+)",
+    re.IGNORECASE,
+)
+_ADDRESS_CUE = re.compile(
+    r"(?:giao|ship|gửi|mang)?\s*(?:đến|tới|về|qua)\s+(?P<address>\d+[\w/]*\s+[^;\n]+)",
+    re.IGNORECASE,
+)
+_ADDRESS_STOP = re.compile(r"\s*(?:,?\s*(?:sđt|sdt|số điện thoại|phone|tên)\b|(?:\+?84[\s.\-]?|0)[35789]\d).*$", re.IGNORECASE)
+# Trailing question particles: "giao về 12 Lê Lợi được không" -> "12 Lê Lợi".
+_ADDRESS_TAIL = re.compile(
+    r"(?:[\s,]*(?:được không|được ko|được hông|được chứ|đc không|đc ko|không|ko|hông|nhé|nhe|nha|nhá|nhen"
+    r"|ạ|à|hả|nhỉ|chứ|vậy|với|giúp (?:mình|em|tôi)|luôn)\b)+[\s?.!]*$|[\s?.!]+$",
+    re.IGNORECASE,
+)
+# A house number must be followed by a street, not by "5 giờ chiều" or "2 phần".
+_HOUSE_NUMBER = re.compile(r"^\d+[\w/]*\s+(?P<next>[^\W\d_]+)")
+_NOT_STREET = {
+    "giờ", "h", "g", "phút", "tiếng", "ngày", "tháng", "năm", "tuần", "người", "lần", "tuổi",
+    "phần", "suất", "tô", "đĩa", "bát", "ly", "cốc", "chén", "hộp", "gói", "cái", "món",
+    "k", "nghìn", "ngàn", "triệu", "đồng", "vnd", "km", "m",
+}
+
+_NAME = re.compile(
+    r"(?:tên (?:tôi|mình|em|anh|chị) là|(?:tôi|mình|em) tên(?: là)?|tên\s*:)\s*"
+    r"(?P<name>[^\W\d_]+(?:\s+[^\W\d_]+){0,3})",
+    re.IGNORECASE,
+)
+
+_WORD_NUMBERS = {
+    "mot": 1, "hai": 2, "ba": 3, "bon": 4, "tu": 4, "nam": 5,
+    "sau": 6, "bay": 7, "tam": 8, "chin": 9, "muoi": 10,
+}
+_UNITS = r"(?:phan|suat|to|dia|bat|ly|coc|chen|hop|goi|cai)"
+_ORDER_VERBS = re.compile(r"\b(?:cho|dat|lay|them|order|mua|goi)\b")
+# Matched before folding: "bỏ" (remove) and "bò" (beef) fold to the same word.
+_NOT_AN_ORDER = re.compile(
+    r"\b(?:bỏ|xóa|xoá|bớt|hủy|huỷ|thôi|đừng|không (?:lấy|đặt|gọi|cần|muốn|ăn)"
+    r"|(?:tới|đến|ở) đâu|trạng thái|tình trạng|giao chưa|xong chưa|bao giờ|khi nào|lúc nào)\b",
+    re.IGNORECASE,
+)
+
+
+def fold_text(text: str) -> str:
+    """Lowercase and strip Vietnamese diacritics ("Cơm Tấm" -> "com tam")."""
+    text = text.replace("đ", "d").replace("Đ", "D")
+    decomposed = unicodedata.normalize("NFD", text)
+    stripped = "".join(ch for ch in decomposed if unicodedata.category(ch) != "Mn")
+    return " ".join(stripped.lower().split())
+
+
+@dataclass
+class FastExtraction:
+    user_info: UserInfo = field(default_factory=UserInfo)
+    cart: List[CartItem] = field(default_factory=list)
+
+    @property
+    def empty(self) -> bool:
+        return not self.filled_fields()
+
+    def filled_fields(self) -> List[str]:
+        """Names of the fields the pre-pass found: name/phone/address and cart."""
+        info = self.user_info
+        fields = [name for name in ("name", "phone", "address") if getattr(info, name)]
+        return fields + (["cart"] if self.cart else [])
+
+
+def extract_phone(text: str) -> Optional[str]:
+    match = _PHONE.search(text)
+    if not match:
+        return None
+    digits = re.sub(r"\D", "", match.group(0))
+    return "0" + digits[2:] if digits.startswith("84") else digits
+
+
+def _is_street_address(address: str) -> bool:
+    match = _HOUSE_NUMBER.match(address)
+    return bool(match) and match.group("next").lower() not in _NOT_STREET
+
+
+def extract_address(text: str) -> Optional[str]:
+    """Only "<house number> <street> ..." counts; anything vaguer is left to the planner."""
+    text = unicodedata.normalize("NFC", text)
+    for pattern in (_ADDRESS_LABEL, _ADDRESS_CUE):
+        match = pattern.search(text)
+        if match:
+            address = _ADDRESS_STOP.sub("", match.group("address"))
+            address = _ADDRESS_TAIL.sub("", address).strip(" ,.")
+            if len(address) >= 5 and _is_street_address(address):
+                return address
+    return None
+
+
+def extract_name(text: str) -> Optional[str]:
+    match = _NAME.search(text)
+    return match.group("name").strip().title() if match else None
+
+
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+
+# Capitalized Vietnamese word; a class of every upper-case letter keeps the rest case-sensitive.
+_UPPER = "".join(ch for ch in map(chr, range(0x41, 0x1EFA)) if ch.isalpha() and ch.isupper())
+_CAP = rf"[{_UPPER}][^\W\d_]*"
+_CAP_RUN = rf"{_CAP}(?:\s+{_CAP}){{0,3}}"
+_ADMIN_PART = (
+    rf"\b(?i:phường|quận|huyện|xã|thị xã|thành phố|tỉnh|tp\.?|p\.|q\.)\s*"
+    rf"(?:\d{{1,2}}\b|{_CAP_RUN}|(?i:hcm|hn)\b)"
+)
+_ADMIN_RUN = rf"{_ADMIN_PART}(?:[\s,]*{_ADMIN_PART})*"
+# "<house number> <street> [ward/district...]" with or without a cue in front.
+_STREET_ADDRESS = re.compile(
+    rf"(?<![\w/.])\d{{1,5}}[A-Za-z]?(?:/\d{{1,5}}[A-Za-z]?)*\s+"
+    rf"(?P<street>(?i:đường|phố|hẻm|ngõ|ngách|kiệt)\s+[^\W\d_]+(?:\s+(?!{_ADMIN_PART})[^\W\d_]+){{0,3}}"
+    rf"|{_CAP}(?:\s+{_CAP}){{1,4}}"
+    rf"|[^\W\d_]+(?:\s+[^\W\d_]+){{0,4}}?(?=[\s,]*{_ADMIN_PART}))"
+    rf"(?:[\s,]*{_ADMIN_PART})*"
+)
+_ADMIN_AREA = re.compile(_ADMIN_RUN)
+_SELF_NAME = re.compile(rf"\b(?i:mình|tôi|em|tớ|tui)\s+(?i:là|tên là)\s+(?P<name>{_CAP_RUN})")
+_HONORIFIC_NAME = re.compile(rf"\b(?i:anh|chị|em|cô|chú|bác|ông|bà|bạn)\s+(?P<name>{_CAP_RUN})")
+
+# Stand-ins keep the shapes the extractors recognize, so a redacted message
+# still takes the same path through the agent.
+REDACTED_PHONE = "0900000000"
+REDACTED_ADDRESS = "1 Đường Mẫu"
+REDACTED_NAME = "Khách"
+REDACTED_EMAIL = "khach@example.com"
+
+
+def _names_a_dish(words: str, dishes: Sequence[str]) -> bool:
+    folded = fold_text(words)
+    return any(folded == dish or folded.startswith(dish + " ") for dish in dishes)
+
+
+def redact_personal_info(text: str, menu: Sequence[MenuEntry] = ()) -> str:
+    """Replace e-mails, phone numbers, addresses and names with fixed stand-ins.
+
+    Addresses are any "<number> <street>" or ward/district sequence, cue or
+    not; names follow "tên tôi là", "mình là" or an honorific ("anh Tuấn").
+    Dish names from `menu` are left alone ("2 Cơm Tấm", "em Phở").
+    """
+    dishes = [fold_text(name) for _, name, _ in menu]
+    text = unicodedata.normalize("NFC", text)
+    text = _EMAIL.sub(REDACTED_EMAIL, text)
+    text = _PHONE.sub(REDACTED_PHONE, text)
+    address = extract_address(text)
+    if address:
+        text = text.replace(address, REDACTED_ADDRESS)
+    text = _STREET_ADDRESS.sub(
+        lambda m: m.group(0) if _names_a_dish(m.group("street"), dishes) else REDACTED_ADDRESS, text
+    )
+    text = _ADMIN_AREA.sub(REDACTED_ADDRESS, text)
+
+    def _name(match: re.Match) -> str:
+        if _names_a_dish(match.group("name"), dishes):
+            return match.group(0)
+        return match.group(0)[: match.start("name") - match.start()] + REDACTED_NAME
+
+    for pattern in (_NAME, _SELF_NAME, _HONORIFIC_NAME):
+        text = pattern.sub(_name, text)
+    return text
+
+
+def _menu_pattern(menu: Sequence[MenuEntry]) -> Optional[re.Pattern]:
+    names = sorted({fold_text(name) for _, name, _ in menu}, key=len, reverse=True)
+    if not names:
+        return None
+    quantity = r"(?:(?P<qty>\d{1,2})|(?P<word>" + "|".join(_WORD_NUMBERS) + r"))\s*" + _UNITS + r"?\s*"
+    dish = r"(?P<dish>" + "|".join(re.escape(name) for name in names) + r")"
+    suffix = r"(?:\s*x\s*(?P<times>\d{1,2}))?"
+    return re.compile(r"(?:\b" + quantity + r")?\b" + dish + r"\b" + suffix)
+
+
+_pattern_cache: Tuple[Tuple[MenuEntry, ...], Optional[re.Pattern]] = ((), None)
+
+
+def _cached_menu_pattern(menu: Sequence[MenuEntry]) -> Optional[re.Pattern]:
+    global _pattern_cache
+    menu = tuple(menu)
+    if _pattern_cache[0] != menu:
+        _pattern_cache = (menu, _menu_pattern(menu))
+    return _pattern_cache[1]
+
+
+def extract_cart(text: str, menu: Sequence[MenuEntry]) -> List[CartItem]:
+    """Match "2 phần Cơm Tấm", "hai tô phở", "bún bò x3" against the live menu.
+
+    A dish without a quantity only counts when the message reads as an order
+    ("cho", "đặt", "lấy"...), so price questions do not fill the cart.
+    Removals, negations and order-status questions ("bỏ 2 cơm tấm", "thôi
+    không lấy phở", "đơn 3 phở tới đâu rồi") are left to the planner.
+    """
+    pattern = _cached_menu_pattern(menu)
+    if pattern is None or _NOT_AN_ORDER.search(unicodedata.normalize("NFC", text)):
+        return []
+    folded = fold_text(text)
+    by_name = {fold_text(name): (item_id, name) for item_id, name, _ in menu}
+    is_order = bool(_ORDER_VERBS.search(folded))
+
+    items: List[CartItem] = []
+    for match in pattern.finditer(folded):
+        if match.group("qty"):
+            quantity = int(match.group("qty"))
+        elif match.group("word"):
+            quantity = _WORD_NUMBERS[match.group("word")]
+        elif match.group("times"):
+            quantity = int(match.group("times"))
+        elif is_order:
+            quantity = 1
+        else:
+            continue
+        item_id, name = by_name[match.group("dish")]
+        items.append(CartItem(item_name=name, quantity=quantity, item_id=item_id))
+    return items
+
+
+def mentioned_dishes(text: str, menu: Sequence[MenuEntry]) -> List[str]:
+    """Menu names mentioned in `text`, with or without a quantity, in order of appearance."""
+    pattern = _cached_menu_pattern(menu)
+    if pattern is None:
+        return []
+    by_name = {fold_text(name): name for _, name, _ in menu}
+    names: List[str] = []
+    for match in pattern.finditer(fold_text(text)):
+        name = by_name[match.group("dish")]
+        if name not in names:
+            names.append(name)
+    return names
+
+
+def fast_extract(text: str, menu: Sequence[MenuEntry] = ()) -> FastExtraction:
+    """Deterministic pre-pass over the user message before the planner runs."""
+    return FastExtraction(
+        user_info=UserInfo(
+            name=extract_name(text),
+            phone=extract_phone(text),
+            address=extract_address(text),
+        ),
+        cart=extract_cart(text, menu),
+    )
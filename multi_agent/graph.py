@@ -3,10 +3,24 @@ from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
 from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, END
 
-from .model_provider import create_chat_model
-from .prompts import AGENT_PROMPTS
-from .tools_utils import invoke_tool
+from .model_provider import get_model_registry
+from .prompts import AGENT_PROMPTS, PLANNER_PREFILLED_NOTE, build_agent_messages
+from .tools_utils import invoke_tool_calls
+from .output_mappers import structure_tool_outputs
+from .tool_dispatch import plan_tool_calls, record_dispatch
 from .logger import AgentLogger
+from .history import compact_history
+from .prompt_context import build_cart_context, build_task_context
+from .fast_extract import fast_extract, mentioned_dishes
+from .business_context import get_business_context
+from .metrics import timed_node
+from .llm_scheduler import SchedulerOverloaded, llm_priority, turn_priority
+from .intent_classifier import FAQ, OUT_OF_SCOPE, PRICE_INQUIRY, get_intent_classifier
+from .turn_budget import (
+    DEGRADED_ANSWER, TurnBudgetExceeded, budget_state, degraded_warning,
+    exhausted_reason, tool_call_allowance, turn_deadline, within_deadline,
+)
+from utils.config import INTENT_CONFIDENCE_THRESHOLD, TURN_SYNTHESIS_GRACE_SECONDS
 import re
 
 from .state import (
@@ -75,11 +89,74 @@ def update_user_info(current_info: dict, new_info: UserInfo) -> dict:
     }
 
 
-async def orchestrator_node(state: AgentState):
+# intent -> (next_action, next_step) for turns that can skip the planner
+FAST_PATH_ROUTES = {
+    PRICE_INQUIRY: ("search_menu", "tool_agent"),
+    FAQ: ("ask_faq", "tool_agent"),
+    OUT_OF_SCOPE: ("finish", "synthesis_agent"),
+}
+
+
+async def intent_router_node(state: AgentState):
+    no_fast_path = {"intent_fast_path": False, "next_step": "orchestrator", **budget_state()}
+
+    classifier = get_intent_classifier()
+    user_input = state.get("user_input", "")
+    menu = get_business_context().menu
+    # Only stateless turns qualify: nothing in the cart or queue, nothing to extract.
+    if classifier is None or state.get("cart") or state.get("task_queue"):
+        return no_fast_path
+    if not fast_extract(user_input, menu).empty:
+        return no_fast_path
+
+    intent, confidence = classifier.predict(user_input)
+    route = FAST_PATH_ROUTES.get(intent)
+    if route is None or confidence < INTENT_CONFIDENCE_THRESHOLD:
+        return no_fast_path
+    # "pizza bao nhiêu" is a price question about a dish we do not sell: the planner
+    # has to steer the customer, a menu listing would not answer it.
+    if intent == PRICE_INQUIRY and not mentioned_dishes(user_input, menu):
+        return no_fast_path
+
+    next_action, next_step = route
+    AgentLogger.log_tool_result("Intent Fast Path", {"intent": intent, "confidence": round(confidence, 3)})
+    update = {
+        **budget_state(),
+        "intent_fast_path": True,
+        "next_step": next_step,
+        "next_action": next_action,
+        "task_queue": [],
+        "planner_plan": f"{intent}: {user_input}",
+        "warning": "",
+    }
+    if intent == OUT_OF_SCOPE:
+        dishes = ", ".join(name for _, name, _ in menu) or "các món trong thực đơn"
+        update["refusal_reason"] = f"Yêu cầu nằm ngoài phạm vi phục vụ. Nhà hàng chỉ phục vụ: {dishes}."
+    return update
+
+
+def _degraded_route(state: AgentState, reason: str, **extra):
+    """Stop planning and let synthesis answer with whatever is done."""
+    AgentLogger.log_tool_result("Turn Budget", {"exhausted": reason})
+    return {
+        "next_step": "synthesis_agent",
+        "next_action": "finish",
+        "task_queue": [],
+        "warning": degraded_warning(reason),
+        "budget_exhausted": reason,
+        **extra,
+    }
+
+
+async def orchestrator_node(state: AgentState, config: RunnableConfig):
 
     AgentLogger.log_agent_start("Orchestrator", state)
 
-    llm = create_chat_model()
+    reason = exhausted_reason(state, config)
+    if reason:
+        return _degraded_route(state, reason)
+
+    models = get_model_registry()
     prompt_config = AGENT_PROMPTS["planner"]
     
     
@@ -91,24 +168,43 @@ async def orchestrator_node(state: AgentState):
 
     current_cart = state.get("cart", []) or []
 
+    # Regex pre-pass: phone/address/dishes land in state even if the LLM call fails.
+    # The planner is told which fields are filled and only re-extracts them to correct one.
+    prefilled = fast_extract(state.get("user_input", ""), get_business_context().menu)
+    if not prefilled.empty:
+        current_user_info = update_user_info(current_user_info, prefilled.user_info)
+        current_cart = update_cart(current_cart, prefilled.cart)
+
     user_msg_content = prompt_config.user_template.format(
         user_input=state.get("user_input", ""),
         task_queue=str(current_queue),
-        task_outputs=json.dumps(task_outputs, ensure_ascii=False),
+        task_outputs=build_task_context(task_outputs, "planner"),
         planner_plan="",
         warning=state.get("warning", ""),
         current_user_info=str(current_user_info),
-        current_cart=json.dumps(current_cart, ensure_ascii=False),
+        current_cart=build_cart_context(current_cart),
     )
+    if not prefilled.empty:
+        user_msg_content += PLANNER_PREFILLED_NOTE.format(fields=", ".join(prefilled.filled_fields()))
+
+    messages = build_agent_messages("planner", user_msg_content)
     
-    messages = [
-        ("system", prompt_config.system),
-        ("human", user_msg_content)
-    ]
-    
+    iterations = (state.get("iterations") or 0) + 1
+
+    async def _plan() -> OrchestratorDecision:
+        structured_llm = models.structured(OrchestratorDecision)
+        with llm_priority(turn_priority(state)):
+            return await structured_llm.ainvoke(messages)
+
     try:
-        structured_llm = llm.with_structured_output(OrchestratorDecision)
-        decision: OrchestratorDecision = await structured_llm.ainvoke(messages)
+        decision: OrchestratorDecision = await within_deadline(_plan(), turn_deadline(config))
+    except SchedulerOverloaded:
+        raise
+    except TurnBudgetExceeded:
+        return _degraded_route(
+            state, "deadline",
+            iterations=iterations, user_info=current_user_info, cart=current_cart,
+        )
     except Exception as e:
         #logger.error(f"Orchestrator Error: {e}")
         return {
@@ -117,7 +213,9 @@ async def orchestrator_node(state: AgentState):
             "task_queue": [],
             "warning": f"System Error: {str(e)}",
             "user_info": current_user_info,
-            "task_outputs": task_outputs
+            "task_outputs": task_outputs,
+            "cart": current_cart,
+            "iterations": iterations
         }
 
     AgentLogger.log_planner_decision(decision)
@@ -150,7 +248,8 @@ async def orchestrator_node(state: AgentState):
         "task_outputs": task_outputs,
         "should_clear_memory": getattr(decision, "clear_memory", False),
         "refusal_reason": getattr(decision, "refusal_reason", None),
-        "cart": updated_cart 
+        "cart": updated_cart,
+        "iterations": iterations
     }
 
 
@@ -158,7 +257,7 @@ async def orchestrator_node(state: AgentState):
 async def tool_agent_node(state: AgentState, config: RunnableConfig):
     AgentLogger.log_agent_start("Tool Agent", state)
 
-    llm = create_chat_model()
+    models = get_model_registry()
     prompt_config = AGENT_PROMPTS["tool_agent"]
     
     
@@ -166,7 +265,7 @@ async def tool_agent_node(state: AgentState, config: RunnableConfig):
     mcp_tool_map = config["configurable"].get("mcp_tool_map", {})
     backend_token = config["configurable"].get("backend_access_token")
 
-    llm_with_tools = llm.bind_tools(mcp_tools)
+    llm_with_tools = models.with_tools(mcp_tools)
     
     schema_map = {
         "search_menu": SearchMenuOutput,
@@ -184,6 +283,18 @@ async def tool_agent_node(state: AgentState, config: RunnableConfig):
     current_action = state.get("next_action", "unknown")
     current_user_info = state.get("user_info", {})
     target_schema = schema_map.get(current_action, GenericOutput)
+    deadline = turn_deadline(config)
+
+    reason = exhausted_reason(state, config, check_iterations=False)
+    if reason:
+        # The orchestrator (or synthesis, on the fast path) turns this into a degraded answer.
+        return {
+            "task_outputs": {
+                **state.get("task_outputs", {}),
+                current_action: {"error": f"Skipped: turn budget exhausted ({reason})", "status": "skipped"}
+            },
+            "budget_exhausted": reason,
+        }
 
     user_msg_content = prompt_config.user_template.format(
         next_action=current_action,
@@ -191,68 +302,86 @@ async def tool_agent_node(state: AgentState, config: RunnableConfig):
         user_info_str=json.dumps(current_user_info, ensure_ascii=False)
     )
     
-    messages = [
-        ("system", prompt_config.system),
-        ("human", user_msg_content)
-    ]
+    messages = build_agent_messages("tool_agent", user_msg_content)
     
 
-    try:
-        ai_msg = await llm_with_tools.ainvoke(messages)
-    except Exception as e:
-        return {
-            "task_outputs": {
-                **state.get("task_outputs", {}),
-                current_action: {"error": f"LLM Error: {str(e)}", "status": "failed"}
+    direct_calls = plan_tool_calls(current_action, state, mcp_tool_map)
+
+    if direct_calls is not None:
+        record_dispatch(current_action, "direct")
+        ai_msg = AIMessage(content="", tool_calls=direct_calls)
+    else:
+        record_dispatch(current_action, "llm")
+        async def _choose_tools() -> AIMessage:
+            with llm_priority(turn_priority(state)):
+                return await llm_with_tools.ainvoke(messages)
+
+        try:
+            ai_msg = await within_deadline(_choose_tools(), deadline)
+        except SchedulerOverloaded:
+            raise
+        except Exception as e:
+            return {
+                "task_outputs": {
+                    **state.get("task_outputs", {}),
+                    current_action: {"error": f"LLM Error: {str(e)}", "status": "failed"}
+                }
             }
-        }
     
 
     tool_results_str = ""
-    
+    tool_results = []
+    tool_calls_made = state.get("tool_calls_made") or 0
+
+    allowance = tool_call_allowance(state)
+    if len(ai_msg.tool_calls) > allowance:
+        AgentLogger.log_tool_result("Turn Budget", {"dropped_tool_calls": len(ai_msg.tool_calls) - allowance})
+        ai_msg = AIMessage(content=ai_msg.content, tool_calls=ai_msg.tool_calls[:allowance])
 
     if ai_msg.tool_calls:
+        tool_calls_made += len(ai_msg.tool_calls)
         
         for tool_call in ai_msg.tool_calls:
+            AgentLogger.log_tool_call(tool_call["name"], tool_call["args"])
+
+        outputs = await invoke_tool_calls(
+            ai_msg.tool_calls,
+            mcp_tool_map,
+            tool_context={"backend_access_token": backend_token, "deadline": deadline},
+        )
+
+        for tool_call, output in zip(ai_msg.tool_calls, outputs):
             tool_name = tool_call["name"]
-            tool_args = tool_call["args"]
-
-            AgentLogger.log_tool_call(tool_name, tool_args)
-
-            tool_instance = mcp_tool_map.get(tool_name)
-            output = "Tool not found"
-            if tool_instance:
-                output = await invoke_tool(
-                    tool=tool_instance, 
-                    args=tool_args, 
-                    tool_context={"backend_access_token": backend_token}
-                )
-            
             AgentLogger.log_tool_result(tool_name, output)
+            tool_results.append((tool_name, tool_call["args"], output))
             tool_results_str += f"- Action: {tool_name}\n- Result: {output}\n"
         
 
-        summary_messages = messages + [
-            ai_msg,
-            ToolMessage(content=tool_results_str, tool_call_id=ai_msg.tool_calls[0]["id"])
-        ]
-
-        schema_map = {
-            "search_menu": SearchMenuOutput,
-            "create_order": CreateOrderOutput,
-            "add_item": AddItemOutput,
-            "calculate_total": CalculateTotalOutput,
-            "check_user_info": CheckUserOutput
-        }
+        # Reshape the MCP envelopes in Python; only ask the LLM when no mapper fits.
+        mapped_output = structure_tool_outputs(target_schema, tool_results)
 
+        if mapped_output is not None:
+            extracted_data = mapped_output.dict()
+        else:
+            summary_messages = messages + [ai_msg] + [
+                ToolMessage(content=str(output), tool_call_id=tool_call["id"])
+                for tool_call, output in zip(ai_msg.tool_calls, outputs)
+            ]
 
-        try:
-            structured_summary_llm = llm.with_structured_output(target_schema)
-            final_output_obj = await structured_summary_llm.ainvoke(summary_messages)
-            extracted_data = final_output_obj.dict()
-            
-        except Exception as e:
-            extracted_data = {"error": "Failed to structure output", "raw": tool_results_str}
+            try:
+                structured_summary_llm = models.structured(target_schema)
+
+                async def _summarize():
+                    with llm_priority(turn_priority(state)):
+                        return await structured_summary_llm.ainvoke(summary_messages)
+
+                final_output_obj = await within_deadline(_summarize(), deadline)
+                extracted_data = final_output_obj.dict()
+                
+            except SchedulerOverloaded:
+                raise
+            except Exception as e:
+                extracted_data = {"error": "Failed to structure output", "raw": tool_results_str}
 
     else:
         extracted_data = {"status": "no_tool_called", "reason": ai_msg.content}
@@ -263,17 +392,22 @@ async def tool_agent_node(state: AgentState, config: RunnableConfig):
     
     AgentLogger.log_tool_result(f"💾 Memory Saved ({current_action})", extracted_data)
     
-    return {
+    update = {
         "task_outputs": current_outputs,
-        "tool_answer": str(extracted_data)
+        "tool_answer": str(extracted_data),
+        "tool_calls_made": tool_calls_made
     }
+    if state.get("intent_fast_path"):
+        # Single-step intent: the answer goes straight to synthesis.
+        update["next_action"] = "finish"
+    return update
 
 
 
 
-async def synthesis_agent_node(state: AgentState):
+async def synthesis_agent_node(state: AgentState, config: RunnableConfig):
     AgentLogger.log_agent_start("Synthesis Agent", state)
-    llm = create_chat_model()
+    llm = get_model_registry().chat_model
     prompt_config = AGENT_PROMPTS["synthesis"]
     
     task_outputs = state.get("task_outputs", {})
@@ -285,21 +419,34 @@ async def synthesis_agent_node(state: AgentState):
     user_msg_content = prompt_config.user_template.format(
         user_input=state.get("user_input", ""),
         next_action=state.get("next_action", ""),
-        task_outputs=json.dumps(task_outputs, ensure_ascii=False),
+        task_outputs=build_task_context(task_outputs, "synthesis"),
         warning=state.get("warning", ""),   
         current_user_info=str(current_user_info),
         refusal_reason=str(refusal_reason) if refusal_reason else "None"
     )
     
-    messages = [
-        ("system", prompt_config.system),
-        ("human", user_msg_content)
-    ]
-    response = await llm.ainvoke(messages)
+    messages = build_agent_messages("synthesis", user_msg_content)
+    # Pass config through so /v1/chat/stream receives the tokens as they are generated.
+
+    async def _answer() -> AIMessage:
+        with llm_priority(turn_priority(state)):
+            return await llm.ainvoke(messages, config=config)
+
+    try:
+        # The grace period lets a turn that spent its budget still get a real answer.
+        response = await within_deadline(_answer(), turn_deadline(config), floor=TURN_SYNTHESIS_GRACE_SECONDS)
+    except TurnBudgetExceeded:
+        response = AIMessage(content=DEGRADED_ANSWER)
     AgentLogger.log_synthesis(response.content)
 
+    removals, summary = compact_history(
+        list(state.get("messages", [])) + [response],
+        state.get("conversation_summary"),
+    )
+
     final_state_update = {
-        "messages": [response],
+        "messages": removals + [response],
+        "conversation_summary": summary,
         "refusal_reason": None 
     }
     
@@ -318,14 +465,29 @@ def router(state: AgentState):
     return state["next_step"]
 
 
+def after_tool_router(state: AgentState):
+    return "synthesis_agent" if state.get("intent_fast_path") else "orchestrator"
+
+
 
 workflow = StateGraph(AgentState)
 
-workflow.add_node("orchestrator", orchestrator_node)
-workflow.add_node("tool_agent", tool_agent_node)
-workflow.add_node("synthesis_agent", synthesis_agent_node)
+workflow.add_node("intent_router", timed_node("intent_router", intent_router_node))
+workflow.add_node("orchestrator", timed_node("orchestrator", orchestrator_node))
+workflow.add_node("tool_agent", timed_node("tool_agent", tool_agent_node))
+workflow.add_node("synthesis_agent", timed_node("synthesis_agent", synthesis_agent_node))
+
+workflow.set_entry_point("intent_router")
 
-workflow.set_entry_point("orchestrator")
+workflow.add_conditional_edges(
+    "intent_router",
+    router,
+    {
+        "orchestrator": "orchestrator",
+        "tool_agent": "tool_agent",
+        "synthesis_agent": "synthesis_agent"
+    }
+)
 
 workflow.add_conditional_edges(
     "orchestrator",
@@ -337,6 +499,13 @@ workflow.add_conditional_edges(
 )
 
 
-workflow.add_edge("tool_agent", "orchestrator")
+workflow.add_conditional_edges(
+    "tool_agent",
+    after_tool_router,
+    {
+        "orchestrator": "orchestrator",
+        "synthesis_agent": "synthesis_agent"
+    }
+)
 workflow.add_edge("synthesis_agent", END)
 
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+from typing import List, Optional, Sequence, Tuple
+
+from langchain_core.messages import BaseMessage, HumanMessage, RemoveMessage
+
+from utils.config import HISTORY_KEEP_TURNS, HISTORY_SUMMARY_ENABLED, HISTORY_SUMMARY_MAX_CHARS
+
+_SNIPPET_CHARS = 120
+
+
+def _split_turns(messages: Sequence[BaseMessage]) -> List[List[BaseMessage]]:
+    turns: List[List[BaseMessage]] = []
+    for message in messages:
+        if isinstance(message, HumanMessage) or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def _snippet(message: BaseMessage) -> str:
+    text = message.content if isinstance(message.content, str) else str(message.content)
+    text = " ".join(text.split())
+    return text if len(text) <= _SNIPPET_CHARS else text[: _SNIPPET_CHARS - 1] + "…"
+
+
+def _summarize(previous: str, dropped_turns: List[List[BaseMessage]], max_chars: int) -> str:
+    lines = [previous] if previous else []
+    for turn in dropped_turns:
+        human = next((m for m in turn if isinstance(m, HumanMessage)), None)
+        reply = next((m for m in reversed(turn) if not isinstance(m, HumanMessage)), None)
+        line = f"- Khách: {_snippet(human)}" if human else "-"
+        if reply is not None:
+            line += f" | Trả lời: {_snippet(reply)}"
+        lines.append(line)
+    summary = "\n".join(lines)
+    # Keep the newest part of the summary when it outgrows the budget.
+    return summary if len(summary) <= max_chars else summary[-max_chars:]
+
+
+def compact_history(
+    messages: Sequence[BaseMessage],
+    summary: Optional[str] = None,
+    *,
+    keep_turns: int = HISTORY_KEEP_TURNS,
+    summarize: bool = HISTORY_SUMMARY_ENABLED,
+    max_summary_chars: int = HISTORY_SUMMARY_MAX_CHARS,
+) -> Tuple[List[BaseMessage], Optional[str]]:
+    """Apply the retention policy to `AgentState.messages`.
+
+    Returns `RemoveMessage`s for every message older than the last
+    `keep_turns` turns (a turn starts at a HumanMessage), plus the rolling
+    summary those turns were folded into. No LLM call is made; the summary is
+    a trimmed transcript so the cost stays constant per turn.
+    """
+    turns = _split_turns(messages)
+    if keep_turns <= 0 or len(turns) <= keep_turns:
+        return [], summary
+
+    dropped = turns[:-keep_turns]
+    removals: List[BaseMessage] = [
+        RemoveMessage(id=message.id)
+        for turn in dropped
+        for message in turn
+        if message.id
+    ]
+    if summarize:
+        summary = _summarize(summary or "", dropped, max_summary_chars)
+    return removals, summary
@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from utils.config import INTENT_MODEL_PATH, INTENT_SEED_PATH
+from utils.logging_utils import get_logger
+
+from .fast_extract import fold_text
+
+logger = get_logger("multi_agent.intent_classifier")
+
+PRICE_INQUIRY = "price_inquiry"
+FAQ = "faq"
+OUT_OF_SCOPE = "out_of_scope"
+COMPLEX = "complex"
+
+NGRAM_RANGE = (2, 4)
+N_FEATURES = 1 << 14
+# Naive Bayes log-likelihoods grow with text length and make raw posteriors
+# overconfident; scores are averaged per n-gram and rescaled by this factor.
+SCORE_SCALE = 5.0
+
+
+def _ngram_ids(text: str, n_features: int = N_FEATURES) -> List[int]:
+    padded = f" {fold_text(text)} "
+    ids = []
+    for n in range(NGRAM_RANGE[0], NGRAM_RANGE[1] + 1):
+        for i in range(len(padded) - n + 1):
+            # crc32 is stable across processes, unlike hash().
+            ids.append(zlib.crc32(padded[i:i + n].encode("utf-8")) % n_features)
+    return ids
+
+
+def vectorize(texts: Sequence[str], n_features: int = N_FEATURES) -> np.ndarray:
+    """Hashed char n-gram counts, one row per text."""
+    matrix = np.zeros((len(texts), n_features), dtype=np.float32)
+    for row, text in enumerate(texts):
+        ids = _ngram_ids(text, n_features)
+        if ids:
+            np.add.at(matrix[row], ids, 1.0)
+    return matrix
+
+
+@dataclass
+class IntentClassifier:
+    """Multinomial naive Bayes over hashed character n-grams.
+
+    Scoring is a single matrix product, so a prediction costs well under a
+    millisecond on CPU.
+    """
+
+    labels: List[str]
+    log_prob: np.ndarray   # (n_labels, n_features)
+    log_prior: np.ndarray  # (n_labels,)
+    score_scale: float = SCORE_SCALE
+
+    @classmethod
+    def train(cls, texts: Sequence[str], labels: Sequence[str], alpha: float = 0.5) -> "IntentClassifier":
+        classes = sorted(set(labels))
+        features = vectorize(texts)
+        y = np.array([classes.index(label) for label in labels])
+
+        counts = np.stack([features[y == k].sum(axis=0) for k in range(len(classes))]) + alpha
+        log_prob = np.log(counts) - np.log(counts.sum(axis=1, keepdims=True))
+        log_prior = np.log(np.bincount(y, minlength=len(classes)) / len(y))
+        return cls(labels=classes, log_prob=log_prob.astype(np.float32), log_prior=log_prior.astype(np.float32))
+
+    def predict_proba(self, texts: Sequence[str]) -> np.ndarray:
+        features = vectorize(texts, self.log_prob.shape[1])
+        n_grams = np.maximum(features.sum(axis=1, keepdims=True), 1.0)
+        scores = (features @ self.log_prob.T) / n_grams * self.score_scale + self.log_prior
+        scores -= scores.max(axis=1, keepdims=True)
+        probs = np.exp(scores)
+        return probs / probs.sum(axis=1, keepdims=True)
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        probs = self.predict_proba([text])[0]
+        best = int(probs.argmax())
+        return self.labels[best], float(probs[best])
+
+    def save(self, path: str) -> None:
+        np.savez_compressed(
+            path,
+            labels=np.array(self.labels),
+            log_prob=self.log_prob,
+            log_prior=self.log_prior,
+            score_scale=np.array(self.score_scale),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "IntentClassifier":
+        data = np.load(path)
+        return cls(
+            labels=[str(label) for label in data["labels"]],
+            log_prob=data["log_prob"],
+            log_prior=data["log_prior"],
+            score_scale=float(data["score_scale"]),
+        )
+
+
+def label_from_actions(actions: Sequence[str], refused: bool = False) -> str:
+    """Derive a training label from the actions a logged turn went through."""
+    steps = [action for action in actions if action != "finish"]
+    if refused and not steps:
+        return OUT_OF_SCOPE
+    if steps == ["search_menu"]:
+        return PRICE_INQUIRY
+    if steps == ["ask_faq"]:
+        return FAQ
+    return COMPLEX
+
+
+def load_examples(path: str) -> List[Tuple[str, str]]:
+    """Read JSONL rows with `text` and either `intent` or logged `actions`."""
+    examples = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            text = row.get("text") or row.get("message")
+            intent = row.get("intent") or label_from_actions(row.get("actions", []), bool(row.get("refusal_reason")))
+            if text:
+                examples.append((text, intent))
+    return examples
+
+
+def confidence_report(
+    classifier: IntentClassifier,
+    examples: Sequence[Tuple[str, str]],
+    thresholds: Iterable[float] = (0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95),
+) -> List[Dict[str, float]]:
+    """Coverage and accuracy of the confident predictions at each threshold."""
+    texts = [text for text, _ in examples]
+    gold = np.array([label for _, label in examples])
+    probs = classifier.predict_proba(texts)
+    predicted = np.array(classifier.labels)[probs.argmax(axis=1)]
+    confidence = probs.max(axis=1)
+    # Only non-complex predictions bypass the planner, so only they can do harm.
+    bypass = predicted != COMPLEX
+
+    rows = []
+    for threshold in thresholds:
+        taken = bypass & (confidence >= threshold)
+        rows.append({
+            "threshold": threshold,
+            "coverage": round(float(taken.mean()), 4),
+            "accuracy": round(float((predicted[taken] == gold[taken]).mean()), 4) if taken.any() else 1.0,
+        })
+    return rows
+
+
+_classifier: Optional[IntentClassifier] = None
+_loaded = False
+
+
+def get_intent_classifier() -> Optional[IntentClassifier]:
+    """Load the trained model, or train one from the seed set, once per process."""
+    global _classifier, _loaded
+    if _loaded:
+        return _classifier
+    _loaded = True
+    try:
+        if INTENT_MODEL_PATH and Path(INTENT_MODEL_PATH).exists():
+            _classifier = IntentClassifier.load(INTENT_MODEL_PATH)
+        elif INTENT_SEED_PATH and Path(INTENT_SEED_PATH).exists():
+            examples = load_examples(INTENT_SEED_PATH)
+            _classifier = IntentClassifier.train([t for t, _ in examples], [l for _, l in examples])
+    except Exception as exc:
+        logger.warning("Intent classifier unavailable: %s", exc)
+        _classifier = None
+    return _classifier
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Train / evaluate the intent short-circuit classifier.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    train = sub.add_parser("train")
+    train.add_argument("--data", required=True, help="JSONL with text + intent (or logged actions)")
+    train.add_argument("--out", default=INTENT_MODEL_PATH)
+    train.add_argument("--eval-split", type=float, default=0.2)
+    train.add_argument("--seed", type=int, default=0)
+
+    evaluate = sub.add_parser("eval")
+    evaluate.add_argument("--data", required=True)
+    evaluate.add_argument("--model", default=INTENT_MODEL_PATH)
+
+    args = parser.parse_args(argv)
+    examples = load_examples(args.data)
+
+    if args.command == "train":
+        random.Random(args.seed).shuffle(examples)
+        n_eval = int(len(examples) * args.eval_split)
+        held_out, training = examples[:n_eval], examples[n_eval:]
+        classifier = IntentClassifier.train([t for t, _ in training], [l for _, l in training])
+        classifier.save(args.out)
+        print(f"Trained on {len(training)} examples -> {args.out}")
+        if held_out:
+            examples = held_out
+        else:
+            return
+    else:
+        classifier = IntentClassifier.load(args.model)
+
+    print(f"{'threshold':>9} {'coverage':>9} {'accuracy':>9}   (n={len(examples)})")
+    for row in confidence_report(classifier, examples):
+        print(f"{row['threshold']:>9.2f} {row['coverage']:>9.2%} {row['accuracy']:>9.2%}")
+
+
+if __name__ == "__main__":
+    main()
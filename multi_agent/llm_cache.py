@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+
+from utils.config import LLM_CACHE_MAX_ENTRIES, LLM_CACHE_MODE, LLM_CACHE_PATH
+from utils.logging_utils import get_logger
+
+logger = get_logger("multi_agent.llm_cache")
+
+# "off": no cache; "on": read + write; "replay": read only, a miss is an error.
+LLM_CACHE_MODES = ("off", "on", "replay")
+
+
+class LLMCacheMiss(RuntimeError):
+    """Raised in replay mode when a call was not recorded beforehand."""
+
+
+def cache_key(prompt: str, llm_string: str) -> str:
+    """Content address of one chat call.
+
+    LangChain passes the serialized messages (ids stripped) as `prompt` and the
+    model, its parameters and any bound tools / response schema as `llm_string`.
+    """
+    return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+
+class TieredLLMCache(BaseCache):
+    """Exact-match LLM cache: in-memory LRU in front of an optional SQLite file.
+
+    Values are stored serialized so a hit always yields fresh message objects.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+        path: Optional[str] = LLM_CACHE_PATH,
+        replay: bool = False,
+    ) -> None:
+        self.max_entries = max_entries
+        self.replay = replay
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self._db.commit()
+        self.stats_counter = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+
+    def _remember(self, key: str, value: str) -> None:
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _lookup_memory(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self.stats_counter["memory_hits"] += 1
+            return value
+
+    def _lookup_disk(self, key: str) -> Optional[str]:
+        if self._db is None:
+            return None
+        with self._lock:
+            row = self._db.execute("SELECT value FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self.stats_counter["disk_hits"] += 1
+            self._remember(key, row[0])
+            return row[0]
+
+    def _miss(self, key: str) -> None:
+        with self._lock:
+            self.stats_counter["misses"] += 1
+        if self.replay:
+            raise LLMCacheMiss(f"LLM call {key[:12]} is not in the replay cache")
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = cache_key(prompt, llm_string)
+        value = self._lookup_memory(key) or self._lookup_disk(key)
+        if value is None:
+            self._miss(key)
+            return None
+        return loads(value, allowed_objects="core")
+
+    async def alookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = cache_key(prompt, llm_string)
+        value = self._lookup_memory(key)
+        if value is None and self._db is not None:
+            value = await asyncio.to_thread(self._lookup_disk, key)
+        if value is None:
+            self._miss(key)
+            return None
+        return loads(value, allowed_objects="core")
+
+    def _store(self, key: str, value: str) -> None:
+        with self._lock:
+            self._remember(key, value)
+            self.stats_counter["stores"] += 1
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, created) VALUES (?, ?, ?)",
+                    (key, value, time.time()),
+                )
+                self._db.commit()
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Any]) -> None:
+        if self.replay:
+            return
+        self._store(cache_key(prompt, llm_string), dumps(list(return_val)))
+
+    async def aupdate(self, prompt: str, llm_string: str, return_val: Sequence[Any]) -> None:
+        if self.replay:
+            return
+        value = dumps(list(return_val))
+        key = cache_key(prompt, llm_string)
+        if self._db is None:
+            self._store(key, value)
+        else:
+            await asyncio.to_thread(self._store, key, value)
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM llm_cache")
+                self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def stats(self) -> Dict[str, Any]:
+        counter = dict(self.stats_counter)
+        lookups = counter["memory_hits"] + counter["disk_hits"] + counter["misses"]
+        hits = counter["memory_hits"] + counter["disk_hits"]
+        return {
+            "mode": "replay" if self.replay else "on",
+            "memory_entries": len(self._memory),
+            "max_entries": self.max_entries,
+            **counter,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def create_llm_cache(mode: str = LLM_CACHE_MODE) -> Optional[TieredLLMCache]:
+    if mode not in LLM_CACHE_MODES:
+        raise ValueError(f"Unknown LLM_CACHE_MODE '{mode}', expected one of {LLM_CACHE_MODES}")
+    if mode == "off":
+        return None
+    cache = TieredLLMCache(replay=mode == "replay")
+    logger.info("LLM call cache enabled (mode=%s, path=%s)", mode, LLM_CACHE_PATH or "memory only")
+    return cache
@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from collections import Counter
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from utils.config import (
+    LLM_QUEUE_BUDGET_BROWSE_SECONDS,
+    LLM_QUEUE_BUDGET_CHECKOUT_SECONDS,
+    LLM_QUEUE_BUDGET_DEFAULT_SECONDS,
+    LLM_SCHEDULER_MAX_CONCURRENCY,
+    LLM_SCHEDULER_MAX_QUEUE,
+)
+from utils.logging_utils import get_logger
+
+from .metrics import METRICS, Histogram
+from .tool_dispatch import resolve_order_id
+
+logger = get_logger("multi_agent.llm_scheduler")
+
+# Lower value is served first.
+PRIORITY_CHECKOUT = 0
+PRIORITY_DEFAULT = 1
+PRIORITY_BROWSE = 2
+PRIORITY_NAMES = {PRIORITY_CHECKOUT: "checkout", PRIORITY_DEFAULT: "default", PRIORITY_BROWSE: "browse"}
+
+CHECKOUT_ACTIONS = frozenset({
+    "create_order", "add_item", "remove_item", "calculate_total",
+    "check_user_info", "confirm_order", "cancel_order",
+})
+BROWSE_ACTIONS = frozenset({"search_menu", "get_details", "ask_faq"})
+
+QUEUE_BUDGETS = {
+    PRIORITY_CHECKOUT: LLM_QUEUE_BUDGET_CHECKOUT_SECONDS,
+    PRIORITY_DEFAULT: LLM_QUEUE_BUDGET_DEFAULT_SECONDS,
+    PRIORITY_BROWSE: LLM_QUEUE_BUDGET_BROWSE_SECONDS,
+}
+
+DEPTH_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128)
+
+
+def turn_priority(state: Dict[str, Any]) -> int:
+    """Turns that are mid-checkout go ahead of browsing and FAQ traffic."""
+    action = state.get("next_action")
+    queue = state.get("task_queue") or []
+    if action in CHECKOUT_ACTIONS or CHECKOUT_ACTIONS.intersection(queue):
+        return PRIORITY_CHECKOUT
+    if state.get("cart") or resolve_order_id(state) is not None:
+        return PRIORITY_CHECKOUT
+    if state.get("intent_fast_path") or action in BROWSE_ACTIONS:
+        return PRIORITY_BROWSE
+    return PRIORITY_DEFAULT
+
+
+class SchedulerOverloaded(RuntimeError):
+    """The LLM queue is full or the call waited past its queue-time budget."""
+
+    def __init__(self, message: str, retry_after: int) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMScheduler:
+    """Admission control in front of the inference server.
+
+    At most `max_concurrency` LLM calls run at once (match the server's
+    parallel slots); the rest wait in a priority queue. A full queue or an
+    exhausted queue-time budget raises SchedulerOverloaded right away rather
+    than letting every request slow down together.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = LLM_SCHEDULER_MAX_CONCURRENCY,
+        max_queue: int = LLM_SCHEDULER_MAX_QUEUE,
+        queue_budgets: Dict[int, float] = QUEUE_BUDGETS,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_budgets = dict(queue_budgets)
+        self._active = 0
+        self._queue: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        # Running estimate of how long one call holds a slot, for Retry-After.
+        self._service_seconds = 2.0
+        self.wait_seconds = {name: Histogram() for name in PRIORITY_NAMES.values()}
+        self.queue_depth = Histogram(DEPTH_BUCKETS)
+        self.outcomes: Counter = Counter()
+
+    @property
+    def depth(self) -> int:
+        return sum(1 for _, _, future in self._queue if not future.done())
+
+    def is_saturated(self) -> bool:
+        """True when a new call could neither run now nor wait in the queue."""
+        return self.max_queue >= 0 and self._active >= self.max_concurrency and self.depth >= self.max_queue
+
+    def retry_after(self) -> int:
+        waves = self.depth / max(self.max_concurrency, 1) + 1
+        return max(1, math.ceil(waves * self._service_seconds))
+
+    def _overloaded(self, outcome: str, message: str) -> SchedulerOverloaded:
+        self.outcomes[outcome] += 1
+        return SchedulerOverloaded(message, self.retry_after())
+
+    async def _acquire(self, priority: int) -> None:
+        self.queue_depth.observe(self.depth)
+        if self._active < self.max_concurrency and not self.depth:
+            self._active += 1
+            return
+        if self.is_saturated():
+            raise self._overloaded("rejected", f"LLM queue is full ({self.depth} waiting)")
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._seq), future))
+        budget = self.queue_budgets.get(priority, LLM_QUEUE_BUDGET_DEFAULT_SECONDS)
+        try:
+            await asyncio.wait({future}, timeout=budget)
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release()  # the slot was handed over; pass it on
+            future.cancel()
+            raise
+        if not future.done():
+            future.cancel()
+            raise self._overloaded("timed_out", f"LLM call waited more than {budget:.0f}s in queue")
+
+    def _release(self) -> None:
+        while self._queue:
+            _, _, future = heapq.heappop(self._queue)
+            if not future.done():
+                # Hand the slot straight to the next waiter; _active stays the same.
+                future.set_result(None)
+                return
+        self._active -= 1
+
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_DEFAULT) -> AsyncIterator[None]:
+        queued_at = time.monotonic()
+        await self._acquire(priority)
+        started = time.monotonic()
+        priority_name = PRIORITY_NAMES.get(priority, "default")
+        self.wait_seconds[priority_name].observe(started - queued_at)
+        METRICS.observe("llm_queue_wait_seconds", started - queued_at, priority=priority_name)
+        try:
+            yield
+        finally:
+            self._service_seconds = 0.8 * self._service_seconds + 0.2 * (time.monotonic() - started)
+            self.outcomes["completed"] += 1
+            self._release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "active": self._active,
+            "queue_depth": self.depth,
+            "retry_after_seconds": self.retry_after(),
+            "outcomes": dict(self.outcomes),
+            "queue_depth_histogram": self.queue_depth.snapshot(),
+            "wait_seconds": {name: hist.snapshot() for name, hist in self.wait_seconds.items()},
+        }
+
+
+llm_scheduler = LLMScheduler()
+
+# Priority of the LLM calls made by the current node; None means unscheduled.
+_call_priority: ContextVar[Optional[int]] = ContextVar("llm_call_priority", default=None)
+
+
+@contextmanager
+def llm_priority(priority: int) -> Iterator[None]:
+    """Schedule the LLM calls made inside the block at `priority`.
+
+    The slot itself is taken by the model, only for a call that actually
+    reaches the server: cache hits and coalesced followers never hold one.
+    """
+    token = _call_priority.set(priority)
+    try:
+        yield
+    finally:
+        _call_priority.reset(token)
+
+
+@asynccontextmanager
+async def scheduled_call() -> AsyncIterator[None]:
+    """Hold a scheduler slot for one server call made under `llm_priority`."""
+    priority = _call_priority.get()
+    if priority is None:
+        yield
+        return
+    async with llm_scheduler.slot(priority):
+        yield
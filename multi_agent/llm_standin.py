@@ -0,0 +1,439 @@
+"""OpenAI-compatible stand-in for the inference server, for load tests.
+
+Serves `/v1/chat/completions` (plain replies, tool calls, JSON-schema
+structured output, streaming) from rules instead of a model, while
+mimicking how Ollama/vLLM behave under load: a fixed number of parallel
+slots, a bounded wait queue, time-to-first-token and a decode rate.
+Point the agent at it with `OLLAMA_BASE_URL=http://<host>:<port>/v1`:
+
+    python -m multi_agent.llm_standin --port 11434 --slots 4 --ttft-ms 300 --tokens-per-second 40
+
+Rules (`--rules rules.json`) are tried in order before the built-in
+responses; the first whose regexes all match wins:
+
+    [{"when": {"last_user": "hủy", "schema": "OrchestratorDecision"},
+      "json": {"next_step": "tool_agent", "current_action": "cancel_order",
+               "updated_queue": ["finish"], "plan": "cancel"}},
+     {"when": {"tools": true, "system": "Tool Agent"},
+      "tool_calls": [{"name": "list_menu", "arguments": {}}]},
+     {"when": {"last_user": "giờ"}, "content": "Dạ quán mở cửa 6h-22h ạ."}]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import re
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from utils.config import (
+    LLM_STANDIN_MAX_QUEUE,
+    LLM_STANDIN_PORT,
+    LLM_STANDIN_PREFILL_TOKENS_PER_SECOND,
+    LLM_STANDIN_REPLY_TOKENS,
+    LLM_STANDIN_RULES_PATH,
+    LLM_STANDIN_SLOTS,
+    LLM_STANDIN_TOKENS_PER_SECOND,
+    LLM_STANDIN_TTFT_MS,
+    MODEL_NAME,
+)
+from utils.logging_utils import get_logger
+
+from .fast_extract import fast_extract, fold_text
+from .metrics import Histogram
+from .prompt_context import approx_tokens
+
+logger = get_logger("multi_agent.llm_standin")
+
+_TOKEN = re.compile(r"\S+\s*|\s+")
+_PLANNER_MEMORY = re.compile(r">>> TASK MEMORY:\s*(?P<memory>.*?)\n5\. Input:\s*(?P<input>.*?)\n-{5,}", re.S)
+_PLANNER_PREFILLED = re.compile(r">>> ĐÃ TRÍCH XUẤT TỰ ĐỘNG:\s*(?P<fields>[\w, ]+)")
+_MENU_LINE = re.compile(r"^- (\d+) \| (.+?) \| ([\d,.]+)$", re.M)
+
+REPLY_TEXT = (
+    "Dạ, Thang Food đã nhận yêu cầu của anh/chị. Món ăn sẽ được chuẩn bị ngay "
+    "và giao đến địa chỉ đã cung cấp. Anh/chị cần thêm gì cứ nhắn cho em nhé ạ. "
+)
+
+# action -> tool the model would pick when the agent falls back to LLM tool selection
+ACTION_TOOLS = {
+    "search_menu": "list_menu",
+    "ask_faq": "list_faqs",
+    "create_order": "create_draft_order",
+    "check_order": "get_order_history",
+}
+ORDER_STEPS = ("create_order", "add_item", "calculate_total")
+
+
+@dataclass
+class StandinSettings:
+    slots: int = LLM_STANDIN_SLOTS
+    max_queue: int = LLM_STANDIN_MAX_QUEUE
+    ttft_ms: float = LLM_STANDIN_TTFT_MS
+    prefill_tokens_per_second: float = LLM_STANDIN_PREFILL_TOKENS_PER_SECOND
+    tokens_per_second: float = LLM_STANDIN_TOKENS_PER_SECOND
+    reply_tokens: int = LLM_STANDIN_REPLY_TOKENS
+    rules_path: str = LLM_STANDIN_RULES_PATH
+
+
+def _text(content: Any) -> str:
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content or ""
+
+
+def _last(messages: List[Dict[str, Any]], role: str) -> str:
+    for message in reversed(messages):
+        if message.get("role") == role:
+            return _text(message.get("content"))
+    return ""
+
+
+def _schema_of(body: Dict[str, Any]) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+    response_format = body.get("response_format") or {}
+    if response_format.get("type") != "json_schema":
+        return None, None
+    spec = response_format.get("json_schema") or {}
+    return spec.get("name"), spec.get("schema") or {}
+
+
+def example_for_schema(schema: Dict[str, Any], defs: Optional[Dict[str, Any]] = None) -> Any:
+    """Smallest value that validates against a JSON schema (required fields only)."""
+    defs = defs if defs is not None else schema.get("$defs", {})
+    if "$ref" in schema:
+        return example_for_schema(defs[schema["$ref"].rsplit("/", 1)[-1]], defs)
+    for key in ("anyOf", "oneOf", "allOf"):
+        if schema.get(key):
+            options = schema[key]
+            if any(option.get("type") == "null" for option in options):
+                return None
+            return example_for_schema(options[0], defs)
+    if "default" in schema:
+        return schema["default"]
+    if "enum" in schema:
+        return schema["enum"][0]
+    kind = schema.get("type")
+    if kind == "object":
+        return {
+            name: example_for_schema(prop, defs)
+            for name, prop in schema.get("properties", {}).items()
+            if name in schema.get("required", [])
+        }
+    return {"array": [], "string": "", "integer": 0, "number": 0, "boolean": False, "null": None}.get(kind)
+
+
+def _extraction(raw_input: str, system: str, prefilled: Sequence[str]) -> Dict[str, Any]:
+    """What a planner copies out of the input, minus the fields it was told are filled."""
+    menu = [(int(item_id), name, float(price.replace(",", ""))) for item_id, name, price in _MENU_LINE.findall(system)]
+    found = fast_extract(raw_input, menu)
+    decision: Dict[str, Any] = {}
+    info = {name: value for name, value in found.user_info.model_dump().items() if value and name not in prefilled}
+    if info:
+        decision["extracted_info"] = info
+    if found.cart and "cart" not in prefilled:
+        decision["extracted_cart"] = [item.model_dump(exclude_none=True) for item in found.cart]
+    return decision
+
+
+def plan_step(prompt: str, system: str = "") -> Dict[str, Any]:
+    """A rough stand-in for the planner, read off the planner's user message.
+
+    Orders walk create_order -> add_item -> calculate_total one step per
+    call; price, FAQ, cancel and confirm requests take one tool step; then
+    every turn finishes. Unknown prompt layouts finish straight away. Like
+    the real planner, every call re-extracts customer details and dishes
+    from the input unless the prompt lists them as already extracted.
+    """
+    match = _PLANNER_MEMORY.search(prompt)
+    memory = match.group("memory") if match else ""
+    user_input = fold_text(match.group("input")) if match else ""
+    done = set(re.findall(r'"(\w+)":', memory))
+    prefilled = _PLANNER_PREFILLED.search(prompt)
+    extracted = _extraction(match.group("input"), system,
+                            prefilled.group("fields").replace(" ", "").split(",") if prefilled else ()) if match else {}
+
+    def _step(action: str, queue: List[str]) -> Dict[str, Any]:
+        return {"next_step": "tool_agent", "current_action": action, "updated_queue": queue + ["finish"],
+                "plan": f"{action} for: {user_input}", **extracted}
+
+    if re.search(r"\bhuy\b", user_input):
+        steps: Tuple[str, ...] = ("cancel_order",)
+    elif "xac nhan" in user_input:
+        steps = ("confirm_order",)
+    elif re.search(r"\b(?:gia|bao nhieu)\b", user_input):
+        steps = ("search_menu",)
+    elif re.search(r"\b(?:cho|dat|lay|order|mua)\s+\d", user_input):
+        steps = ORDER_STEPS
+    elif re.search(r"\b(?:mo cua|giao hang|chinh sach|may gio)\b", user_input):
+        steps = ("ask_faq",)
+    else:
+        steps = ()
+
+    pending = [action for action in steps if action not in done]
+    if pending:
+        return _step(pending[0], pending[1:])
+    return {"next_step": "synthesis_agent", "current_action": "finish", "updated_queue": [],
+            "plan": f"finish: {user_input}", "clear_memory": steps in (("cancel_order",), ("confirm_order",)),
+            **extracted}
+
+
+def _matches(rule: Dict[str, Any], body: Dict[str, Any], schema_name: Optional[str]) -> bool:
+    when = rule.get("when", {})
+    messages = body.get("messages", [])
+    if "tools" in when and bool(body.get("tools")) != bool(when["tools"]):
+        return False
+    checks = {
+        "last_user": _last(messages, "user"),
+        "system": _last(messages, "system"),
+        "schema": schema_name or "",
+    }
+    return all(re.search(when[key], value or "", re.I) for key, value in checks.items() if key in when)
+
+
+def build_response(body: Dict[str, Any], rules: List[Dict[str, Any]], reply_tokens: int) -> Dict[str, Any]:
+    """{"content": str} or {"tool_calls": [{"name", "arguments"}]} for the request."""
+    schema_name, schema = _schema_of(body)
+    for rule in rules:
+        if _matches(rule, body, schema_name):
+            if "json" in rule:
+                return {"content": json.dumps(rule["json"], ensure_ascii=False)}
+            if "tool_calls" in rule:
+                return {"tool_calls": rule["tool_calls"]}
+            return {"content": rule.get("content", "")}
+
+    messages = body.get("messages", [])
+    if schema is not None:
+        if schema_name == "OrchestratorDecision":
+            value = plan_step(_last(messages, "user"), _last(messages, "system"))
+        else:
+            value = example_for_schema(schema)
+        return {"content": json.dumps(value, ensure_ascii=False)}
+
+    tools = {tool.get("function", {}).get("name") for tool in body.get("tools") or []}
+    if tools and body.get("tool_choice") != "none":
+        action = re.search(r"Next Action:\s*(\w+)", _last(messages, "user"))
+        tool_name = ACTION_TOOLS.get(action.group(1)) if action else None
+        return {"tool_calls": [{"name": tool_name, "arguments": {}}]} if tool_name in tools else {"content": ""}
+
+    words = REPLY_TEXT.split(" ")
+    return {"content": " ".join(words[i % len(words)] for i in range(reply_tokens)).strip()}
+
+
+class InferenceSlots:
+    """Parallel decode slots plus a bounded FIFO wait queue, like OLLAMA_NUM_PARALLEL / OLLAMA_MAX_QUEUE."""
+
+    def __init__(self, slots: int, max_queue: int) -> None:
+        self.slots = slots
+        self.max_queue = max_queue
+        self._semaphore = asyncio.Semaphore(slots)
+        self.active = 0
+        self.waiting = 0
+        self.outcomes: Counter = Counter()
+        self.queue_wait = Histogram()
+        self.ttft = Histogram()
+        self.duration = Histogram()
+
+    def admit(self) -> None:
+        """Reject up front, as Ollama does, when the wait queue is already full."""
+        if self.waiting >= self.max_queue and self._semaphore.locked():
+            self.outcomes["rejected"] += 1
+            raise HTTPException(status_code=503, detail="server busy, please try again. maximum pending requests exceeded")
+
+    async def acquire(self) -> float:
+        queued_at = time.monotonic()
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        waited = time.monotonic() - queued_at
+        self.queue_wait.observe(waited)
+        return waited
+
+    def release(self, outcome: str = "completed") -> None:
+        self.active -= 1
+        self.outcomes[outcome] += 1
+        self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "slots": self.slots,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "waiting": self.waiting,
+            "outcomes": dict(self.outcomes),
+            "queue_wait_seconds": self.queue_wait.snapshot(),
+            "ttft_seconds": self.ttft.snapshot(),
+            "duration_seconds": self.duration.snapshot(),
+        }
+
+
+def _completion_pieces(response: Dict[str, Any]) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """Split the reply into decode tokens; tool calls get OpenAI ids and JSON arguments."""
+    tool_calls = [
+        {
+            "id": f"call_{uuid.uuid4().hex[:12]}",
+            "type": "function",
+            "function": {"name": call["name"], "arguments": json.dumps(call.get("arguments", {}), ensure_ascii=False)},
+        }
+        for call in response.get("tool_calls", [])
+    ]
+    text = response.get("content") or "".join(call["function"]["arguments"] for call in tool_calls)
+    return _TOKEN.findall(text), tool_calls
+
+
+def create_app(settings: Optional[StandinSettings] = None) -> FastAPI:
+    settings = settings or StandinSettings()
+    rules: List[Dict[str, Any]] = []
+    if settings.rules_path:
+        with open(settings.rules_path, encoding="utf-8") as handle:
+            rules = json.load(handle)
+    slots = InferenceSlots(settings.slots, settings.max_queue)
+    app = FastAPI(title="LLM stand-in")
+    app.state.slots = slots
+    app.state.settings = settings
+
+    def _prefill_seconds(prompt_tokens: int) -> float:
+        prefill = prompt_tokens / settings.prefill_tokens_per_second if settings.prefill_tokens_per_second > 0 else 0.0
+        return settings.ttft_ms / 1000 + prefill
+
+    def _decode_seconds(tokens: int) -> float:
+        return tokens / settings.tokens_per_second if settings.tokens_per_second > 0 else 0.0
+
+    @app.get("/v1/models")
+    async def models() -> Dict[str, Any]:
+        return {"object": "list", "data": [{"id": MODEL_NAME, "object": "model", "owned_by": "standin"}]}
+
+    @app.get("/stats")
+    async def stats() -> Dict[str, Any]:
+        return slots.stats()
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(body: Dict[str, Any]) -> Any:
+        response = build_response(body, rules, settings.reply_tokens)
+        tokens, tool_calls = _completion_pieces(response)
+        # Tool definitions and the response schema are rendered into the prompt too.
+        prompt = [body.get("messages", []), body.get("tools"), body.get("response_format")]
+        prompt_tokens = approx_tokens(json.dumps(prompt, ensure_ascii=False))
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(tokens),
+            "total_tokens": prompt_tokens + len(tokens),
+        }
+        finish_reason = "tool_calls" if tool_calls else "stop"
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:16]}"
+        model = body.get("model") or MODEL_NAME
+        created = int(time.time())
+
+        slots.admit()
+
+        if not body.get("stream"):
+            await slots.acquire()
+            started = time.monotonic()
+            try:
+                await asyncio.sleep(_prefill_seconds(prompt_tokens))
+                slots.ttft.observe(time.monotonic() - started)
+                await asyncio.sleep(_decode_seconds(len(tokens)))
+            except BaseException:
+                slots.release("cancelled")
+                raise
+            slots.duration.observe(time.monotonic() - started)
+            slots.release()
+            message: Dict[str, Any] = {"role": "assistant", "content": None if tool_calls else "".join(tokens)}
+            if tool_calls:
+                message["tool_calls"] = tool_calls
+            return JSONResponse({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+                "usage": usage,
+            })
+
+        include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+
+        def _chunk(delta: Dict[str, Any], finish: Optional[str] = None) -> str:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+            }
+            return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+        async def _events() -> AsyncIterator[str]:
+            # The slot is taken inside the generator so a client that never reads does not leak it.
+            await slots.acquire()
+            started = time.monotonic()
+            outcome = "cancelled"
+            try:
+                await asyncio.sleep(_prefill_seconds(prompt_tokens))
+                slots.ttft.observe(time.monotonic() - started)
+                yield _chunk({"role": "assistant", "content": ""})
+                per_token = _decode_seconds(1)
+                if tool_calls:
+                    await asyncio.sleep(per_token * len(tokens))
+                    yield _chunk({"tool_calls": [{"index": i, **call} for i, call in enumerate(tool_calls)]})
+                else:
+                    for token in tokens:
+                        await asyncio.sleep(per_token)
+                        yield _chunk({"content": token})
+                yield _chunk({}, finish_reason)
+                if include_usage:
+                    usage_payload = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                                     "model": model, "choices": [], "usage": usage}
+                    yield f"data: {json.dumps(usage_payload)}\n\n"
+                yield "data: [DONE]\n\n"
+                outcome = "completed"
+            finally:
+                slots.duration.observe(time.monotonic() - started)
+                slots.release(outcome)
+
+        return StreamingResponse(_events(), media_type="text/event-stream")
+
+    return app
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import uvicorn
+
+    defaults = StandinSettings()
+    parser = argparse.ArgumentParser(description="OpenAI-compatible LLM stand-in for load tests.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=LLM_STANDIN_PORT)
+    parser.add_argument("--slots", type=int, default=defaults.slots, help="parallel requests (OLLAMA_NUM_PARALLEL)")
+    parser.add_argument("--max-queue", type=int, default=defaults.max_queue, help="waiting requests before 503")
+    parser.add_argument("--ttft-ms", type=float, default=defaults.ttft_ms, help="time to first token")
+    parser.add_argument("--prefill-tokens-per-second", type=float, default=defaults.prefill_tokens_per_second,
+                        help="adds prompt_tokens / rate to the TTFT (0 = off)")
+    parser.add_argument("--tokens-per-second", type=float, default=defaults.tokens_per_second, help="decode rate")
+    parser.add_argument("--reply-tokens", type=int, default=defaults.reply_tokens, help="length of plain replies")
+    parser.add_argument("--rules", default=defaults.rules_path, help="JSON list of response rules")
+    args = parser.parse_args(argv)
+
+    settings = StandinSettings(
+        slots=args.slots,
+        max_queue=args.max_queue,
+        ttft_ms=args.ttft_ms,
+        prefill_tokens_per_second=args.prefill_tokens_per_second,
+        tokens_per_second=args.tokens_per_second,
+        reply_tokens=args.reply_tokens,
+        rules_path=args.rules,
+    )
+    logger.info("LLM stand-in on %s:%d with %d slots", args.host, args.port, settings.slots)
+    uvicorn.run(create_app(settings), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,25 +3,116 @@ from rich.panel import Panel
 from rich.json import JSON
 from rich.tree import Tree
 from rich import print as rprint
+import atexit
 import json
-from typing import Any, Dict
+import logging
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+from utils.config import AGENT_LOG_LEVEL, AGENT_LOG_MAX_CHARS, AGENT_LOG_RICH
+from utils.logging_utils import get_logger
 
 console = Console()
 
+# Agent trace records. Rich panels are a development aid: they are only rendered
+# with AGENT_LOG_RICH on and this logger at DEBUG.
+trace_logger = get_logger("multi_agent.trace")
+trace_logger.setLevel(getattr(logging, AGENT_LOG_LEVEL, logging.INFO))
+
+
+class _Lazy:
+    """Payload that is serialized and truncated only when a handler formats it."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any) -> None:
+        self.value = value
+
+    def __str__(self) -> str:
+        value = self.value
+        if not isinstance(value, str):
+            try:
+                value = json.dumps(value, ensure_ascii=False, default=str)
+            except (TypeError, ValueError):
+                value = str(value)
+        if len(value) > AGENT_LOG_MAX_CHARS:
+            value = f"{value[:AGENT_LOG_MAX_CHARS]}…(+{len(value) - AGENT_LOG_MAX_CHARS} chars)"
+        return value
+
+
+class _DeferredQueueHandler(QueueHandler):
+    # The stock prepare() formats the record on the caller's thread; formatting
+    # (and _Lazy serialization) is left to the listener thread instead.
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+_listener: Optional[QueueListener] = None
+_listener_lock = threading.Lock()
+
+
+def _ensure_listener() -> None:
+    """Move trace output to a background thread, writing through the root handlers."""
+    global _listener
+    if _listener is not None:
+        return
+    with _listener_lock:
+        if _listener is not None:
+            return
+        records: queue.SimpleQueue = queue.SimpleQueue()
+        _listener = QueueListener(records, *logging.getLogger().handlers, respect_handler_level=True)
+        trace_logger.addHandler(_DeferredQueueHandler(records))
+        trace_logger.propagate = False
+        _listener.start()
+        atexit.register(_listener.stop)
+
+
+def _rich_enabled() -> bool:
+    return AGENT_LOG_RICH and trace_logger.isEnabledFor(logging.DEBUG)
+
+
+def _trace(level: int, event: str, name: str, payload: Any = None) -> None:
+    if not trace_logger.isEnabledFor(level):
+        return
+    _ensure_listener()
+    trace_logger.log(level, "%s %s %s", event, name, _Lazy(payload) if payload is not None else "")
+
+
+def _state_summary(state: Dict[str, Any]) -> Dict[str, Any]:
+    # A few scalars, copied now: the state object keeps changing after the call returns.
+    return {
+        "next_action": state.get("next_action"),
+        "task_queue": list(state.get("task_queue") or []),
+        "cart_items": len(state.get("cart") or []),
+        "task_outputs": sorted((state.get("task_outputs") or {}).keys()),
+        "iterations": state.get("iterations"),
+        "messages": len(state.get("messages") or []),
+    }
+
+
 class AgentLogger:
     @staticmethod
     def print_header(title: str):
+        if not _rich_enabled():
+            _trace(logging.INFO, "header", title)
+            return
         console.print(Panel(f"[bold cyan]{title}[/bold cyan]", expand=False))
 
     @staticmethod
     def log_agent_start(agent_name: str, state: Dict[str, Any]):
         """Log khi một Agent bắt đầu chạy"""
+        if not _rich_enabled():
+            _trace(logging.INFO, "agent_start", agent_name, _state_summary(state))
+            return
+
         tree = Tree(f"[bold green]🤖 Agent Active: {agent_name}[/bold green]")
-        
+
         input_data = state.copy()
         if "messages" in input_data:
             input_data["messages"] = f"[{len(input_data['messages'])} messages history]"
-            
+
         tree.add(f"[yellow]Input State:[/yellow]").add(JSON.from_data(input_data))
         console.print(tree)
         console.print("")
@@ -30,7 +121,10 @@ class AgentLogger:
     def log_planner_decision(decision: Any):
         """Log quyết định của Orchestrator"""
         data = decision.dict() if hasattr(decision, "dict") else decision
-        
+        if not _rich_enabled():
+            _trace(logging.INFO, "planner_decision", str(data.get("current_action")), data)
+            return
+
         panel = Panel(
             JSON.from_data(data),
             title="[bold purple]🧠 Orchestrator Decision[/bold purple]",
@@ -43,12 +137,19 @@ class AgentLogger:
     @staticmethod
     def log_tool_call(tool_name: str, tool_args: Dict):
         """Log khi Tool Agent chuẩn bị gọi tool"""
+        if not _rich_enabled():
+            _trace(logging.INFO, "tool_call", tool_name, dict(tool_args))
+            return
         console.print(f"   [bold yellow]🔨 Calling Tool:[/bold yellow] [cyan]{tool_name}[/cyan]")
         console.print(f"   [dim]Arguments:[/dim] {json.dumps(tool_args, ensure_ascii=False)}")
 
     @staticmethod
     def log_tool_result(tool_name: str, result: Any):
         """Log kết quả trả về từ tool"""
+        if not _rich_enabled():
+            # Tool payloads are bulky; they are only emitted at DEBUG.
+            _trace(logging.DEBUG, "tool_result", tool_name, result)
+            return
         try:
             if isinstance(result, (dict, list)):
                 res_str = JSON.from_data(result)
@@ -65,8 +166,11 @@ class AgentLogger:
     @staticmethod
     def log_synthesis(response: str):
         """Log phản hồi cuối cùng"""
+        if not _rich_enabled():
+            _trace(logging.INFO, "synthesis", "response", response)
+            return
         console.print(Panel(
             response,
             title="[bold green]🗣️ Synthesis Final Response[/bold green]",
             border_style="green"
-        ))
\ No newline at end of file
+        ))
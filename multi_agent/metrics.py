@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Seconds; covers cache hits through slow CPU inference.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 4, 5, 6, 8, 10, 15, 20, 32)
+
+METRIC_PREFIX = "multi_agent_"
+
+Labels = Tuple[Tuple[str, str], ...]
+# (name, help, labels, value) of one gauge sample produced at scrape time
+GaugeSample = Tuple[str, str, Dict[str, Any], float]
+
+
+class Histogram:
+    """Cumulative-bucket histogram, the shape Prometheus expects."""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> Dict[str, int]:
+        total, out = 0, {}
+        for bound, count in zip(list(self.buckets) + [float("inf")], self.counts):
+            total += count
+            out["+Inf" if bound == float("inf") else repr(bound)] = total
+        return out
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else 0.0,
+            "buckets": self.cumulative(),
+        }
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+class MetricsRegistry:
+    """Labelled counters and histograms rendered in the Prometheus text format.
+
+    Components that already keep their own stats (caches, scheduler, ...)
+    register a collector that turns them into gauges at scrape time.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._help: Dict[str, str] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._buckets: Dict[str, Sequence[float]] = {}
+        self._collectors: List[Callable[[], Iterable[GaugeSample]]] = []
+
+    def counter(self, name: str, help_text: str) -> None:
+        self._help[name] = help_text
+        self._counters.setdefault(name, {})
+
+    def histogram(self, name: str, help_text: str, buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        self._help[name] = help_text
+        self._histograms.setdefault(name, {})
+        self._buckets[name] = buckets
+
+    def inc(self, name: str, value: float = 1.0, **labels: Any) -> None:
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        key = _labels(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(self._buckets.get(name, LATENCY_BUCKETS))
+            histogram.observe(value)
+
+    def snapshot(self, name: str) -> Dict[Labels, Dict[str, Any]]:
+        """Current state of every series of histogram `name`."""
+        with self._lock:
+            return {labels: histogram.snapshot() for labels, histogram in self._histograms.get(name, {}).items()}
+
+    def register_collector(self, collector: Callable[[], Iterable[GaugeSample]]) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            for name, series in self._counters.items():
+                full = METRIC_PREFIX + name
+                lines += [f"# HELP {full} {self._help.get(name, name)}", f"# TYPE {full} counter"]
+                lines += [f"{full}{_format_labels(labels)} {value:g}" for labels, value in series.items()]
+            for name, series in self._histograms.items():
+                full = METRIC_PREFIX + name
+                lines += [f"# HELP {full} {self._help.get(name, name)}", f"# TYPE {full} histogram"]
+                for labels, histogram in series.items():
+                    for bound, count in histogram.cumulative().items():
+                        lines.append(f"{full}_bucket{_format_labels(labels, ('le', bound))} {count}")
+                    lines.append(f"{full}_sum{_format_labels(labels)} {histogram.sum:g}")
+                    lines.append(f"{full}_count{_format_labels(labels)} {histogram.count}")
+
+        gauges: Dict[str, Tuple[str, List[str]]] = {}
+        for collector in self._collectors:
+            for name, help_text, labels, value in collector():
+                full = METRIC_PREFIX + name
+                _, samples = gauges.setdefault(full, (help_text, []))
+                samples.append(f"{full}{_format_labels(_labels(labels))} {float(value):g}")
+        for full, (help_text, samples) in gauges.items():
+            lines += [f"# HELP {full} {help_text}", f"# TYPE {full} gauge", *samples]
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+METRICS.histogram("node_duration_seconds", "Wall time per graph node run.")
+METRICS.histogram("llm_call_duration_seconds", "Wall time per LLM call, by agent.")
+METRICS.counter("llm_tokens_total", "LLM tokens by agent and kind (prompt/completion/cached).")
+METRICS.histogram("tool_call_duration_seconds", "Wall time per executed MCP tool call.")
+METRICS.counter("tool_calls_total", "Executed MCP tool calls by tool and outcome.")
+METRICS.histogram("turn_duration_seconds", "Wall time per /v1/chat turn, by outcome.")
+METRICS.histogram("llm_queue_wait_seconds", "Time LLM calls waited for a scheduler slot, by priority class.")
+METRICS.histogram("turn_iterations", "Orchestrator iterations per turn.", COUNT_BUCKETS)
+METRICS.histogram("turn_tool_calls", "Tool calls per turn.", COUNT_BUCKETS)
+
+
+# Per-request breakdown, filled while a turn runs when the caller asked for it.
+_turn_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("turn_timings", default=None)
+
+
+def start_turn_timings() -> Dict[str, float]:
+    timings: Dict[str, float] = {}
+    _turn_timings.set(timings)
+    return timings
+
+
+def add_turn_timing(part: str, seconds: float) -> None:
+    timings = _turn_timings.get()
+    if timings is not None:
+        timings[part] = timings.get(part, 0.0) + seconds
+
+
+def server_timing_header(timings: Dict[str, float]) -> str:
+    """Render a breakdown as a standard `Server-Timing` header value (ms)."""
+    return ", ".join(f"{part};dur={seconds * 1000:.1f}" for part, seconds in timings.items())
+
+
+def timed_node(name: str, node: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap a graph node to record its duration; keeps the signature LangGraph inspects."""
+
+    @functools.wraps(node)
+    async def _timed(*args: Any, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            return await node(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            METRICS.observe("node_duration_seconds", elapsed, node=name)
+            add_turn_timing(name, elapsed)
+
+    return _timed
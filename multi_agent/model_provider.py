@@ -1,19 +1,98 @@
 from __future__ import annotations
 
-from typing import Sequence
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple, Type
 
+import httpx
+from langchain_core.caches import BaseCache
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, BaseCallbackHandler
+from langchain_core.load import dumps
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable
 from langchain_core.tools import BaseTool
 from langchain_openai import ChatOpenAI
+from pydantic import BaseModel
 
-from utils.config import MODEL_NAME, OLLAMA_API_KEY, OLLAMA_BASE_URL
+from utils.config import (
+    LLM_CONNECT_TIMEOUT_SECONDS,
+    LLM_COALESCE_ENABLED,
+    LLM_KEEPALIVE_EXPIRY_SECONDS,
+    LLM_MAX_CONNECTIONS,
+    LLM_MAX_KEEPALIVE_CONNECTIONS,
+    LLM_READ_TIMEOUT_SECONDS,
+    MODEL_NAME,
+    OLLAMA_API_KEY,
+    OLLAMA_BASE_URL,
+)
 
+from .llm_cache import TieredLLMCache, cache_key, create_llm_cache
+from .llm_scheduler import scheduled_call
+from .single_flight import llm_flights
 
-def create_chat_model() -> ChatOpenAI:
-    return ChatOpenAI(
+
+class CoalescingChatOpenAI(ChatOpenAI):
+    """ChatOpenAI whose identical concurrent non-streaming calls share one request.
+
+    The key matches the LLM cache key, so coalescing covers exactly the calls
+    the cache would treat as equal. Streamed calls are not coalesced. The LLM
+    scheduler slot is taken here, after the cache lookup and by the flight
+    leader only, so cache hits and followers never occupy one.
+    """
+
+    async def _scheduled_agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]],
+        run_manager: Optional[AsyncCallbackManagerForLLMRun],
+        **kwargs: Any,
+    ) -> ChatResult:
+        async with scheduled_call():
+            return await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if not LLM_COALESCE_ENABLED:
+            return await self._scheduled_agenerate(messages, stop, run_manager, **kwargs)
+        prompt = dumps([m.model_copy(update={"id": None}) for m in messages])
+        key = cache_key(prompt, self._get_llm_string(stop=stop, **kwargs))
+        result, shared = await llm_flights.do(
+            key,
+            lambda: self._scheduled_agenerate(messages, stop, run_manager, **kwargs),
+        )
+        # Followers get their own copy; downstream code mutates message objects.
+        return result.model_copy(deep=True) if shared else result
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        async with scheduled_call():
+            async for chunk in super()._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                yield chunk
+
+
+def create_chat_model(
+    http_async_client: Optional[httpx.AsyncClient] = None,
+    callbacks: Optional[List[BaseCallbackHandler]] = None,
+    cache: Optional[BaseCache] = None,
+) -> ChatOpenAI:
+    return CoalescingChatOpenAI(
         model=MODEL_NAME,
         api_key=OLLAMA_API_KEY,
         base_url=OLLAMA_BASE_URL,
-        reasoning_effort="low"
+        reasoning_effort="low",
+        http_async_client=http_async_client,
+        callbacks=callbacks,
+        cache=cache,
+        stream_usage=True,
     )
 
 
@@ -31,3 +110,89 @@ def create_tool_model(
         tool_choice=tool_choice,
         parallel_tool_calls=parallel_tool_calls,
     )
+
+
+def create_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=LLM_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+        timeout=httpx.Timeout(
+            LLM_READ_TIMEOUT_SECONDS,
+            connect=LLM_CONNECT_TIMEOUT_SECONDS,
+        ),
+    )
+
+
+class ModelRegistry:
+    """Process-wide chat model plus the runnables derived from it.
+
+    One `ChatOpenAI` shares a pooled `httpx.AsyncClient` across every session,
+    and `with_structured_output` / `bind_tools` results are built once per
+    schema / tool set instead of on every node call.
+    """
+
+    def __init__(
+        self,
+        http_async_client: Optional[httpx.AsyncClient] = None,
+        callbacks: Optional[List[BaseCallbackHandler]] = None,
+    ) -> None:
+        self.http_async_client = http_async_client or create_http_client()
+        self.llm_cache: Optional[TieredLLMCache] = create_llm_cache()
+        self.chat_model = create_chat_model(
+            http_async_client=self.http_async_client,
+            callbacks=callbacks,
+            cache=self.llm_cache,
+        )
+        self._structured: Dict[Type[BaseModel], Runnable] = {}
+        self._with_tools: Dict[Tuple[str, ...], Runnable] = {}
+
+    def structured(self, schema: Type[BaseModel]) -> Runnable:
+        runnable = self._structured.get(schema)
+        if runnable is None:
+            runnable = self.chat_model.with_structured_output(schema)
+            self._structured[schema] = runnable
+        return runnable
+
+    def with_tools(self, tools: Sequence[BaseTool], **kwargs: Any) -> Runnable:
+        key = tuple(tool.name for tool in tools) + tuple(sorted(f"{k}={v}" for k, v in kwargs.items()))
+        runnable = self._with_tools.get(key)
+        if runnable is None:
+            runnable = self.chat_model.bind_tools(list(tools), **kwargs)
+            self._with_tools[key] = runnable
+        return runnable
+
+    async def aclose(self) -> None:
+        await self.http_async_client.aclose()
+        if self.llm_cache is not None:
+            self.llm_cache.close()
+
+
+_registry: Optional[ModelRegistry] = None
+
+
+def init_model_registry(callbacks: Optional[List[BaseCallbackHandler]] = None) -> ModelRegistry:
+    global _registry
+    if _registry is None:
+        _registry = ModelRegistry(callbacks=callbacks)
+    return _registry
+
+
+def get_model_registry() -> ModelRegistry:
+    """Return the shared registry, creating it lazily outside the server lifespan."""
+    return init_model_registry()
+
+
+def set_model_registry(registry: Any) -> None:
+    """Install a registry with the same interface (used by the offline benchmark)."""
+    global _registry
+    _registry = registry
+
+
+async def close_model_registry() -> None:
+    global _registry
+    if _registry is not None:
+        await _registry.aclose()
+        _registry = None
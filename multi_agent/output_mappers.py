@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+
+from utils.logging_utils import get_logger
+
+from .state import CalculateTotalOutput
+
+logger = get_logger("multi_agent.output_mappers")
+
+
+class MapperError(Exception):
+    """Raised when a tool result cannot be mapped deterministically."""
+
+
+ToolMapper = Callable[[Any, Dict[str, Any]], Dict[str, Any]]
+
+
+def parse_tool_envelope(raw: Any) -> Any:
+    """Unwrap what an MCP tool returned into the `_backend_request` `data` payload.
+
+    MCP adapters hand results back as JSON text (optionally as a list of
+    content blocks or a `(content, artifact)` tuple); backend tools wrap the
+    response in an `{"ok", "status_code", "error", "data"}` envelope.
+    """
+    if isinstance(raw, tuple):
+        raw = raw[0]
+    if isinstance(raw, list) and raw and isinstance(raw[0], dict) and "text" in raw[0]:
+        raw = raw[0]["text"]
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except ValueError as exc:
+            raise MapperError(f"Tool result is not JSON: {raw[:200]}") from exc
+
+    if isinstance(raw, dict) and "ok" in raw and "data" in raw:
+        if not raw["ok"]:
+            raise MapperError(f"Backend error {raw.get('status_code')}: {raw.get('error')}")
+        return raw["data"]
+    return raw
+
+
+def _menu_item(data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": data["id"],
+        "name": data["name"],
+        "price": data["price"],
+        "description": data.get("description"),
+    }
+
+
+def _order_total(order: Dict[str, Any]) -> float:
+    return float(sum(item.get("total_price", 0) for item in order.get("items", [])))
+
+
+def _map_list_menu(data: Any, args: Dict[str, Any]) -> Dict[str, Any]:
+    items = [_menu_item(item) for item in data]
+    note = None if items else f"Không tìm thấy món nào khớp với '{args.get('q', '')}'."
+    return {"items": items, "note": note}
+
+
+def _map_get_menu_item(data: Any, args: Dict[str, Any]) -> Dict[str, Any]:
+    return {"items": [_menu_item(data)]}
+
+
+def _map_create_draft_order(data: Any, args: Dict[str, Any]) -> Dict[str, Any]:
+    return {"order_id": data["id"], "status": data["status"]}
+
+
+def _map_order_item_change(message: str) -> ToolMapper:
+    def _map(data: Any, args: Dict[str, Any]) -> Dict[str, Any]:
+        return {"success": True, "order_id": data["id"], "message": message}
+    return _map
+
+
+def _map_get_order(data: Any, args: Dict[str, Any]) -> Dict[str, Any]:
+    total = _order_total(data)
+    return {
+        "order_id": data["id"],
+        "total_amount": total,
+        "orders": [{"id": data["id"], "status": data["status"], "total_amount": total}],
+        "current_order_status": data["status"],
+    }
+
+
+def _map_get_order_history(data: Any, args: Dict[str, Any]) -> Dict[str, Any]:
+    orders = [
+        {"id": order["id"], "status": order["status"], "total_amount": _order_total(order)}
+        for order in data
+    ]
+    return {
+        "orders": orders,
+        "current_order_status": orders[0]["status"] if orders else None,
+    }
+
+
+def _map_estimate_delivery_fee(data: Any, args: Dict[str, Any]) -> Dict[str, Any]:
+    return {"delivery_fee": float(data["delivery_fee"])}
+
+
+def _map_order_transition(verb: str) -> ToolMapper:
+    def _map(data: Any, args: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "result": f"Order {data['id']} {verb}. Status: {data['status']}",
+            "success": True,
+        }
+    return _map
+
+
+def _map_list_faqs(data: Any, args: Dict[str, Any]) -> Dict[str, Any]:
+    return {"answers": [f"{faq['question']} -> {faq['answer']}" for faq in data]}
+
+
+def _map_calculate_bill(data: Any, args: Dict[str, Any]) -> Dict[str, Any]:
+    return {"total_amount": float(data["total_amount"]), "breakdown": data["breakdown"]}
+
+
+TOOL_OUTPUT_MAPPERS: Dict[str, ToolMapper] = {
+    "list_menu": _map_list_menu,
+    "get_menu_item": _map_get_menu_item,
+    "create_draft_order": _map_create_draft_order,
+    "add_item_to_order": _map_order_item_change("Item added successfully"),
+    "update_order_item": _map_order_item_change("Item updated"),
+    "remove_order_item": _map_order_item_change("Item removed"),
+    "get_order": _map_get_order,
+    "get_order_history": _map_get_order_history,
+    "estimate_delivery_fee": _map_estimate_delivery_fee,
+    "cancel_order": _map_order_transition("cancelled"),
+    "confirm_order": _map_order_transition("confirmed"),
+    "list_faqs": _map_list_faqs,
+    "calculate_bill": _map_calculate_bill,
+}
+
+
+def _finalize_calculate_total(fields: Dict[str, Any]) -> Dict[str, Any]:
+    total = float(fields.get("total_amount", 0.0))
+    fee = float(fields.get("delivery_fee", 0.0))
+    fields.setdefault("delivery_fee", fee)
+    fields["final_total"] = total + fee
+    fields.setdefault("breakdown", f"{total:,.0f} + {fee:,.0f} (ship) = {total + fee:,.0f}")
+    return fields
+
+
+SCHEMA_FINALIZERS: Dict[Type[BaseModel], Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+    CalculateTotalOutput: _finalize_calculate_total,
+}
+
+
+def structure_tool_outputs(
+    target_schema: Type[BaseModel],
+    tool_results: Sequence[Tuple[str, Dict[str, Any], Any]],
+) -> Optional[BaseModel]:
+    """Build `target_schema` from raw tool results without calling the LLM.
+
+    Returns None when any tool has no mapper, a mapper fails or the merged
+    fields do not validate, so the caller can fall back to the LLM.
+    """
+    if not tool_results:
+        return None
+
+    fields: Dict[str, Any] = {}
+    for tool_name, tool_args, raw in tool_results:
+        mapper = TOOL_OUTPUT_MAPPERS.get(tool_name)
+        if mapper is None:
+            logger.info("No output mapper for tool '%s'; falling back to LLM", tool_name)
+            return None
+        try:
+            fields.update(mapper(parse_tool_envelope(raw), tool_args))
+        except (MapperError, KeyError, TypeError, ValueError) as exc:
+            logger.info("Output mapper for '%s' failed (%s); falling back to LLM", tool_name, exc)
+            return None
+
+    finalize = SCHEMA_FINALIZERS.get(target_schema)
+    if finalize is not None:
+        fields = finalize(fields)
+
+    try:
+        return target_schema(**fields)
+    except ValidationError as exc:
+        logger.info("Mapped fields do not fit %s (%s); falling back to LLM", target_schema.__name__, exc)
+        return None
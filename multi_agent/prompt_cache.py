@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Set
+from uuid import UUID, uuid4
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import LLMResult
+from langchain_core.tools import BaseTool
+from pydantic import BaseModel
+
+from utils.config import BUSINESS_CONTEXT_REFRESH_SECONDS
+from utils.logging_utils import get_logger
+
+from .business_context import refresh_business_context
+from .metrics import METRICS, add_turn_timing
+from .prompt_context import approx_tokens
+from .prompts import build_agent_messages
+from .state import OrchestratorDecision
+
+logger = get_logger("multi_agent.prompt_cache")
+
+_NODE_TO_AGENT = {
+    "orchestrator": "planner",
+    "tool_agent": "tool_agent",
+    "synthesis_agent": "synthesis",
+}
+
+
+class PromptCacheStats(BaseCallbackHandler):
+    """Per-agent server-side prompt reuse, prompt tokens and LLM latency.
+
+    The main figure is what the server reports: `cached_token_ratio` from
+    `prompt_tokens_details.cached_tokens` (vLLM, llama.cpp server), or, for
+    servers that count only the prompt tokens they actually evaluated
+    (Ollama's `prompt_eval_count`), `evaluated_prompt_ratio` - reported
+    prompt tokens over a local estimate of the full prompt; well below 1
+    means the prefix came from the KV cache. `prefix_stable_rate` is only
+    the client-side precondition: the system message (static prompt plus
+    business context) was byte-identical to that agent's previous call.
+    Prefix warmup calls (metadata `warmup=True`) are left out of every figure.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._last_prefix: Dict[str, str] = {}
+        self._inflight: Dict[UUID, tuple] = {}
+        self._warmup_runs: Set[UUID] = set()
+        self._stats: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+
+    @staticmethod
+    def _agent(metadata: Optional[Dict[str, Any]]) -> str:
+        metadata = metadata or {}
+        node = metadata.get("langgraph_node")
+        return _NODE_TO_AGENT.get(node, metadata.get("agent") or node or "unknown")
+
+    @staticmethod
+    def _is_warmup(metadata: Optional[Dict[str, Any]]) -> bool:
+        return bool((metadata or {}).get("warmup"))
+
+    @staticmethod
+    def _estimate_prompt_tokens(messages: List[BaseMessage], params: Dict[str, Any]) -> int:
+        text = "".join(str(message.content) for message in messages)
+        # Tool definitions and the response schema are part of the prompt the server evaluates.
+        extras = [params.get(key) for key in ("tools", "response_format") if params.get(key)]
+        # with_structured_output passes the pydantic class; the server sees its JSON schema.
+        extras = [extra.model_json_schema() if isinstance(extra, type) and issubclass(extra, BaseModel) else extra
+                  for extra in extras]
+        if extras:
+            text += json.dumps(extras, ensure_ascii=False, default=str)
+        return approx_tokens(text)
+
+    def on_chat_model_start(
+        self,
+        serialized: Dict[str, Any],
+        messages: List[List[BaseMessage]],
+        *,
+        run_id: UUID,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        if self._is_warmup(metadata):
+            with self._lock:
+                self._warmup_runs.add(run_id)
+            return
+        agent = self._agent(metadata)
+        batch = messages[0] if messages else []
+        first = batch[0] if batch else None
+        prefix = hashlib.sha1(str(first.content if first else "").encode("utf-8")).hexdigest()
+        estimated = self._estimate_prompt_tokens(batch, kwargs.get("invocation_params") or {})
+        with self._lock:
+            stable = self._last_prefix.get(agent) == prefix
+            self._last_prefix[agent] = prefix
+            stats = self._stats[agent]
+            stats["calls"] += 1
+            stats["prefix_stable"] += int(stable)
+            self._inflight[run_id] = (agent, time.perf_counter(), estimated)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            if run_id in self._warmup_runs:
+                self._warmup_runs.discard(run_id)
+                return
+            agent, started, estimated = self._inflight.pop(run_id, ("unknown", time.perf_counter(), 0))
+            elapsed = time.perf_counter() - started
+            stats = self._stats[agent]
+            stats["latency_ms"] += elapsed * 1000
+
+            usage = None
+            if response.generations and response.generations[0]:
+                message = getattr(response.generations[0][0], "message", None)
+                usage = getattr(message, "usage_metadata", None)
+            cached_tokens = 0
+            if usage:
+                details = usage.get("input_token_details") or {}
+                cached_tokens = details.get("cache_read", 0) or 0
+                stats["usage_calls"] += 1
+                stats["input_tokens"] += usage.get("input_tokens", 0)
+                stats["estimated_tokens"] += estimated
+                if "cache_read" in details:
+                    stats["cache_reported_calls"] += 1
+                    stats["reported_input_tokens"] += usage.get("input_tokens", 0)
+                    stats["cached_tokens"] += cached_tokens
+
+        METRICS.observe("llm_call_duration_seconds", elapsed, agent=agent)
+        add_turn_timing("llm", elapsed)
+        if usage:
+            METRICS.inc("llm_tokens_total", usage.get("input_tokens", 0), agent=agent, kind="prompt")
+            METRICS.inc("llm_tokens_total", usage.get("output_tokens", 0), agent=agent, kind="completion")
+            METRICS.inc("llm_tokens_total", cached_tokens, agent=agent, kind="cached")
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            self._inflight.pop(run_id, None)
+            self._warmup_runs.discard(run_id)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            report = {}
+            for agent, stats in self._stats.items():
+                calls = stats["calls"] or 1
+                usage_calls = stats["usage_calls"] or 1
+                report[agent] = {
+                    "calls": int(stats["calls"]),
+                    # None when the server never reported cached tokens.
+                    "cached_token_ratio": round(
+                        stats["cached_tokens"] / stats["reported_input_tokens"], 4
+                    ) if stats["reported_input_tokens"] else None,
+                    "cache_reported_calls": int(stats["cache_reported_calls"]),
+                    "evaluated_prompt_ratio": round(
+                        stats["input_tokens"] / stats["estimated_tokens"], 4
+                    ) if stats["estimated_tokens"] else None,
+                    "avg_input_tokens": round(stats["input_tokens"] / usage_calls, 1),
+                    "avg_latency_ms": round(stats["latency_ms"] / calls, 1),
+                    "prefix_stable_rate": round(stats["prefix_stable"] / calls, 4),
+                }
+            return report
+
+
+prompt_cache_stats = PromptCacheStats()
+
+
+async def warmup_prefixes(models: Any, tools: Sequence[BaseTool]) -> None:
+    """Send each agent's fixed prefix once so the server loads the model and caches it.
+
+    The planner and the tool agent go through the same bound runnables the
+    graph uses, so the response schema and tool definitions are part of
+    the warmed prefix.
+    """
+    runnables = {
+        "planner": models.structured(OrchestratorDecision),
+        "tool_agent": models.with_tools(tools),
+        "synthesis": models.chat_model,
+    }
+    for agent, runnable in runnables.items():
+        started = time.perf_counter()
+        try:
+            # A fresh nonce after the prefix: an LLM-cache hit would skip the request and leave the server cold.
+            await runnable.ainvoke(
+                build_agent_messages(agent, f"ping {uuid4().hex}"),
+                config={"metadata": {"agent": agent, "warmup": True}},
+            )
+        except Exception as exc:
+            logger.warning("Prefix warmup for '%s' failed: %s", agent, exc)
+            continue
+        logger.info("Prefix warmup for '%s' took %.2fs", agent, time.perf_counter() - started)
+
+
+async def keep_prefixes_warm(models: Any, tools: Sequence[BaseTool], tool_map: Dict[str, Any]) -> None:
+    """Warm up at startup, then re-warm whenever the menu context changes."""
+    await warmup_prefixes(models, tools)
+    while True:
+        await asyncio.sleep(BUSINESS_CONTEXT_REFRESH_SECONDS)
+        try:
+            changed = await refresh_business_context(tool_map)
+        except Exception as exc:
+            logger.warning("Business context refresh failed: %s", exc)
+            continue
+        if changed:
+            await warmup_prefixes(models, tools)
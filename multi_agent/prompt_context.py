@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.config import PLANNER_CONTEXT_TOKEN_BUDGET, SYNTHESIS_CONTEXT_TOKEN_BUDGET
+
+# Field projections per agent and action. A tuple value projects the items of a
+# list field; None keeps the field as is. Keys not listed are dropped.
+Projection = Dict[str, Optional[Tuple[str, ...]]]
+
+_ALWAYS_KEPT = ("error", "status", "reason")
+_RAW_PREVIEW_CHARS = 200
+
+PROJECTIONS: Dict[str, Dict[str, Projection]] = {
+    "planner": {
+        "search_menu": {"items": ("id", "name", "price"), "note": None},
+        "create_order": {"order_id": None},
+        "add_item": {"success": None, "order_id": None},
+        "remove_item": {"success": None, "order_id": None},
+        "calculate_total": {"final_total": None},
+        "check_order": {"orders": ("id", "status"), "current_order_status": None},
+        "cancel_order": {"success": None},
+        "confirm_order": {"success": None},
+        "ask_faq": {"answers": None},
+    },
+    "synthesis": {
+        "search_menu": {"items": ("name", "price", "description"), "note": None},
+        "create_order": {"order_id": None},
+        "add_item": {"success": None, "message": None},
+        "remove_item": {"success": None, "message": None},
+        "calculate_total": {"total_amount": None, "delivery_fee": None, "final_total": None, "breakdown": None},
+        "check_order": {"orders": ("id", "status", "total_amount"), "current_order_status": None},
+        "cancel_order": {"result": None, "success": None},
+        "confirm_order": {"result": None, "success": None},
+        "ask_faq": {"answers": None},
+    },
+}
+
+# Entries the agent no longer needs once a later step has run.
+SUPERSEDED_BY: Dict[str, Dict[str, str]] = {
+    "planner": {},
+    "synthesis": {
+        "add_item": "calculate_total",
+        "remove_item": "calculate_total",
+        "check_order": "cancel_order",
+    },
+}
+
+# Dropped first (left to right) when the budget is still exceeded after truncation.
+DROP_ORDER: Dict[str, List[str]] = {
+    "planner": ["ask_faq", "check_order", "search_menu"],
+    "synthesis": ["check_order", "create_order", "search_menu"],
+}
+
+TOKEN_BUDGETS: Dict[str, int] = {
+    "planner": PLANNER_CONTEXT_TOKEN_BUDGET,
+    "synthesis": SYNTHESIS_CONTEXT_TOKEN_BUDGET,
+}
+
+_LIST_LIMITS = (10, 5, 3, 1)
+
+
+def approx_tokens(text: str) -> int:
+    """Cheap token estimate; ~3 characters per token for Vietnamese JSON."""
+    return max(1, len(text) // 3)
+
+
+def _dumps(data: Any) -> str:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def _project(value: Any, projection: Optional[Projection]) -> Any:
+    if not isinstance(value, dict):
+        return value
+
+    projected: Dict[str, Any] = {}
+    for key in _ALWAYS_KEPT:
+        if value.get(key) is not None:
+            projected[key] = value[key]
+    if value.get("raw"):
+        projected["raw"] = str(value["raw"])[:_RAW_PREVIEW_CHARS]
+
+    if projection is None:
+        for key, field_value in value.items():
+            if key != "raw" and field_value is not None:
+                projected.setdefault(key, field_value)
+        return projected
+
+    for key, item_fields in projection.items():
+        field_value = value.get(key)
+        if field_value is None:
+            continue
+        if item_fields is not None and isinstance(field_value, list):
+            field_value = [
+                {f: item.get(f) for f in item_fields if item.get(f) is not None}
+                if isinstance(item, dict) else item
+                for item in field_value
+            ]
+        projected[key] = field_value
+    return projected
+
+
+def _truncate_lists(context: Dict[str, Any], limit: int) -> Dict[str, Any]:
+    truncated: Dict[str, Any] = {}
+    for action, value in context.items():
+        if isinstance(value, dict):
+            value = dict(value)
+            for key, field_value in value.items():
+                if isinstance(field_value, list) and len(field_value) > limit:
+                    value[key] = field_value[:limit] + [f"... (+{len(field_value) - limit})"]
+        truncated[action] = value
+    return truncated
+
+
+def build_task_context(
+    task_outputs: Optional[Dict[str, Any]],
+    agent: str,
+    budget: Optional[int] = None,
+) -> str:
+    """Render `task_outputs` for `agent`'s prompt within its token budget.
+
+    Projects each entry to the fields the agent reads, drops superseded
+    entries, then truncates long lists and finally drops whole entries in
+    DROP_ORDER until the estimate fits.
+    """
+    task_outputs = task_outputs or {}
+    budget = budget if budget is not None else TOKEN_BUDGETS[agent]
+    projections = PROJECTIONS.get(agent, {})
+    superseded = SUPERSEDED_BY.get(agent, {})
+
+    context = {
+        action: _project(value, projections.get(action))
+        for action, value in task_outputs.items()
+        if superseded.get(action) not in task_outputs
+    }
+    text = _dumps(context)
+    if approx_tokens(text) <= budget:
+        return text
+
+    for limit in _LIST_LIMITS:
+        context = _truncate_lists(context, limit)
+        text = _dumps(context)
+        if approx_tokens(text) <= budget:
+            return text
+
+    for action in DROP_ORDER.get(agent, []):
+        if action in context:
+            context.pop(action)
+            text = _dumps(context)
+            if approx_tokens(text) <= budget:
+                break
+    return text
+
+
+def build_cart_context(cart: Optional[List[Dict[str, Any]]]) -> str:
+    """Render the cart without empty fields."""
+    return _dumps([
+        {key: value for key, value in item.items() if value is not None}
+        for item in (cart or [])
+    ])
@@ -1,8 +1,11 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from typing import List, Tuple
 import os
 
+from .business_context import get_business_context
+
 def _env_or_default(key: str, default: str) -> str:
     value = os.getenv(key)
     return value if value and value.strip() else default
@@ -76,11 +79,11 @@ PLANNER_PROMPT = AgentPrompt(
         "PLANNER_USER_TEMPLATE",
         (
             "DỮ LIỆU ĐẦU VÀO:\n"
-            "1. Input: {user_input}\n"
-            "2. Queue Hiện Tại: {task_queue}\n"
-            "3. >>> TASK MEMORY: {task_outputs}\n"
-            "4. User Info: {current_user_info}\n" 
-            "5. >>> GIỎ HÀNG (CART): {current_cart}\n"
+            "1. User Info: {current_user_info}\n" 
+            "2. >>> GIỎ HÀNG (CART): {current_cart}\n"
+            "3. Queue Hiện Tại: {task_queue}\n"
+            "4. >>> TASK MEMORY: {task_outputs}\n"
+            "5. Input: {user_input}\n"
             "--------------------------------------------------\n"
             "Hãy suy nghĩ kỹ, kiểm tra Memory/Cart và cập nhật hàng đợi."
         ),
@@ -88,6 +91,14 @@ PLANNER_PROMPT = AgentPrompt(
 )
 
 
+# Appended to the planner's input when the regex pre-pass filled some fields,
+# so the planner does not spend output tokens extracting them again.
+PLANNER_PREFILLED_NOTE = (
+    "\n>>> ĐÃ TRÍCH XUẤT TỰ ĐỘNG: {fields}\n"
+    "Các trường trên đã có trong User Info/CART. KHÔNG trích xuất lại chúng trong "
+    "`extracted_info`/`extracted_cart`; chỉ ghi khi giá trị ở trên bị sai."
+)
+
 
 TOOL_AGENT_PROMPT = AgentPrompt(
     system=_env_or_default(
@@ -121,12 +132,12 @@ TOOL_AGENT_PROMPT = AgentPrompt(
     user_template=_env_or_default(
         "TOOL_AGENT_USER_TEMPLATE",
         (
-            "LỆNH TỪ ORCHESTRATOR:\n"
-            "- Next Action: {next_action}\n"
-            "- Chi tiết Plan: {plan}\n\n"
-            "----------------------------\n"
             "USER CONTEXT (Thông tin người dùng đã cung cấp):\n"
             "{user_info_str}\n"
+            "----------------------------\n"
+            "LỆNH TỪ ORCHESTRATOR:\n"
+            "- Next Action: {next_action}\n"
+            "- Chi tiết Plan: {plan}\n"
             "----------------------------\n\n"
             "Hãy thực thi Tool chính xác và trả về JSON."
         ),
@@ -161,11 +172,11 @@ SYNTHESIS_PROMPT = AgentPrompt(
     user_template=_env_or_default(
         "SYNTHESIS_USER_TEMPLATE",
         (
-            "User Input: {user_input}\n"
+            "User Info: {current_user_info}\n"
+            "Memory Data (Task Outputs): {task_outputs}\n"
             "Action Status: {next_action}\n"
             "*** REFUSAL REASON: {refusal_reason} ***\n"
-            "Memory Data (Task Outputs): {task_outputs}\n"
-            "User Info: {current_user_info}\n\n"
+            "User Input: {user_input}\n\n"
             "Hãy phản hồi khách hàng."
         ),
     ),
@@ -175,4 +186,24 @@ AGENT_PROMPTS = {
     "planner": PLANNER_PROMPT,
     "tool_agent": TOOL_AGENT_PROMPT,
     "synthesis": SYNTHESIS_PROMPT,
-}
\ No newline at end of file
+}
+
+
+PROMPT_LAYOUT_VERSION = "v2"
+
+
+def build_agent_messages(agent: str, user_content: str) -> List[Tuple[str, str]]:
+    """Assemble an agent's messages with a cache-friendly layout.
+
+    The static system prompt plus the versioned business context come first and
+    are byte-identical across turns, so the inference server can reuse their
+    KV cache; everything that changes per turn lives in the final human message.
+    """
+    system = AGENT_PROMPTS[agent].system
+    context = get_business_context()
+    if context.text:
+        system = f"{system}\n\n[{PROMPT_LAYOUT_VERSION}/{context.version}]\n{context.text}"
+    return [
+        ("system", system),
+        ("human", user_content),
+    ]
@@ -0,0 +1,202 @@
+"""Replay captured /v1/chat traffic against a running agent service.
+
+Turns captured with TURN_CAPTURE_PATH are re-sent on their original
+timeline, compressed by `--rate` (2 = twice as fast). Arrivals are open
+loop: sessions start on schedule whatever the latency of other sessions;
+only turns of the same session wait for each other, as a user would.
+
+    python -m multi_agent.replay captured.jsonl --base-url http://localhost:8100 --rate 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+from .answer_cache import BYPASS_HEADER
+
+
+@dataclass(frozen=True)
+class CapturedTurn:
+    offset: float  # seconds since the first captured turn
+    session: str
+    message: str
+
+
+def load_capture(paths: Sequence[str]) -> List[CapturedTurn]:
+    rows: List[Tuple[float, str, str]] = []
+    for path in paths:
+        with open(path, encoding="utf-8") as handle:
+            for line in handle:
+                try:
+                    record = json.loads(line)
+                    rows.append((float(record["t"]), str(record["session"]), str(record["message"])))
+                except (ValueError, KeyError, TypeError):
+                    continue
+    rows.sort()
+    if not rows:
+        return []
+    first = rows[0][0]
+    return [CapturedTurn(t - first, session, message) for t, session, message in rows]
+
+
+def build_schedule(turns: Sequence[CapturedTurn], repeat: int = 1, gap: float = 1.0) -> Dict[str, List[Tuple[float, str]]]:
+    """session -> [(offset, message)]; each repeat is appended after the previous one with new sessions."""
+    span = (turns[-1].offset if turns else 0.0) + gap
+    sessions: Dict[str, List[Tuple[float, str]]] = defaultdict(list)
+    for copy in range(repeat):
+        for turn in turns:
+            sessions[f"{turn.session}-{copy}"].append((turn.offset + copy * span, turn.message))
+    return sessions
+
+
+def _percentiles(values: Sequence[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    ordered = sorted(values)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]  # noqa: E731
+    return {
+        "p50": round(pick(0.5) * 1000, 1),
+        "p95": round(pick(0.95) * 1000, 1),
+        "p99": round(pick(0.99) * 1000, 1),
+        "max": round(ordered[-1] * 1000, 1),
+    }
+
+
+@dataclass
+class ReplayResult:
+    rate: float
+    sent: int = 0
+    ok: int = 0
+    statuses: Counter = field(default_factory=Counter)
+    latencies: List[float] = field(default_factory=list)
+    ok_latencies: List[float] = field(default_factory=list)
+    lateness: List[float] = field(default_factory=list)
+    wall_seconds: float = 0.0
+    offered_seconds: float = 0.0
+
+    @property
+    def error_rate(self) -> float:
+        return 1 - self.ok / self.sent if self.sent else 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "rate_multiplier": self.rate,
+            "sent": self.sent,
+            "ok": self.ok,
+            "error_rate": round(self.error_rate, 4),
+            "statuses": {str(status): count for status, count in self.statuses.items()},
+            "offered_rps": round(self.sent / self.offered_seconds, 2) if self.offered_seconds else None,
+            "throughput_ok_rps": round(self.ok / self.wall_seconds, 2) if self.wall_seconds else 0.0,
+            "wall_seconds": round(self.wall_seconds, 2),
+            "latency_ok_ms": _percentiles(self.ok_latencies),
+            "latency_all_ms": _percentiles(self.latencies),
+            # How far sends slipped behind the capture timeline (same-session waits or a saturated client).
+            "behind_schedule_ms": _percentiles(self.lateness),
+        }
+
+
+async def replay(
+    sessions: Dict[str, List[Tuple[float, str]]],
+    base_url: str,
+    rate: float = 1.0,
+    token: Optional[str] = None,
+    timeout: float = 120.0,
+    bypass_cache: bool = False,
+    duration: Optional[float] = None,
+    max_connections: int = 1000,
+) -> ReplayResult:
+    result = ReplayResult(rate=rate)
+    run_id = uuid.uuid4().hex[:8]
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    if bypass_cache:
+        headers[BYPASS_HEADER] = "bypass"
+    last_offset = max((offset for turns in sessions.values() for offset, _ in turns), default=0.0)
+    result.offered_seconds = min(last_offset / rate, duration or float("inf"))
+
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits, headers=headers) as client:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+
+        async def _session(session: str, turns: List[Tuple[float, str]]) -> None:
+            for offset, message in turns:
+                due = offset / rate
+                if duration is not None and due > duration:
+                    return
+                delay = started + due - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                result.lateness.append(max(0.0, -delay))
+                result.sent += 1
+                sent_at = time.perf_counter()
+                try:
+                    response = await client.post(
+                        "/v1/chat",
+                        json={"message": message, "session_id": f"replay-{run_id}-{session}"},
+                    )
+                    status: Any = response.status_code
+                except httpx.HTTPError as exc:
+                    status = type(exc).__name__
+                elapsed = time.perf_counter() - sent_at
+                result.statuses[status] += 1
+                result.latencies.append(elapsed)
+                if isinstance(status, int) and 200 <= status < 300:
+                    result.ok += 1
+                    result.ok_latencies.append(elapsed)
+
+        await asyncio.gather(*(_session(session, turns) for session, turns in sessions.items()))
+        result.wall_seconds = loop.time() - started
+    return result
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Open-loop replay of captured /v1/chat turns.")
+    parser.add_argument("capture", nargs="+", help="JSONL files written with TURN_CAPTURE_PATH")
+    parser.add_argument("--base-url", default="http://localhost:8100")
+    parser.add_argument("--rate", type=float, nargs="+", default=[1.0],
+                        help="timeline speed-up(s); several values run one after another")
+    parser.add_argument("--repeat", type=int, default=1, help="append the capture N times (fresh sessions)")
+    parser.add_argument("--duration", type=float, help="stop sending after this many seconds")
+    parser.add_argument("--token", help="Bearer token forwarded to the backend tools")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--bypass-cache", action="store_true", help=f"send {BYPASS_HEADER}: bypass")
+    parser.add_argument("--json", help="write the summaries to this file")
+    args = parser.parse_args(argv)
+
+    turns = load_capture(args.capture)
+    if not turns:
+        parser.error("no turns in the capture")
+    sessions = build_schedule(turns, repeat=args.repeat)
+    print(f"{len(turns) * args.repeat} turns in {len(sessions)} sessions over {turns[-1].offset:.0f}s of capture")
+
+    summaries = []
+    for rate in args.rate:
+        result = asyncio.run(replay(
+            sessions, args.base_url, rate=rate, token=args.token, timeout=args.timeout,
+            bypass_cache=args.bypass_cache, duration=args.duration,
+        ))
+        summary = result.summary()
+        summaries.append(summary)
+        print(
+            f"x{rate:g}: sent={summary['sent']} ok={summary['ok']} error_rate={summary['error_rate']:.2%} "
+            f"offered={summary['offered_rps']} rps throughput={summary['throughput_ok_rps']} rps "
+            f"statuses={summary['statuses']}\n"
+            f"    latency ok {summary['latency_ok_ms']}\n"
+            f"    behind schedule {summary['behind_schedule_ms']}"
+        )
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as out:
+            json.dump(summaries, out, indent=2)
+
+
+if __name__ == "__main__":
+    main()
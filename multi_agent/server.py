@@ -1,23 +1,48 @@
 from __future__ import annotations
 
+import asyncio
+import contextlib
+import contextvars
+import time
 import uuid
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Awaitable, Dict, Iterable, List, Optional, Tuple
 
-from fastapi import FastAPI, HTTPException,Request
+from fastapi import FastAPI, HTTPException,Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from contextlib import asynccontextmanager
 from langchain_mcp_adapters.client import MultiServerMCPClient
-from langgraph.checkpoint.memory import MemorySaver
-from langchain_core.messages import HumanMessage
+from langchain_core.messages import AIMessage, HumanMessage
 
 from utils.logging_utils import get_logger
 from .graph import workflow
-from .state import AgentState
+from .history import compact_history
+from .state import AgentState, OrchestratorDecision
 from fastapi.middleware.cors import CORSMiddleware
 
-from utils.config import MCP_SERVER_ID, MCP_SERVER_URL
+from utils.config import (
+    ANSWER_CACHE_ENABLED,
+    DISCONNECT_POLL_SECONDS,
+    MAX_ITERATIONS,
+    MCP_SERVER_ID,
+    MCP_SERVER_URL,
+    TIMING_HEADER_ENABLED,
+)
 from .tools_utils import load_tools
+from .model_provider import close_model_registry, get_model_registry, init_model_registry
+from .answer_cache import BYPASS_HEADER, BYPASS_VALUES, answer_cache, is_stateless
+from .business_context import get_business_context, refresh_business_context
+from .prompt_cache import keep_prefixes_warm, prompt_cache_stats
+from .single_flight import coalescing_stats
+from .session_gate import SessionQueueFull, session_gate
+from .llm_scheduler import SchedulerOverloaded, llm_scheduler
+from .turn_budget import new_deadline
+from .metrics import METRICS, GaugeSample, server_timing_header, start_turn_timings
+from .tool_dispatch import DISPATCH_STATS
+from .checkpointers import checkpointer_stats, close_checkpointer, create_checkpointer
 from .graph import workflow
+from .streaming import format_sse, stream_graph_events
+from .turn_capture import turn_capture
 
 mcp_client = MultiServerMCPClient(
     {
@@ -44,12 +69,27 @@ async def lifespan(app: FastAPI):
 
         app.state.mcp_tools = tools_list
         app.state.mcp_tool_map = tool_map_dict
+
+        await refresh_business_context(tool_map_dict)
+
+        models = init_model_registry(callbacks=[prompt_cache_stats])
+        models.structured(OrchestratorDecision)
+        models.with_tools(tools_list)
+        warmup_task = asyncio.create_task(keep_prefixes_warm(models, tools_list, tool_map_dict))
         
 
-        memory = MemorySaver()
-        app.state.graph = workflow.compile(checkpointer=memory)
+        checkpointer = create_checkpointer()
+        app.state.checkpointer = checkpointer
+        app.state.graph = workflow.compile(checkpointer=checkpointer)
         
         yield
+
+        warmup_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await warmup_task
+        await close_model_registry()
+        await close_checkpointer(checkpointer)
+        turn_capture.close()
         
     print("🛑 MCP Connection closed.")
 
@@ -90,14 +130,7 @@ async def health() -> Dict[str, str]:
     return {"status": "ok"}
 
 
-@app.post("/v1/chat", response_model=ChatResponse)
-async def run_multi_agent(request: Request, body: ChatRequest) -> ChatResponse:
-    session_id = body.session_id or str(uuid.uuid4())
-    logger.info(
-        "run_multi_agent: received request",
-        extra={"session_id": session_id},
-    )
-
+def _build_turn(request: Request, body: ChatRequest, session_id: str):
     mcp_tools = request.app.state.mcp_tools
     mcp_tool_map = request.app.state.mcp_tool_map
 
@@ -113,39 +146,338 @@ async def run_multi_agent(request: Request, body: ChatRequest) -> ChatResponse:
             "thread_id": session_id,      # Cho checkpointer
             "mcp_tools": mcp_tools,           
             "mcp_tool_map": mcp_tool_map,      
-            "backend_access_token": auth_token 
-        }
+            "backend_access_token": auth_token,
+            "deadline": new_deadline(),       # per-turn wall-clock budget
+        },
+        # Backstop only; MAX_ITERATIONS is enforced by the orchestrator.
+        "recursion_limit": 2 * MAX_ITERATIONS + 10,
     }
 
     input_data = {
         "user_input": body.message,
         "messages": [HumanMessage(content=body.message)]
     }
+    return input_data, config
+
+
+@app.get("/sessions/stats")
+async def session_stats(request: Request) -> Dict[str, Any]:
+    return checkpointer_stats(request.app.state.checkpointer)
+
+
+@app.get("/prompt_cache/stats")
+async def prompt_cache_report() -> Dict[str, Any]:
+    return prompt_cache_stats.snapshot()
+
+
+@app.get("/llm_cache/stats")
+async def llm_cache_report() -> Dict[str, Any]:
+    cache = get_model_registry().llm_cache
+    return cache.stats() if cache is not None else {"mode": "off"}
+
+
+@app.get("/coalescing/stats")
+async def coalescing_report() -> Dict[str, Any]:
+    return coalescing_stats()
+
+
+@app.get("/answer_cache/stats")
+async def answer_cache_report() -> Dict[str, Any]:
+    return answer_cache.stats()
+
+
+async def _cached_answer(graph: Any, body: ChatRequest, config: Dict[str, Any]) -> Optional[str]:
+    """Serve a stateless turn from the answer cache and record it in the session."""
+    snapshot = await graph.aget_state(config)
+    if not is_stateless(snapshot.values):
+        return None
+    answer = answer_cache.get(body.message, get_business_context().data_version)
+    if answer is None:
+        return None
+    # Keep the session history coherent for follow-up turns without running the graph,
+    # with the same retention policy synthesis_agent applies.
+    turn = [HumanMessage(content=body.message), AIMessage(content=answer)]
+    removals, summary = compact_history(
+        list(snapshot.values.get("messages", [])) + turn,
+        snapshot.values.get("conversation_summary"),
+    )
+    await graph.aupdate_state(
+        config,
+        {
+            "user_input": body.message,
+            "messages": removals + turn,
+            "conversation_summary": summary,
+        },
+        as_node="synthesis_agent",
+    )
+    return answer
+
+
+class ClientDisconnected(RuntimeError):
+    """The HTTP client went away before the turn finished."""
+
+
+async def _until_disconnect(request: Request, awaitable: Awaitable[Any]) -> Any:
+    """Await on behalf of one client, giving up if that client disconnects.
+
+    Only this client's wait is cancelled; a coalesced turn shared with other
+    clients keeps running, and SingleFlight stops it once its last waiter is gone.
+    """
+    waiter = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({waiter}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return waiter.result()
+            if await request.is_disconnected():
+                waiter.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await waiter
+                raise ClientDisconnected("client disconnected")
+    finally:
+        if not waiter.done():
+            waiter.cancel()
+
+
+async def _frames_until_disconnect(request: Request, frames: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Relay `frames`, checking for a disconnect while waiting on each one.
+
+    The source is always closed on exit, which closes the graph's event
+    stream and cancels the run even if the client left mid-LLM call.
+    """
+    # Every step runs in one context, as if the source were iterated in place.
+    context = contextvars.copy_context()
+    loop = asyncio.get_running_loop()
+
+    async def _next() -> str:
+        return await frames.__anext__()
+
+    async with contextlib.aclosing(frames):
+        while True:
+            step = loop.create_task(_next(), context=context)
+            disconnected = False
+            try:
+                while not step.done():
+                    await asyncio.wait({step}, timeout=DISCONNECT_POLL_SECONDS)
+                    if not step.done() and await request.is_disconnected():
+                        disconnected = True
+                        break
+            finally:
+                if not step.done():
+                    step.cancel()
+                    with contextlib.suppress(asyncio.CancelledError):
+                        await step
+            if disconnected:
+                raise ClientDisconnected("client disconnected")
+            try:
+                frame = step.result()
+            except StopAsyncIteration:
+                return
+            yield frame
+
+
+async def _run_turn(graph: Any, body: ChatRequest, input_data: Dict[str, Any], config: Dict[str, Any], use_cache: bool) -> Tuple[str, str]:
+    """Run one turn (or serve it from the answer cache); returns (answer, cache status)."""
+    started = time.perf_counter()
+    if not use_cache:
+        answer_cache.record_bypass()
+        cache_status = "bypass"
+    else:
+        # Read before the graph runs: the turn itself may refresh the version.
+        data_version = get_business_context().data_version
+        cached = await _cached_answer(graph, body, config)
+        if cached is not None:
+            METRICS.observe("turn_duration_seconds", time.perf_counter() - started, outcome="cache_hit")
+            return cached, "hit"
+        cache_status = "miss"
+
+    result = await graph.ainvoke(input_data, config=config)
+
+    METRICS.observe(
+        "turn_duration_seconds",
+        time.perf_counter() - started,
+        outcome="degraded" if result.get("budget_exhausted") else "ok",
+    )
+    METRICS.observe("turn_iterations", result.get("iterations") or 0)
+    METRICS.observe("turn_tool_calls", result.get("tool_calls_made") or 0)
+
+    last_msg = result["messages"][-1]
+
+    # Only single-step fast-path answers depend on nothing but the question and the data;
+    # a session with customer details may have had them woven into the answer.
+    if use_cache and result.get("intent_fast_path") and not result.get("warning") and is_stateless(result):
+        answer_cache.put(body.message, data_version, last_msg.content)
+
+    logger.info(
+        "run_multi_agent: completed",
+        extra={
+            "session_id": config["configurable"]["thread_id"],
+            "has_warning": bool(result.get("warning")),
+        },
+    )
+    return last_msg.content, cache_status
+
+
+def _numeric_gauges(prefix: str, help_text: str, stats: Dict[str, Any], **labels: Any) -> Iterable[GaugeSample]:
+    for key, value in stats.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield f"{prefix}_{key}", help_text, labels, value
+
+
+def _collect_runtime_metrics() -> Iterable[GaugeSample]:
+    """Expose the stats the caches, scheduler and stores already keep."""
+    yield from _numeric_gauges("answer_cache", "Final-answer cache.", answer_cache.stats())
+    llm_cache = get_model_registry().llm_cache
+    if llm_cache is not None:
+        yield from _numeric_gauges("llm_cache", "Exact-match LLM call cache.", llm_cache.stats())
+    for agent, stats in prompt_cache_stats.snapshot().items():
+        yield from _numeric_gauges("prompt_prefix", "Prompt prefix reuse per agent.", stats, agent=agent)
+    for kind, stats in coalescing_stats().items():
+        yield from _numeric_gauges("coalescing", "Single-flight coalescing.", stats, kind=kind)
+    for action, modes in list(DISPATCH_STATS.items()):
+        for mode, count in modes.items():
+            yield "tool_dispatch", "Tool steps by action and dispatch mode (direct/llm).", {"action": action, "mode": mode}, count
+    scheduler = llm_scheduler.stats()
+    yield from _numeric_gauges("llm_scheduler", "LLM scheduler.", scheduler)
+    for outcome, count in scheduler["outcomes"].items():
+        yield "llm_scheduler_outcome", "LLM scheduler outcomes.", {"outcome": outcome}, count
+    yield from _numeric_gauges("session_gate", "Per-session turn serialization.", session_gate.stats())
+    checkpointer = getattr(app.state, "checkpointer", None)
+    if checkpointer is not None:
+        yield from _numeric_gauges("checkpointer", "Session checkpoint store.", checkpointer_stats(checkpointer))
+
+
+METRICS.register_collector(_collect_runtime_metrics)
+
+
+@app.get("/metrics")
+async def metrics() -> PlainTextResponse:
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4")
+
+
+def _session_busy(exc: SessionQueueFull) -> HTTPException:
+    return HTTPException(status_code=429, detail=str(exc), headers={"Retry-After": "1"})
+
+
+def _overloaded(exc: SchedulerOverloaded) -> HTTPException:
+    return HTTPException(status_code=429, detail=str(exc), headers={"Retry-After": str(exc.retry_after)})
+
+
+def _check_admission() -> None:
+    """Turn traffic away up front while the LLM queue is already full."""
+    if llm_scheduler.is_saturated():
+        llm_scheduler.outcomes["rejected_at_admission"] += 1
+        raise _overloaded(SchedulerOverloaded("LLM queue is full", llm_scheduler.retry_after()))
+
+
+@app.get("/llm_scheduler/stats")
+async def llm_scheduler_report() -> Dict[str, Any]:
+    return llm_scheduler.stats()
+
+
+@app.get("/sessions/gate/stats")
+async def session_gate_report() -> Dict[str, Any]:
+    return session_gate.stats()
+
+
+@app.get("/turn_capture/stats")
+async def turn_capture_report() -> Dict[str, Any]:
+    return turn_capture.stats()
+
+
+@app.post("/v1/chat", response_model=ChatResponse)
+async def run_multi_agent(request: Request, response: Response, body: ChatRequest) -> ChatResponse:
+    session_id = body.session_id or str(uuid.uuid4())
+    logger.info(
+        "run_multi_agent: received request",
+        extra={"session_id": session_id},
+    )
+
+    # No-op unless TURN_CAPTURE_PATH is set.
+    with turn_capture.capture(session_id, body.message) as captured:
+        return await _chat_turn(request, response, body, session_id, captured)
+
+
+async def _chat_turn(request: Request, response: Response, body: ChatRequest, session_id: str, captured: Dict[str, Any]) -> ChatResponse:
+    _check_admission()
+    input_data, config = _build_turn(request, body, session_id)
+    use_cache = ANSWER_CACHE_ENABLED and request.headers.get(BYPASS_HEADER, "").lower() not in BYPASS_VALUES
 
     try:
         
         graph = request.app.state.graph
-        
-        result = await graph.ainvoke(input_data, config=config)
-        
-        last_msg = result["messages"][-1]
-        
-        logger.info(
-            "run_multi_agent: completed",
-            extra={
-                "session_id": session_id,
-                "has_warning": bool(result.get("warning")),
-            },
-        )
+
+        timings = None
+        if TIMING_HEADER_ENABLED or request.headers.get("X-Debug-Timing") == "1":
+            timings = start_turn_timings()
+        started = time.perf_counter()
+
+        # One turn per session at a time; a duplicate in-flight message shares its result.
+        # Each request watches its own connection: the shared turn is cancelled only
+        # when every request waiting on it has disconnected.
+        answer, cache_status = await _until_disconnect(request, session_gate.run(
+            session_id,
+            body.message,
+            lambda: _run_turn(graph, body, input_data, config, use_cache),
+        ))
+        response.headers[BYPASS_HEADER] = cache_status
+        captured["cache"] = cache_status
+        if timings is not None:
+            timings["total"] = time.perf_counter() - started
+            response.headers["Server-Timing"] = server_timing_header(timings)
+        if cache_status == "hit":
+            logger.info("run_multi_agent: answer cache hit", extra={"session_id": session_id})
 
         return ChatResponse(
-            response=last_msg.content,
+            response=answer,
             session_id=session_id
         )
         
 
+    except SessionQueueFull as e:
+        raise _session_busy(e)
+    except SchedulerOverloaded as e:
+        raise _overloaded(e)
+    except ClientDisconnected:
+        logger.info("run_multi_agent: client disconnected, turn cancelled", extra={"session_id": session_id})
+        # Nobody is listening; 499 is the conventional "client closed request" code.
+        raise HTTPException(status_code=499, detail="Client disconnected")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/v1/chat/stream")
+async def stream_multi_agent(request: Request, body: ChatRequest) -> StreamingResponse:
+    session_id = body.session_id or str(uuid.uuid4())
+    logger.info(
+        "stream_multi_agent: received request",
+        extra={"session_id": session_id},
+    )
 
+    _check_admission()
+    input_data, config = _build_turn(request, body, session_id)
+    graph = request.app.state.graph
+
+    if session_gate.is_full(session_id):
+        raise _session_busy(SessionQueueFull(f"Session {session_id} has too many pending turns"))
+
+    async def _serialized_events():
+        try:
+            async with session_gate.turn(session_id):
+                frames = stream_graph_events(graph, input_data, config, session_id)
+                async with contextlib.aclosing(_frames_until_disconnect(request, frames)) as relayed:
+                    async for frame in relayed:
+                        yield frame
+        except SessionQueueFull as exc:
+            yield format_sse("error", {"detail": str(exc), "session_id": session_id})
+        except ClientDisconnected:
+            logger.info("stream_multi_agent: client disconnected", extra={"session_id": session_id})
+
+    return StreamingResponse(
+        _serialized_events(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        },
+    )
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict
+
+from utils.config import SESSION_MAX_PENDING_TURNS
+from utils.logging_utils import get_logger
+
+from .single_flight import SingleFlight
+
+logger = get_logger("multi_agent.session_gate")
+
+
+class SessionQueueFull(RuntimeError):
+    """Too many turns are already running or queued for one session."""
+
+
+class SessionGate:
+    """Serialize turns per session_id.
+
+    A turn waits for the session's previous turns, so two requests never run
+    the graph on the same thread_id at once. An exact duplicate of a message
+    still in flight (double click, client retry) joins that turn's result
+    instead of queueing a second one.
+    """
+
+    def __init__(self, max_pending: int = SESSION_MAX_PENDING_TURNS) -> None:
+        self.max_pending = max_pending
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._pending: Counter = Counter()
+        self._duplicates = SingleFlight("session_turns")
+        self.serialized = 0
+        self.rejected = 0
+
+    def is_full(self, session_id: str) -> bool:
+        return self.max_pending > 0 and self._pending[session_id] >= self.max_pending
+
+    def _reserve(self, session_id: str) -> None:
+        if self.is_full(session_id):
+            self.rejected += 1
+            raise SessionQueueFull(f"Session {session_id} already has {self._pending[session_id]} pending turns")
+        self._pending[session_id] += 1
+        if self._pending[session_id] > 1:
+            self.serialized += 1
+
+    def _release(self, session_id: str) -> None:
+        self._pending[session_id] -= 1
+        if self._pending[session_id] <= 0:
+            del self._pending[session_id]
+            self._locks.pop(session_id, None)
+
+    @asynccontextmanager
+    async def _hold(self, session_id: str) -> AsyncIterator[None]:
+        """Wait for the session's lock (the caller owns the reservation)."""
+        lock = self._locks.setdefault(session_id, asyncio.Lock())
+        async with lock:
+            yield
+
+    @asynccontextmanager
+    async def turn(self, session_id: str) -> AsyncIterator[None]:
+        """Reserve a slot and hold the session for the duration of the block."""
+        self._reserve(session_id)
+        try:
+            async with self._hold(session_id):
+                yield
+        finally:
+            self._release(session_id)
+
+    async def run(self, session_id: str, message: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        key = (session_id, message.strip())
+        released = key in self._duplicates
+        if not released:
+            # Reserve now, not when the task starts, so the overflow check is exact.
+            self._reserve(session_id)
+        else:
+            logger.info("Duplicate message joined the in-flight turn", extra={"session_id": session_id})
+
+        def _release_once() -> None:
+            nonlocal released
+            if not released:
+                released = True
+                self._release(session_id)
+
+        async def _serialized() -> Any:
+            try:
+                async with self._hold(session_id):
+                    return await fn()
+            finally:
+                _release_once()
+
+        # The done callback covers a task cancelled before its first step,
+        # when the finally above never runs.
+        result, _ = await self._duplicates.do(key, _serialized, on_done=_release_once)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        duplicates = self._duplicates.stats()
+        return {
+            "active_sessions": len(self._pending),
+            "pending_turns": sum(self._pending.values()),
+            "max_pending_per_session": self.max_pending,
+            "serialized": self.serialized,
+            "duplicates_coalesced": duplicates["coalesced"],
+            "rejected": self.rejected,
+        }
+
+
+session_gate = SessionGate()
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from utils.logging_utils import get_logger
+
+logger = get_logger("multi_agent.single_flight")
+
+
+class SingleFlight:
+    """Share one in-flight call between concurrent callers with the same key.
+
+    The first caller starts the work as a task; callers arriving before it
+    finishes await the same task. Each caller awaits through `shield`, so a
+    cancelled request does not cancel the call the others are waiting on;
+    when the last waiter is cancelled, the call itself is cancelled.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        # key -> (task, number of callers awaiting it)
+        self._in_flight: Dict[Hashable, List[Any]] = {}
+        self.calls = 0
+        self.executions = 0
+        self.cancelled = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._in_flight
+
+    async def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], Awaitable[Any]],
+        on_done: Optional[Callable[[], None]] = None,
+    ) -> Tuple[Any, bool]:
+        """Run `fn` once per key at a time; returns (result, shared).
+
+        `on_done` runs once the call finishes, fails or is cancelled, and only
+        if this caller started it, even when the task never got to run.
+        """
+        self.calls += 1
+        flight = self._in_flight.get(key)
+        shared = flight is not None
+        if flight is None:
+            self.executions += 1
+            flight = [asyncio.ensure_future(fn()), 0]
+            self._in_flight[key] = flight
+            flight[0].add_done_callback(lambda _: self._forget(key, flight))
+            if on_done is not None:
+                flight[0].add_done_callback(lambda _: on_done())
+        else:
+            logger.debug("%s: joined in-flight call", self.name)
+        task = flight[0]
+        flight[1] += 1
+        try:
+            return await asyncio.shield(task), shared
+        except asyncio.CancelledError:
+            if flight[1] == 1 and not task.done():
+                # Nobody else wants the result: stop the LLM/tool call too.
+                self._forget(key, flight)
+                task.cancel()
+                self.cancelled += 1
+            raise
+        finally:
+            flight[1] -= 1
+
+    def _forget(self, key: Hashable, flight: List[Any]) -> None:
+        if self._in_flight.get(key) is flight:
+            del self._in_flight[key]
+
+    def stats(self) -> Dict[str, Any]:
+        coalesced = self.calls - self.executions
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": coalesced,
+            "cancelled": self.cancelled,
+            "coalescing_ratio": round(coalesced / self.calls, 4) if self.calls else 0.0,
+            "in_flight": len(self._in_flight),
+        }
+
+
+tool_flights = SingleFlight("tools")
+llm_flights = SingleFlight("llm")
+
+
+def coalescing_stats() -> Dict[str, Dict[str, Any]]:
+    return {"tools": tool_flights.stats(), "llm": llm_flights.stats()}
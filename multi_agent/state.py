@@ -90,6 +90,7 @@ class OrchestratorDecision(BaseModel):
 
 class AgentState(TypedDict):
     messages: Annotated[List[BaseMessage], add_messages]
+    conversation_summary: Optional[str]
     user_input: str
 
     task_queue: List[str]
@@ -102,8 +103,14 @@ class AgentState(TypedDict):
     cart: List[Dict[str, Any]]
     should_clear_memory: bool
     refusal_reason: Optional[str]
+    intent_fast_path: bool
 
-    next_step: Literal["tool_agent", "synthesis_agent"]
+    # per-turn budget counters, reset by the entry node
+    iterations: int
+    tool_calls_made: int
+    budget_exhausted: Optional[str]
+
+    next_step: Literal["orchestrator", "tool_agent", "synthesis_agent"]
 
 
 
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import json
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Dict, Optional
+
+from utils.logging_utils import get_logger
+
+logger = get_logger("multi_agent.streaming")
+
+
+NODE_PROGRESS_LABELS: Dict[str, str] = {
+    "orchestrator": "Đang phân tích yêu cầu...",
+    "synthesis_agent": "Đang soạn câu trả lời...",
+}
+
+ACTION_PROGRESS_LABELS: Dict[str, str] = {
+    "search_menu": "Đang tìm món trong thực đơn...",
+    "get_details": "Đang xem chi tiết món...",
+    "create_order": "Đang tạo đơn hàng...",
+    "add_item": "Đang thêm món vào đơn...",
+    "remove_item": "Đang bỏ món khỏi đơn...",
+    "calculate_total": "Đang tính tổng tiền...",
+    "check_user_info": "Đang kiểm tra thông tin khách hàng...",
+    "check_order": "Đang kiểm tra đơn hàng...",
+    "cancel_order": "Đang hủy đơn hàng...",
+    "confirm_order": "Đang xác nhận đơn hàng...",
+    "ask_faq": "Đang tra cứu câu hỏi thường gặp...",
+}
+
+STREAMED_NODE = "synthesis_agent"
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Encode one Server-Sent-Events frame."""
+    payload = json.dumps(data, ensure_ascii=False)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+def _progress_label(node: str, node_input: Any) -> Optional[str]:
+    if node == "tool_agent":
+        action = node_input.get("next_action") if isinstance(node_input, dict) else None
+        return ACTION_PROGRESS_LABELS.get(action, "Đang thực hiện tác vụ...")
+    return NODE_PROGRESS_LABELS.get(node)
+
+
+async def stream_graph_events(
+    graph: Any,
+    input_data: Dict[str, Any],
+    config: Dict[str, Any],
+    session_id: str,
+) -> AsyncIterator[str]:
+    """Drive one chat turn and yield SSE frames.
+
+    Emits `progress` when a graph node starts, `token` for every chunk
+    generated by the synthesis agent, then a single `done` frame carrying the
+    final response (or `error` if the turn failed).
+    """
+    yield format_sse("start", {"session_id": session_id})
+
+    streamed_tokens = []
+    try:
+        # aclosing: when this generator is closed early, the graph run is closed with it.
+        events = graph.astream_events(input_data, config=config, version="v2")
+        async with aclosing(events):
+            async for event in events:
+                kind = event["event"]
+                metadata = event.get("metadata", {})
+                node = metadata.get("langgraph_node")
+
+                if kind == "on_chain_start" and node and event.get("name") == node:
+                    label = _progress_label(node, event.get("data", {}).get("input"))
+                    if label:
+                        yield format_sse("progress", {"node": node, "message": label})
+
+                elif kind == "on_chat_model_stream" and node == STREAMED_NODE:
+                    chunk = event["data"]["chunk"]
+                    text = chunk.content if isinstance(chunk.content, str) else ""
+                    if text:
+                        streamed_tokens.append(text)
+                        yield format_sse("token", {"content": text})
+
+        snapshot = await graph.aget_state(config)
+        messages = snapshot.values.get("messages", []) if snapshot else []
+        response = messages[-1].content if messages else "".join(streamed_tokens)
+
+    except Exception as e:
+        logger.exception(
+            "stream_graph_events: failed",
+            extra={"session_id": session_id},
+        )
+        error = {"detail": str(e), "session_id": session_id}
+        if getattr(e, "retry_after", None):
+            # LLM queue overload: tell the client when to retry.
+            error["retry_after"] = e.retry_after
+        yield format_sse("error", error)
+        return
+
+    yield format_sse("done", {"response": response, "session_id": session_id})
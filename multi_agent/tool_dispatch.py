@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import re
+import uuid
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+from utils.logging_utils import get_logger
+
+from .business_context import get_business_context
+from .fast_extract import mentioned_dishes
+
+logger = get_logger("multi_agent.tool_dispatch")
+
+_ORDER_ID_IN_PLAN = re.compile(
+    r"(?:order[_ ]?id\D{0,5}|(?:order|đơn(?: hàng)?)\s*(?:số\s*#?|#)\s*)(\d+)",
+    re.IGNORECASE,
+)
+
+ToolCall = Dict[str, Any]
+Dispatcher = Callable[[Dict[str, Any]], Optional[List[ToolCall]]]
+
+# action -> {"direct": n, "llm": n}
+DISPATCH_STATS: Dict[str, Counter] = defaultdict(Counter)
+
+
+def record_dispatch(action: str, mode: str) -> None:
+    DISPATCH_STATS[action][mode] += 1
+    logger.info("tool dispatch: action=%s mode=%s", action, mode)
+
+
+def _call(name: str, **args: Any) -> ToolCall:
+    return {"name": name, "args": args, "id": f"direct_{uuid.uuid4().hex[:12]}", "type": "tool_call"}
+
+
+def planned_order_id(state: Dict[str, Any]) -> Optional[int]:
+    """Order id the planner named in its plan ("order_id 3", "đơn số 3", "order #3")."""
+    match = _ORDER_ID_IN_PLAN.search(state.get("planner_plan", "") or "")
+    return int(match.group(1)) if match else None
+
+
+def stored_order_id(state: Dict[str, Any]) -> Optional[int]:
+    """Order id left in `task_outputs` by earlier tool steps."""
+    outputs = state.get("task_outputs", {}) or {}
+    for action in ("create_order", "add_item", "remove_item"):
+        order_id = (outputs.get(action) or {}).get("order_id")
+        if order_id:
+            return int(order_id)
+
+    orders = (outputs.get("check_order") or {}).get("orders") or []
+    if len(orders) == 1:
+        return int(orders[0]["id"])
+    return None
+
+
+def resolve_order_id(state: Dict[str, Any]) -> Optional[int]:
+    """Find the order the current turn is working on.
+
+    An id the planner names wins over outputs stored by earlier tool steps.
+    """
+    planned = planned_order_id(state)
+    return planned if planned is not None else stored_order_id(state)
+
+
+def _dispatch_search_menu(state: Dict[str, Any]) -> Optional[List[ToolCall]]:
+    cart = state.get("cart", []) or []
+    missing = [item for item in cart if not item.get("item_id")]
+    if not cart:
+        menu = get_business_context().menu
+        dishes = (
+            mentioned_dishes(state.get("planner_plan", "") or "", menu)
+            or mentioned_dishes(state.get("user_input", "") or "", menu)
+        )
+        if len(dishes) == 1:
+            return [_call("list_menu", q=dishes[0])]
+        # Several dishes: the whole menu answers it.
+        return [_call("list_menu")] if dishes else None
+    if len(missing) == 1:
+        return [_call("list_menu", q=missing[0]["item_name"])]
+    # The menu is small, so a full listing resolves several names in one call.
+    return [_call("list_menu")]
+
+
+def _dispatch_create_order(state: Dict[str, Any]) -> Optional[List[ToolCall]]:
+    address = (state.get("user_info", {}) or {}).get("address")
+    if not address:
+        return None
+    return [_call("create_draft_order", address=address)]
+
+
+def _dispatch_add_item(state: Dict[str, Any]) -> Optional[List[ToolCall]]:
+    cart = state.get("cart", []) or []
+    order_id = resolve_order_id(state)
+    # A second add_item in the same order is an edit whose delta only the plan describes.
+    if not cart or order_id is None or (state.get("task_outputs", {}) or {}).get("add_item"):
+        return None
+    if any(not item.get("item_id") for item in cart):
+        return None
+    return [
+        _call(
+            "add_item_to_order",
+            order_id=order_id,
+            item_id=int(item["item_id"]),
+            quantity=int(item.get("quantity") or 1),
+        )
+        for item in cart
+    ]
+
+
+def _dispatch_calculate_total(state: Dict[str, Any]) -> Optional[List[ToolCall]]:
+    order_id = resolve_order_id(state)
+    if order_id is None:
+        return None
+    return [_call("get_order", order_id=order_id), _call("estimate_delivery_fee", order_id=order_id)]
+
+
+def _dispatch_check_order(state: Dict[str, Any]) -> Optional[List[ToolCall]]:
+    order_id = resolve_order_id(state)
+    if order_id is None:
+        return [_call("get_order_history", limit=5)]
+    return [_call("get_order", order_id=order_id)]
+
+
+def _dispatch_order_transition(tool_name: str) -> Dispatcher:
+    def _dispatch(state: Dict[str, Any]) -> Optional[List[ToolCall]]:
+        planned, stored = planned_order_id(state), stored_order_id(state)
+        # Cancelling or confirming the wrong order cannot be undone; let the LLM decide.
+        if planned is not None and stored is not None and planned != stored:
+            return None
+        order_id = planned if planned is not None else stored
+        if order_id is None:
+            return None
+        return [_call(tool_name, order_id=order_id)]
+    return _dispatch
+
+
+def _dispatch_ask_faq(state: Dict[str, Any]) -> Optional[List[ToolCall]]:
+    return [_call("list_faqs")]
+
+
+ACTION_DISPATCHERS: Dict[str, Dispatcher] = {
+    "search_menu": _dispatch_search_menu,
+    "create_order": _dispatch_create_order,
+    "add_item": _dispatch_add_item,
+    "calculate_total": _dispatch_calculate_total,
+    "check_order": _dispatch_check_order,
+    "cancel_order": _dispatch_order_transition("cancel_order"),
+    "confirm_order": _dispatch_order_transition("confirm_order"),
+    "ask_faq": _dispatch_ask_faq,
+}
+
+
+def plan_tool_calls(
+    action: str,
+    state: Dict[str, Any],
+    available_tools: Dict[str, Any],
+) -> Optional[List[ToolCall]]:
+    """Build the tool calls for `action` straight from state.
+
+    Returns None when the arguments are ambiguous or a required tool is not
+    exposed by the MCP server; the caller then lets the LLM choose.
+    """
+    dispatcher = ACTION_DISPATCHERS.get(action)
+    if dispatcher is None:
+        return None
+    try:
+        calls = dispatcher(state)
+    except (KeyError, TypeError, ValueError) as exc:
+        logger.info("Direct dispatch for '%s' failed (%s); falling back to LLM", action, exc)
+        return None
+    if not calls or any(call["name"] not in available_tools for call in calls):
+        return None
+    return calls
@@ -1,17 +1,34 @@
 from __future__ import annotations
 
+import json
 import time
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 import asyncio
 
 from langchain_core.tools import BaseTool
 from langchain_mcp_adapters.tools import load_mcp_tools
 
-from utils.config import TOOL_MAX_RETRIES, TOOL_TIMEOUT_SECONDS
+from utils.config import TOOL_COALESCE_ENABLED, TOOL_MAX_CONCURRENCY, TOOL_MAX_RETRIES, TOOL_TIMEOUT_SECONDS
 from utils.logging_utils import get_logger
 
+from .metrics import METRICS, add_turn_timing
+from .single_flight import tool_flights
+
 logger = get_logger("tools_utils")
 
+# Tools without side effects on the backend; safe to run concurrently.
+READ_ONLY_TOOLS = frozenset({
+    "backend_health",
+    "list_categories",
+    "list_menu",
+    "get_menu_item",
+    "list_faqs",
+    "get_order_history",
+    "get_order",
+    "estimate_delivery_fee",
+    "calculate_bill",
+})
+
 
 async def load_tools(session: Any) -> Tuple[List[BaseTool], Dict[str, BaseTool], float]:
 
@@ -31,7 +48,6 @@ async def invoke_tool(
 ) -> Any:
 
 
-    last_error: Exception | None = None
     merged_args: Dict[str, Any] = dict(args)
     tool_name = getattr(tool, "name", "unknown")
 
@@ -50,26 +66,105 @@ async def invoke_tool(
             return await tool.ainvoke(merged_args)
         return await asyncio.to_thread(tool.invoke, merged_args)
 
-    for attempt in range(TOOL_MAX_RETRIES + 1):
-        try:
-            logger.info(f"🔨 Calling Tool: {tool_name} (Attempt {attempt+1})")
-            return await asyncio.wait_for(_run_once(), timeout=TOOL_TIMEOUT_SECONDS)
-        except Exception as exc: 
-            last_error = exc
-            tool_name = getattr(tool, "name", "unknown")
-            logger.warning(
-                "Tool '%s' failed on attempt %d/%d: %s",
-                tool_name,
-                attempt + 1,
-                TOOL_MAX_RETRIES + 1,
-                exc,
-            )
-
-    tool_name = getattr(tool, "name", "unknown")
-    logger.error(
-        "Tool '%s' failed after %d attempts; returning error text to the model.",
-        tool_name,
-        TOOL_MAX_RETRIES + 1,
-    )
-    return f"[tool-error:{tool_name}] {last_error}"
-
+    deadline = (tool_context or {}).get("deadline")
+
+    async def _run_with_retries() -> Any:
+        last_error: Exception | None = None
+        for attempt in range(TOOL_MAX_RETRIES + 1):
+            timeout = TOOL_TIMEOUT_SECONDS
+            if deadline is not None:
+                # Never outlive the turn: no retry starts after its deadline.
+                timeout = min(timeout, deadline - time.monotonic())
+                if timeout <= 0:
+                    last_error = last_error or TimeoutError("turn deadline reached")
+                    break
+            try:
+                logger.info(f"🔨 Calling Tool: {tool_name} (Attempt {attempt+1})")
+                return await asyncio.wait_for(_run_once(), timeout=timeout)
+            except Exception as exc: 
+                last_error = exc
+                logger.warning(
+                    "Tool '%s' failed on attempt %d/%d: %s",
+                    tool_name,
+                    attempt + 1,
+                    TOOL_MAX_RETRIES + 1,
+                    exc,
+                )
+
+        logger.error(
+            "Tool '%s' failed after %d attempts; returning error text to the model.",
+            tool_name,
+            attempt + 1,
+        )
+        return f"[tool-error:{tool_name}] {last_error}"
+
+    async def _run_measured() -> Any:
+        started = time.perf_counter()
+        result = await _run_with_retries()
+        failed = isinstance(result, str) and result.startswith("[tool-error:")
+        METRICS.observe("tool_call_duration_seconds", time.perf_counter() - started, tool=tool_name)
+        METRICS.inc("tool_calls_total", tool=tool_name, outcome="error" if failed else "ok")
+        return result
+
+    if not TOOL_COALESCE_ENABLED or tool_name not in READ_ONLY_TOOLS:
+        return await _run_measured()
+
+    # Identical concurrent reads (same args, same token) share one backend call.
+    key = (tool_name, json.dumps(merged_args, sort_keys=True, default=str))
+    result, _ = await tool_flights.do(key, _run_measured)
+    return result
+
+
+def _call_chain_key(index: int, tool_call: Dict[str, Any], written_orders: set) -> Tuple[Any, ...]:
+    order_id = tool_call.get("args", {}).get("order_id")
+    if tool_call["name"] not in READ_ONLY_TOOLS:
+        return ("write", order_id)
+    if order_id is not None and order_id in written_orders:
+        # Reads of an order being modified in the same turn wait for the writes.
+        return ("write", order_id)
+    return ("read", index)
+
+
+async def invoke_tool_calls(
+    tool_calls: Sequence[Dict[str, Any]],
+    tool_map: Dict[str, Any],
+    tool_context: Dict[str, Any] | None = None,
+    max_concurrency: Optional[int] = None,
+) -> List[Any]:
+    """Execute a batch of tool calls and return outputs in the original order.
+
+    Read-only calls run concurrently (capped by `max_concurrency`); write calls
+    touching the same order, and reads of that order, run sequentially in the
+    order the model issued them.
+    """
+
+    semaphore = asyncio.Semaphore(max_concurrency or TOOL_MAX_CONCURRENCY)
+    results: List[Any] = [None] * len(tool_calls)
+
+    written_orders = {
+        call.get("args", {}).get("order_id")
+        for call in tool_calls
+        if call["name"] not in READ_ONLY_TOOLS
+    }
+    chains: Dict[Tuple[Any, ...], List[int]] = {}
+    for index, call in enumerate(tool_calls):
+        chains.setdefault(_call_chain_key(index, call, written_orders), []).append(index)
+
+    async def _run(index: int) -> None:
+        call = tool_calls[index]
+        tool = tool_map.get(call["name"])
+        if tool is None:
+            results[index] = "Tool not found"
+            return
+        async with semaphore:
+            results[index] = await invoke_tool(tool=tool, args=call["args"], tool_context=tool_context)
+
+    async def _run_chain(indices: List[int]) -> None:
+        for index in indices:
+            await _run(index)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(_run_chain(indices) for indices in chains.values()))
+    # Wall time of the batch, not the sum of the (overlapping) calls.
+    add_turn_timing("tools", time.perf_counter() - started)
+    return results
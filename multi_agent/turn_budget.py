@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Awaitable, Dict, Mapping, Optional, TypeVar
+
+from utils.config import MAX_ITERATIONS, MAX_TOTAL_TOOL_CALLS, TURN_DEADLINE_SECONDS
+
+T = TypeVar("T")
+
+DEGRADED_ANSWER = (
+    "Xin lỗi, yêu cầu của bạn đang mất nhiều thời gian hơn dự kiến nên mình chưa xử lý xong. "
+    "Bạn vui lòng thử lại sau ít phút nhé."
+)
+
+
+class TurnBudgetExceeded(RuntimeError):
+    """The turn ran past its wall-clock deadline."""
+
+
+def new_deadline(seconds: float = TURN_DEADLINE_SECONDS) -> Optional[float]:
+    """Monotonic deadline for a turn starting now (None disables it)."""
+    return time.monotonic() + seconds if seconds > 0 else None
+
+
+def turn_deadline(config: Optional[Mapping[str, Any]]) -> Optional[float]:
+    return ((config or {}).get("configurable") or {}).get("deadline")
+
+
+def remaining_seconds(deadline: Optional[float]) -> Optional[float]:
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def exhausted_reason(
+    state: Mapping[str, Any],
+    config: Optional[Mapping[str, Any]],
+    check_iterations: bool = True,
+) -> Optional[str]:
+    """Why the turn may not plan or call tools any more, or None while it still may.
+
+    Only the orchestrator counts iterations; the tool step it just planned
+    still runs, hence `check_iterations=False` there.
+    """
+    remaining = remaining_seconds(turn_deadline(config))
+    if remaining is not None and remaining <= 0:
+        return "deadline"
+    if check_iterations and (state.get("iterations") or 0) >= MAX_ITERATIONS:
+        return "max_iterations"
+    if (state.get("tool_calls_made") or 0) >= MAX_TOTAL_TOOL_CALLS:
+        return "max_tool_calls"
+    return None
+
+
+def tool_call_allowance(state: Mapping[str, Any]) -> int:
+    return max(0, MAX_TOTAL_TOOL_CALLS - (state.get("tool_calls_made") or 0))
+
+
+def degraded_warning(reason: str) -> str:
+    return (
+        f"Turn budget exhausted ({reason}). Answer with what has been completed so far, "
+        "say clearly what is still pending and ask the user to try again."
+    )
+
+
+async def within_deadline(awaitable: Awaitable[T], deadline: Optional[float], floor: float = 0.0) -> T:
+    """Await `awaitable`, giving up when the deadline passes.
+
+    `floor` guarantees a minimum timeout so the final answer can still be
+    produced after the planning budget is spent.
+    """
+    remaining = remaining_seconds(deadline)
+    if remaining is None:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, timeout=max(remaining, floor, 0.0))
+    except asyncio.TimeoutError as exc:
+        raise TurnBudgetExceeded("turn deadline reached") from exc
+
+
+def budget_state() -> Dict[str, Any]:
+    """Counters reset at the start of every turn."""
+    return {"iterations": 0, "tool_calls_made": 0, "budget_exhausted": None}
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import atexit
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from utils.config import TURN_CAPTURE_PATH, TURN_CAPTURE_SALT, TURN_CAPTURE_SAMPLE_RATE
+from utils.logging_utils import get_logger
+
+from .business_context import get_business_context
+from .fast_extract import redact_personal_info
+
+logger = get_logger("multi_agent.turn_capture")
+
+_STOP = object()
+
+
+class TurnCapture:
+    """Opt-in JSONL log of /v1/chat turns for load replay (multi_agent.replay).
+
+    Each line holds the arrival time, a salted hash of the session id, the
+    message with personal data redacted, the HTTP status, the latency and
+    the answer-cache status. Sampling is per session so captured
+    conversations stay whole. Redaction and writing happen on a background
+    thread.
+    """
+
+    def __init__(self, path: str = TURN_CAPTURE_PATH, sample_rate: float = TURN_CAPTURE_SAMPLE_RATE,
+                 salt: str = TURN_CAPTURE_SALT) -> None:
+        self.path = path
+        self.sample_rate = sample_rate
+        # Without a configured salt, hashes are only stable within one process.
+        self._salt = (salt or os.urandom(16).hex()).encode("utf-8")
+        self._records: "queue.SimpleQueue[Any]" = queue.SimpleQueue()
+        self._writer: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.captured = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path) and self.sample_rate > 0
+
+    def pseudonym(self, session_id: str) -> str:
+        return hashlib.sha256(self._salt + session_id.encode("utf-8")).hexdigest()[:16]
+
+    def _sampled(self, pseudonym: str) -> bool:
+        return int(pseudonym[:8], 16) / 0xFFFFFFFF < self.sample_rate
+
+    def _ensure_writer(self) -> None:
+        if self._writer is not None:
+            return
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="turn-capture", daemon=True)
+                self._writer.start()
+                atexit.register(self.close)
+
+    def _write_loop(self) -> None:
+        with open(self.path, "a", encoding="utf-8") as out:
+            while True:
+                item = self._records.get()
+                if item is _STOP:
+                    return
+                record, message, menu = item
+                # Redaction runs here, off the event loop.
+                record["message"] = redact_personal_info(message, menu)
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                if self._records.empty():
+                    out.flush()
+
+    @contextmanager
+    def capture(self, session_id: str, message: str) -> Iterator[Dict[str, Any]]:
+        """Record the turn run inside the block; the caller may add fields to the yielded dict."""
+        if not self.enabled:
+            yield {}
+            return
+        pseudonym = self.pseudonym(session_id)
+        if not self._sampled(pseudonym):
+            yield {}
+            return
+
+        record: Dict[str, Any] = {"t": round(time.time(), 3), "session": pseudonym, "status": 200}
+        started = time.perf_counter()
+        try:
+            yield record
+        except BaseException as exc:
+            record["status"] = getattr(exc, "status_code", 500)
+            raise
+        finally:
+            record["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            self._ensure_writer()
+            # The menu keeps dish names ("2 Cơm Tấm") from being taken for addresses or names.
+            self._records.put((record, message, get_business_context().menu))
+            self.captured += 1
+
+    def close(self) -> None:
+        writer = self._writer
+        if writer is not None and writer.is_alive():
+            self._records.put(_STOP)
+            writer.join(timeout=5)
+        self._writer = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, "path": self.path, "sample_rate": self.sample_rate, "captured": self.captured}
+
+
+turn_capture = TurnCapture()
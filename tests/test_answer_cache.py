@@ -0,0 +1,76 @@
+import asyncio
+from dataclasses import replace
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from multi_agent.answer_cache import AnswerCache, answer_cache, is_stateless
+from multi_agent.business_context import EMPTY_CONTEXT, get_business_context, set_business_context
+from multi_agent.checkpointers import BoundedMemorySaver
+from multi_agent.graph import workflow
+from multi_agent.server import ChatRequest, _cached_answer
+
+MENU = ((1, "Cơm Tấm", 50000.0), (2, "Phở", 45000.0))
+
+
+@pytest.fixture(autouse=True)
+def menu_context():
+    previous = get_business_context()
+    set_business_context(replace(EMPTY_CONTEXT, version="menu-1", menu=MENU))
+    answer_cache.clear()
+    yield
+    answer_cache.clear()
+    set_business_context(previous)
+
+
+def test_questions_are_normalized():
+    cache = AnswerCache()
+    cache.put("Phở bao nhiêu tiền?", "v1", "45.000đ")
+    assert cache.get("pho bao nhieu tien", "v1") == "45.000đ"
+    assert cache.get("pho bao nhieu tien", "v2") is None
+
+
+def test_is_stateless():
+    assert is_stateless({})
+    assert not is_stateless({"cart": [{"item_name": "Phở"}]})
+    assert not is_stateless({"user_info": {"phone": "0901234567"}})
+    assert not is_stateless({"task_outputs": {"create_order": {"order_id": 3}}})
+
+
+def test_data_change_drops_answers_of_the_old_version():
+    version = get_business_context().data_version
+    answer_cache.put("Phở bao nhiêu?", version, "45.000đ")
+
+    set_business_context(replace(get_business_context(), faq_version="faq-2"))
+
+    assert answer_cache.stats()["entries"] == 0
+    assert answer_cache.stats()["invalidations"] == 1
+    assert answer_cache.get("Phở bao nhiêu?", version) is None
+
+
+def test_refresh_without_a_data_change_keeps_answers():
+    version = get_business_context().data_version
+    answer_cache.put("Phở bao nhiêu?", version, "45.000đ")
+    set_business_context(replace(get_business_context()))
+    assert answer_cache.get("Phở bao nhiêu?", version) == "45.000đ"
+
+
+def test_cache_hit_compacts_the_session_history():
+    async def scenario():
+        graph = workflow.compile(checkpointer=BoundedMemorySaver())
+        config = {"configurable": {"thread_id": "cached"}}
+        history = []
+        for n in range(4):
+            history += [HumanMessage(content=f"câu {n}"), AIMessage(content=f"đáp {n}")]
+        await graph.aupdate_state(config, {"messages": history}, as_node="synthesis_agent")
+
+        answer_cache.put("Quán mở cửa mấy giờ?", get_business_context().data_version, "6h-22h")
+        answer = await _cached_answer(graph, ChatRequest(message="Quán mở cửa mấy giờ?"), config)
+        return answer, (await graph.aget_state(config)).values
+
+    answer, values = asyncio.run(scenario())
+    assert answer == "6h-22h"
+    contents = [message.content for message in values["messages"]]
+    # Four old turns plus the cached one, trimmed to the last HISTORY_KEEP_TURNS (3).
+    assert contents == ["câu 2", "đáp 2", "câu 3", "đáp 3", "Quán mở cửa mấy giờ?", "6h-22h"]
+    assert "câu 0" in values["conversation_summary"]
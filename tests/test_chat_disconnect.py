@@ -0,0 +1,137 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessageChunk
+
+from multi_agent import server
+from multi_agent.server import ClientDisconnected, _frames_until_disconnect, _until_disconnect
+from multi_agent.session_gate import SessionGate
+
+
+class FakeRequest:
+    def __init__(self) -> None:
+        self.disconnected = False
+
+    async def is_disconnected(self) -> bool:
+        return self.disconnected
+
+
+@pytest.fixture(autouse=True)
+def fast_poll(monkeypatch):
+    monkeypatch.setattr(server, "DISCONNECT_POLL_SECONDS", 0.01)
+
+
+def _shared_turn(gate, request, turn):
+    return _until_disconnect(request, gate.run("s1", "cho 2 phở", turn))
+
+
+def test_one_disconnected_waiter_leaves_the_shared_turn_running():
+    async def scenario():
+        gate = SessionGate()
+        release = asyncio.Event()
+        cancelled = []
+
+        async def turn():
+            try:
+                await release.wait()
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+            return "answer"
+
+        gone, waiting = FakeRequest(), FakeRequest()
+        first = asyncio.ensure_future(_shared_turn(gate, gone, turn))
+        second = asyncio.ensure_future(_shared_turn(gate, waiting, turn))
+        await asyncio.sleep(0.02)
+        gone.disconnected = True
+        with pytest.raises(ClientDisconnected):
+            await first
+        release.set()
+        return await second, cancelled
+
+    result, cancelled = asyncio.run(scenario())
+    assert result == "answer"
+    assert cancelled == []
+
+
+def test_turn_is_cancelled_when_every_waiter_disconnects():
+    async def scenario():
+        gate = SessionGate()
+        cancelled = asyncio.Event()
+
+        async def turn():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        requests = [FakeRequest(), FakeRequest()]
+        waiters = [asyncio.ensure_future(_shared_turn(gate, request, turn)) for request in requests]
+        await asyncio.sleep(0.02)
+        for request in requests:
+            request.disconnected = True
+        for waiter in waiters:
+            with pytest.raises(ClientDisconnected):
+                await waiter
+        await asyncio.wait_for(cancelled.wait(), 1)
+        await asyncio.sleep(0)
+        return gate
+
+    gate = asyncio.run(scenario())
+    assert gate.stats()["pending_turns"] == 0
+
+
+class HangingGraph:
+    """Emits one progress event, then waits on an LLM call that never returns."""
+
+    def __init__(self) -> None:
+        self.closed = asyncio.Event()
+        self.waiting = asyncio.Event()
+
+    async def astream_events(self, input_data, config, version):
+        try:
+            yield {"event": "on_chain_start", "name": "orchestrator", "metadata": {"langgraph_node": "orchestrator"}}
+            self.waiting.set()
+            await asyncio.sleep(10)
+        finally:
+            self.closed.set()
+
+
+def test_stream_stops_and_closes_the_graph_while_waiting_on_an_event():
+    async def scenario():
+        graph, request = HangingGraph(), FakeRequest()
+        frames = server.stream_graph_events(graph, {}, {}, "s1")
+        received = []
+
+        async def consume():
+            async for frame in _frames_until_disconnect(request, frames):
+                received.append(frame)
+
+        consumer = asyncio.ensure_future(consume())
+        await graph.waiting.wait()
+        request.disconnected = True
+        with pytest.raises(ClientDisconnected):
+            await asyncio.wait_for(consumer, 1)
+        return graph, received
+
+    graph, received = asyncio.run(scenario())
+    assert graph.closed.is_set()
+    assert [frame.split("\n")[0] for frame in received] == ["event: start", "event: progress"]
+
+
+def test_stream_relays_every_frame_when_the_client_stays():
+    class FinishingGraph:
+        async def astream_events(self, input_data, config, version):
+            yield {"event": "on_chat_model_stream", "metadata": {"langgraph_node": "synthesis_agent"},
+                   "data": {"chunk": AIMessageChunk(content="Dạ")}}
+
+        async def aget_state(self, config):
+            return None
+
+    async def scenario():
+        frames = server.stream_graph_events(FinishingGraph(), {}, {}, "s1")
+        return [frame async for frame in _frames_until_disconnect(FakeRequest(), frames)]
+
+    events = [frame.split("\n")[0] for frame in asyncio.run(scenario())]
+    assert events == ["event: start", "event: token", "event: done"]
@@ -0,0 +1,258 @@
+import asyncio
+import operator
+from typing import Annotated, TypedDict
+
+import pytest
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.graph import END, StateGraph
+
+from multi_agent.checkpointers import BoundedMemorySaver, RedisCheckpointSaver, checkpointer_stats
+
+
+def _config(thread_id="t1", checkpoint_id=None, checkpoint_ns=""):
+    configurable = {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns}
+    if checkpoint_id:
+        configurable["checkpoint_id"] = checkpoint_id
+    return {"configurable": configurable}
+
+
+def _checkpoint(n, **values):
+    checkpoint = empty_checkpoint()
+    # Ids only need to sort in creation order, like uuid6.
+    checkpoint["id"] = f"{n:08d}-0000-6000-8000-000000000000"
+    checkpoint["channel_values"] = values
+    return checkpoint
+
+
+def _redis_saver(**kwargs):
+    aioredis = pytest.importorskip("fakeredis.aioredis")
+    return RedisCheckpointSaver(aioredis.FakeRedis(decode_responses=False), prefix="test:", **kwargs)
+
+
+class Counter(TypedDict):
+    turns: Annotated[list, operator.add]
+
+
+def _counter_graph(checkpointer):
+    graph = StateGraph(Counter)
+    graph.add_node("step", lambda state: {"turns": [len(state["turns"]) + 1]})
+    graph.set_entry_point("step")
+    graph.add_edge("step", END)
+    return graph.compile(checkpointer=checkpointer)
+
+
+# ---- RedisCheckpointSaver ----
+
+
+def test_redis_put_then_get_latest_and_by_id():
+    async def scenario():
+        saver = _redis_saver()
+        first = await saver.aput(_config(), _checkpoint(1, cart=["Phở"]), {"step": 1}, {})
+        await saver.aput(first, _checkpoint(2, cart=["Phở", "Cơm Tấm"]), {"step": 2}, {})
+        latest = await saver.aget_tuple(_config())
+        older = await saver.aget_tuple(first)
+        missing = await saver.aget_tuple(_config("other"))
+        return first, latest, older, missing
+
+    first, latest, older, missing = asyncio.run(scenario())
+    assert latest.checkpoint["channel_values"] == {"cart": ["Phở", "Cơm Tấm"]}
+    assert latest.metadata == {"step": 2}
+    assert latest.parent_config == first
+    assert older.checkpoint["channel_values"] == {"cart": ["Phở"]}
+    assert older.parent_config is None
+    assert missing is None
+
+
+def test_redis_large_records_are_compressed_and_round_trip():
+    async def scenario():
+        saver = _redis_saver(compress_min_bytes=64)
+        await saver.aput(_config(), _checkpoint(1, note="món " * 500), {}, {})
+        raw = await saver.client.hget("test:ckpt:t1:", _checkpoint(1)["id"])
+        return raw, await saver.aget_tuple(_config())
+
+    raw, loaded = asyncio.run(scenario())
+    assert raw[:1] == b"z"
+    assert loaded.checkpoint["channel_values"]["note"] == "món " * 500
+
+
+def test_redis_pending_writes_are_not_overwritten_on_retry():
+    async def scenario():
+        saver = _redis_saver()
+        config = await saver.aput(_config(), _checkpoint(1), {}, {})
+        await saver.aput_writes(config, [("cart", "first"), ("user_info", {"phone": "0901234567"})], "task-1")
+        # A retried task writes the same (task, idx) again; the first value is kept.
+        await saver.aput_writes(config, [("cart", "retried")], "task-1")
+        await saver.aput_writes(config, [("cart", "other task")], "task-2")
+        return await saver.aget_tuple(config)
+
+    loaded = asyncio.run(scenario())
+    assert loaded.pending_writes == [
+        ("task-1", "cart", "first"),
+        ("task-1", "user_info", {"phone": "0901234567"}),
+        ("task-2", "cart", "other task"),
+    ]
+
+
+def test_redis_special_channel_writes_overwrite():
+    async def scenario():
+        saver = _redis_saver()
+        config = await saver.aput(_config(), _checkpoint(1), {}, {})
+        await saver.aput_writes(config, [("__error__", "first")], "task-1")
+        await saver.aput_writes(config, [("__error__", "second")], "task-1")
+        return await saver.aget_tuple(config)
+
+    assert asyncio.run(scenario()).pending_writes == [("task-1", "__error__", "second")]
+
+
+def test_redis_keeps_only_the_newest_checkpoints():
+    async def scenario():
+        saver = _redis_saver(keep=2)
+        config = _config()
+        for n in range(1, 5):
+            config = await saver.aput(config, _checkpoint(n), {"step": n}, {})
+            await saver.aput_writes(config, [("cart", n)], "task")
+        listed = [item async for item in saver.alist(_config())]
+        stale_writes = await saver.client.exists(f"test:writes:t1::{_checkpoint(1)['id']}")
+        return listed, stale_writes
+
+    listed, stale_writes = asyncio.run(scenario())
+    assert [item.metadata["step"] for item in listed] == [4, 3]
+    assert stale_writes == 0
+
+
+def test_redis_keys_expire_and_ttl_is_refreshed():
+    async def scenario():
+        saver = _redis_saver(ttl_seconds=60)
+        config = await saver.aput(_config(), _checkpoint(1), {}, {})
+        await saver.aput_writes(config, [("cart", 1)], "task")
+        keys = ["test:ckpt:t1:", "test:ns:t1", f"test:writes:t1::{_checkpoint(1)['id']}"]
+        ttls = [await saver.client.ttl(key) for key in keys]
+        await saver.client.expire("test:ckpt:t1:", 5)
+        await saver.aput(config, _checkpoint(2), {}, {})
+        return ttls, await saver.client.ttl("test:ckpt:t1:")
+
+    ttls, refreshed = asyncio.run(scenario())
+    assert all(0 < ttl <= 60 for ttl in ttls)
+    assert refreshed > 5
+
+
+def test_redis_list_filters_and_delete_thread():
+    async def scenario():
+        saver = _redis_saver()
+        config = await saver.aput(_config(), _checkpoint(1), {"source": "input"}, {})
+        config = await saver.aput(config, _checkpoint(2), {"source": "loop"}, {})
+        await saver.aput_writes(config, [("cart", 1)], "task")
+        await saver.aput(_config("t2"), _checkpoint(3), {"source": "loop"}, {})
+        loops = [item.config["configurable"]["thread_id"] async for item in saver.alist(None, filter={"source": "loop"})]
+        before = [item.metadata async for item in saver.alist(_config(), before=config)]
+        limited = [item async for item in saver.alist(_config(), limit=1)]
+        await saver.adelete_thread("t1")
+        remaining = sorted(key.decode() for key in await saver.client.keys("test:*"))
+        return loops, before, limited, remaining
+
+    loops, before, limited, remaining = asyncio.run(scenario())
+    assert sorted(loops) == ["t1", "t2"]
+    assert before == [{"source": "input"}]
+    assert len(limited) == 1
+    assert remaining == ["test:ckpt:t2:", "test:ns:t2"]
+
+
+def test_redis_saver_persists_graph_state_across_turns():
+    async def scenario():
+        graph = _counter_graph(_redis_saver())
+        config = {"configurable": {"thread_id": "session-1"}}
+        await graph.ainvoke({"turns": []}, config)
+        return await graph.ainvoke({"turns": []}, config)
+
+    assert asyncio.run(scenario())["turns"] == [1, 2]
+
+
+# ---- BoundedMemorySaver ----
+
+
+def test_memory_put_get_and_pending_writes():
+    saver = BoundedMemorySaver()
+    first = saver.put(_config(), _checkpoint(1, cart=["Phở"]), {"step": 1}, {})
+    second = saver.put(first, _checkpoint(2), {"step": 2}, {})
+    saver.put_writes(second, [("cart", "first")], "task-1")
+    saver.put_writes(second, [("cart", "retried")], "task-1")
+
+    latest = saver.get_tuple(_config())
+    assert latest.metadata == {"step": 2}
+    assert latest.parent_config == first
+    assert latest.pending_writes == [("task-1", "cart", "first")]
+    assert saver.get_tuple(first).checkpoint["channel_values"] == {"cart": ["Phở"]}
+    assert saver.get_tuple(_config("other")) is None
+
+
+def test_memory_keeps_only_max_checkpoints_per_thread():
+    saver = BoundedMemorySaver(max_checkpoints=2)
+    config = _config()
+    for n in range(1, 5):
+        config = saver.put(config, _checkpoint(n), {"step": n}, {})
+        saver.put_writes(config, [("cart", n)], "task")
+
+    assert [item.metadata["step"] for item in saver.list(_config())] == [4, 3]
+    assert saver.stats()["checkpoints"] == 2
+    session = saver._sessions["t1"]
+    assert sorted(checkpoint_id for _, checkpoint_id in session.writes) == [_checkpoint(3)["id"], _checkpoint(4)["id"]]
+    assert saver.stats()["approx_bytes"] == session.nbytes
+
+
+def test_memory_drops_idle_sessions_after_ttl():
+    saver = BoundedMemorySaver(ttl_seconds=60)
+    saver.put(_config("idle"), _checkpoint(1), {}, {})
+    saver.put(_config("active"), _checkpoint(2), {}, {})
+    saver._sessions["idle"].last_access -= 120
+
+    assert saver.get_tuple(_config("idle")) is None
+    assert saver.get_tuple(_config("active")) is not None
+    stats = saver.stats()
+    assert stats["sessions"] == 1
+    assert stats["evicted_ttl"] == 1
+
+
+def test_memory_evicts_least_recently_used_sessions_over_the_byte_budget():
+    probe = BoundedMemorySaver()
+    probe.put(_config("probe"), _checkpoint(1, note="x" * 200), {}, {})
+    session_bytes = probe.stats()["approx_bytes"]
+
+    saver = BoundedMemorySaver(max_bytes=int(session_bytes * 2.5), compress_min_bytes=10**9)
+    for name in ("a", "b"):
+        saver.put(_config(name), _checkpoint(1, note="x" * 200), {}, {})
+    saver.get_tuple(_config("a"))  # "b" is now the least recently used
+    saver.put(_config("c"), _checkpoint(1, note="x" * 200), {}, {})
+
+    assert saver.get_tuple(_config("b")) is None
+    assert saver.get_tuple(_config("a")) is not None
+    assert saver.get_tuple(_config("c")) is not None
+    stats = saver.stats()
+    assert stats["evicted_lru"] == 1
+    assert stats["approx_bytes"] <= stats["max_bytes"]
+
+
+def test_memory_keeps_the_session_being_written_even_over_budget():
+    saver = BoundedMemorySaver(max_bytes=1)
+    saver.put(_config("only"), _checkpoint(1, note="x" * 200), {}, {})
+    assert saver.get_tuple(_config("only")) is not None
+    assert saver.stats()["evicted_lru"] == 0
+
+
+def test_memory_delete_thread_frees_its_bytes():
+    saver = BoundedMemorySaver()
+    saver.put(_config("t1"), _checkpoint(1), {}, {})
+    saver.put(_config("t2"), _checkpoint(1), {}, {})
+    saver.delete_thread("t1")
+    assert saver.get_tuple(_config("t1")) is None
+    assert saver.stats()["approx_bytes"] == saver._sessions["t2"].nbytes
+    assert checkpointer_stats(saver)["sessions"] == 1
+
+
+def test_memory_saver_persists_graph_state_across_turns():
+    async def scenario():
+        graph = _counter_graph(BoundedMemorySaver(max_checkpoints=3))
+        config = {"configurable": {"thread_id": "session-1"}}
+        await graph.ainvoke({"turns": []}, config)
+        return await graph.ainvoke({"turns": []}, config)
+
+    assert asyncio.run(scenario())["turns"] == [1, 2]
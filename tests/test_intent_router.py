@@ -0,0 +1,58 @@
+import asyncio
+from dataclasses import replace
+
+import pytest
+
+from multi_agent import graph
+from multi_agent.business_context import EMPTY_CONTEXT, get_business_context, set_business_context
+from multi_agent.intent_classifier import FAQ, OUT_OF_SCOPE, PRICE_INQUIRY
+
+MENU = ((1, "Cơm Tấm", 50000.0), (2, "Phở", 45000.0), (3, "Bún Bò", 40000.0))
+
+
+class FixedClassifier:
+    def __init__(self, intent, confidence=0.99):
+        self.intent, self.confidence = intent, confidence
+
+    def predict(self, text):
+        return self.intent, self.confidence
+
+
+@pytest.fixture(autouse=True)
+def menu_context():
+    previous = get_business_context()
+    set_business_context(replace(EMPTY_CONTEXT, version="test", menu=MENU))
+    yield
+    set_business_context(previous)
+
+
+def route(monkeypatch, intent, user_input, confidence=0.99, **state):
+    monkeypatch.setattr(graph, "get_intent_classifier", lambda: FixedClassifier(intent, confidence))
+    return asyncio.run(graph.intent_router_node({"user_input": user_input, **state}))
+
+
+@pytest.mark.parametrize("user_input", ["Phở bao nhiêu tiền?", "pho bao nhieu", "Cơm tấm giá sao?"])
+def test_price_question_about_a_menu_dish_takes_the_fast_path(monkeypatch, user_input):
+    update = route(monkeypatch, PRICE_INQUIRY, user_input)
+    assert update["intent_fast_path"] is True
+    assert (update["next_action"], update["next_step"]) == ("search_menu", "tool_agent")
+
+
+@pytest.mark.parametrize("user_input", ["pizza bao nhiêu?", "Hamburger giá sao?", "bao nhiêu tiền vậy?"])
+def test_price_question_without_a_menu_dish_goes_to_the_planner(monkeypatch, user_input):
+    update = route(monkeypatch, PRICE_INQUIRY, user_input)
+    assert update["intent_fast_path"] is False
+    assert update["next_step"] == "orchestrator"
+
+
+def test_faq_and_out_of_scope_do_not_need_a_dish(monkeypatch):
+    assert route(monkeypatch, FAQ, "Quán mở cửa mấy giờ?")["next_action"] == "ask_faq"
+    refusal = route(monkeypatch, OUT_OF_SCOPE, "Bán cho mình cái điện thoại")
+    assert refusal["next_step"] == "synthesis_agent"
+    assert "Phở" in refusal["refusal_reason"]
+
+
+def test_low_confidence_or_session_state_skips_the_fast_path(monkeypatch):
+    assert route(monkeypatch, PRICE_INQUIRY, "Phở bao nhiêu?", confidence=0.1)["intent_fast_path"] is False
+    cart = [{"item_name": "Phở", "item_id": 2, "quantity": 1}]
+    assert route(monkeypatch, PRICE_INQUIRY, "Phở bao nhiêu?", cart=cart)["intent_fast_path"] is False
@@ -0,0 +1,199 @@
+import asyncio
+
+import pytest
+
+from multi_agent import llm_scheduler as scheduler_module
+from multi_agent.llm_scheduler import (
+    PRIORITY_BROWSE,
+    PRIORITY_CHECKOUT,
+    PRIORITY_DEFAULT,
+    LLMScheduler,
+    SchedulerOverloaded,
+    llm_priority,
+    scheduled_call,
+    turn_priority,
+)
+
+BUDGETS = {PRIORITY_CHECKOUT: 5.0, PRIORITY_DEFAULT: 5.0, PRIORITY_BROWSE: 5.0}
+
+
+def _scheduler(max_concurrency=1, max_queue=8, budgets=BUDGETS):
+    return LLMScheduler(max_concurrency=max_concurrency, max_queue=max_queue, queue_budgets=budgets)
+
+
+async def _hold(scheduler, priority, release, served, name):
+    async with scheduler.slot(priority):
+        served.append(name)
+        await release.wait()
+
+
+def test_waiters_are_served_by_priority_then_arrival():
+    async def scenario():
+        scheduler = _scheduler()
+        release = asyncio.Event()
+        served = []
+        tasks = [asyncio.ensure_future(_hold(scheduler, PRIORITY_DEFAULT, release, served, "running"))]
+        await asyncio.sleep(0)
+        for priority, name in [(PRIORITY_BROWSE, "browse"), (PRIORITY_DEFAULT, "default"),
+                               (PRIORITY_CHECKOUT, "checkout-1"), (PRIORITY_CHECKOUT, "checkout-2")]:
+            tasks.append(asyncio.ensure_future(_hold(scheduler, priority, release, served, name)))
+            await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(*tasks)
+        return scheduler, served
+
+    scheduler, served = asyncio.run(scenario())
+    assert served == ["running", "checkout-1", "checkout-2", "default", "browse"]
+    assert scheduler.stats()["active"] == 0
+    assert scheduler.outcomes["completed"] == 5
+
+
+def test_concurrency_is_capped():
+    async def scenario():
+        scheduler = _scheduler(max_concurrency=2)
+        running, peak = 0, 0
+
+        async def call():
+            nonlocal running, peak
+            async with scheduler.slot():
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+
+        await asyncio.gather(*(call() for _ in range(6)))
+        return peak
+
+    assert asyncio.run(scenario()) == 2
+
+
+def test_wait_past_the_queue_budget_times_out():
+    async def scenario():
+        scheduler = _scheduler(budgets={**BUDGETS, PRIORITY_BROWSE: 0.01})
+        release = asyncio.Event()
+        holder = asyncio.ensure_future(_hold(scheduler, PRIORITY_DEFAULT, release, [], "running"))
+        await asyncio.sleep(0)
+        with pytest.raises(SchedulerOverloaded) as raised:
+            async with scheduler.slot(PRIORITY_BROWSE):
+                pass
+        release.set()
+        await holder
+        return scheduler, raised.value
+
+    scheduler, error = asyncio.run(scenario())
+    assert scheduler.outcomes["timed_out"] == 1
+    assert error.retry_after >= 1
+    assert scheduler.stats()["queue_depth"] == 0
+    assert scheduler.stats()["active"] == 0
+
+
+def test_full_queue_rejects_new_calls():
+    async def scenario():
+        scheduler = _scheduler(max_queue=1)
+        release = asyncio.Event()
+        tasks = [asyncio.ensure_future(_hold(scheduler, PRIORITY_DEFAULT, release, [], name)) for name in "ab"]
+        await asyncio.sleep(0)
+        saturated = scheduler.is_saturated()
+        with pytest.raises(SchedulerOverloaded):
+            async with scheduler.slot():
+                pass
+        release.set()
+        await asyncio.gather(*tasks)
+        return scheduler, saturated
+
+    scheduler, saturated = asyncio.run(scenario())
+    assert saturated
+    assert scheduler.outcomes["rejected"] == 1
+    assert not scheduler.is_saturated()
+
+
+def test_zero_queue_admits_while_slots_are_free():
+    async def scenario():
+        scheduler = _scheduler(max_concurrency=1, max_queue=0)
+        idle = scheduler.is_saturated()
+        release = asyncio.Event()
+        holder = asyncio.ensure_future(_hold(scheduler, PRIORITY_DEFAULT, release, [], "running"))
+        await asyncio.sleep(0)
+        busy = scheduler.is_saturated()
+        release.set()
+        await holder
+        return idle, busy
+
+    assert asyncio.run(scenario()) == (False, True)
+
+
+def test_negative_queue_is_unbounded():
+    scheduler = _scheduler(max_concurrency=0, max_queue=-1)
+    assert not scheduler.is_saturated()
+
+
+def test_cancelled_waiter_passes_a_handed_over_slot_on():
+    async def scenario():
+        scheduler = _scheduler()
+        release = asyncio.Event()
+        served = []
+        holder = asyncio.ensure_future(_hold(scheduler, PRIORITY_DEFAULT, release, served, "running"))
+        await asyncio.sleep(0)
+        cancelled = asyncio.ensure_future(_hold(scheduler, PRIORITY_CHECKOUT, release, served, "cancelled"))
+        waiting = asyncio.ensure_future(_hold(scheduler, PRIORITY_DEFAULT, release, served, "waiting"))
+        await asyncio.sleep(0)
+        # The holder finishes and hands its slot to the checkout waiter,
+        # which is cancelled before it gets to run.
+        release.set()
+        await holder
+        cancelled.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        await asyncio.wait_for(waiting, 1)
+        return scheduler, served
+
+    scheduler, served = asyncio.run(scenario())
+    assert served == ["running", "waiting"]
+    assert scheduler.stats()["active"] == 0
+    assert scheduler.stats()["queue_depth"] == 0
+
+
+def test_cancelled_queued_waiter_leaves_the_queue():
+    async def scenario():
+        scheduler = _scheduler()
+        release = asyncio.Event()
+        holder = asyncio.ensure_future(_hold(scheduler, PRIORITY_DEFAULT, release, [], "running"))
+        await asyncio.sleep(0)
+        queued = asyncio.ensure_future(_hold(scheduler, PRIORITY_DEFAULT, release, [], "queued"))
+        await asyncio.sleep(0)
+        depth = scheduler.depth
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        release.set()
+        await holder
+        return scheduler, depth
+
+    scheduler, depth = asyncio.run(scenario())
+    assert depth == 1
+    assert scheduler.depth == 0
+    assert scheduler.stats()["active"] == 0
+
+
+def test_scheduled_call_takes_a_slot_only_under_llm_priority(monkeypatch):
+    scheduler = _scheduler()
+    monkeypatch.setattr(scheduler_module, "llm_scheduler", scheduler)
+
+    async def scenario():
+        async with scheduled_call():
+            unscheduled = scheduler.stats()["active"]
+        with llm_priority(PRIORITY_CHECKOUT):
+            async with scheduled_call():
+                scheduled = scheduler.stats()["active"]
+        return unscheduled, scheduled
+
+    assert asyncio.run(scenario()) == (0, 1)
+    assert scheduler.wait_seconds["checkout"].snapshot()["count"] == 1
+
+
+def test_turn_priority():
+    assert turn_priority({"next_action": "confirm_order"}) == PRIORITY_CHECKOUT
+    assert turn_priority({"cart": [{"item_id": 1, "quantity": 2}]}) == PRIORITY_CHECKOUT
+    assert turn_priority({"intent_fast_path": True}) == PRIORITY_BROWSE
+    assert turn_priority({"next_action": "search_menu"}) == PRIORITY_BROWSE
+    assert turn_priority({}) == PRIORITY_DEFAULT
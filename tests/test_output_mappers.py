@@ -0,0 +1,145 @@
+import json
+
+import pytest
+
+from multi_agent.output_mappers import (
+    TOOL_OUTPUT_MAPPERS,
+    MapperError,
+    parse_tool_envelope,
+    structure_tool_outputs,
+)
+from multi_agent.state import (
+    AddItemOutput,
+    CalculateTotalOutput,
+    CheckOrderOutput,
+    CreateOrderOutput,
+    FaqOutput,
+    GenericOutput,
+    RemoveItemOutput,
+    SearchMenuOutput,
+)
+
+COM_TAM = {"id": 1, "category_id": 1, "name": "Cơm Tấm", "price": 50000, "description": "Sườn bì chả", "is_available": True}
+PHO = {"id": 2, "category_id": 1, "name": "Phở", "price": 45000, "description": None, "is_available": True}
+ORDER = {
+    "id": 7,
+    "user_id": 1,
+    "status": "DRAFT",
+    "address": "12 Lê Duẩn",
+    "items": [
+        {"id": 1, "item_id": 1, "quantity": 2, "unit_price": 50000, "total_price": 100000, "options": []},
+        {"id": 2, "item_id": 2, "quantity": 1, "unit_price": 45000, "total_price": 45000, "options": []},
+    ],
+}
+
+
+def envelope(data, status_code=200, error=None):
+    """What `_backend_request` returns, as the JSON text the MCP adapter hands back."""
+    ok = error is None
+    return json.dumps({"ok": ok, "status_code": status_code, "error": error, "parse_error": None,
+                       "data": data if ok else None}, ensure_ascii=False)
+
+
+# ---- parse_tool_envelope ----
+
+
+def test_envelope_forms_unwrap_to_data():
+    text = envelope(ORDER)
+    assert parse_tool_envelope(text) == ORDER
+    assert parse_tool_envelope([{"type": "text", "text": text}]) == ORDER
+    assert parse_tool_envelope((text, None)) == ORDER
+    assert parse_tool_envelope(json.loads(text)) == ORDER
+
+
+def test_payload_without_envelope_is_returned_as_is():
+    assert parse_tool_envelope(json.dumps([COM_TAM])) == [COM_TAM]
+
+
+def test_backend_error_raises():
+    with pytest.raises(MapperError, match="404"):
+        parse_tool_envelope(envelope(None, 404, "Order not found"))
+
+
+def test_non_json_result_raises():
+    with pytest.raises(MapperError):
+        parse_tool_envelope("Error: tool crashed")
+
+
+# ---- per-tool mappers ----
+
+TOOL_CASES = [
+    ("list_menu", {"q": "phở"}, [PHO], SearchMenuOutput,
+     {"items": [{"id": 2, "name": "Phở", "price": 45000.0, "description": None}], "note": None}),
+    ("get_menu_item", {"item_id": 1}, COM_TAM, SearchMenuOutput,
+     {"items": [{"id": 1, "name": "Cơm Tấm", "price": 50000.0, "description": "Sườn bì chả"}], "note": None}),
+    ("create_draft_order", {"address": "12 Lê Duẩn"}, {**ORDER, "items": []}, CreateOrderOutput,
+     {"order_id": 7, "status": "DRAFT", "error": None}),
+    ("add_item_to_order", {"order_id": 7, "item_id": 1, "quantity": 2}, ORDER, AddItemOutput,
+     {"success": True, "order_id": 7, "message": "Item added successfully"}),
+    ("update_order_item", {"order_id": 7, "order_item_id": 1, "quantity": 3}, ORDER, AddItemOutput,
+     {"success": True, "order_id": 7, "message": "Item updated"}),
+    ("remove_order_item", {"order_id": 7, "order_item_id": 2}, ORDER, RemoveItemOutput,
+     {"success": True, "order_id": 7, "message": "Item removed"}),
+    ("get_order", {"order_id": 7}, ORDER, CheckOrderOutput,
+     {"orders": [{"id": 7, "status": "DRAFT", "total_amount": 145000.0}], "current_order_status": "DRAFT"}),
+    ("get_order_history", {"limit": 5}, [ORDER, {**ORDER, "id": 3, "status": "CANCELLED", "items": []}],
+     CheckOrderOutput,
+     {"orders": [{"id": 7, "status": "DRAFT", "total_amount": 145000.0},
+                 {"id": 3, "status": "CANCELLED", "total_amount": 0.0}],
+      "current_order_status": "DRAFT"}),
+    ("cancel_order", {"order_id": 7}, {**ORDER, "status": "CANCELLED"}, GenericOutput,
+     {"result": "Order 7 cancelled. Status: CANCELLED", "success": True}),
+    ("confirm_order", {"order_id": 7}, {**ORDER, "status": "PENDING"}, GenericOutput,
+     {"result": "Order 7 confirmed. Status: PENDING", "success": True}),
+    ("list_faqs", {"q": "giờ"}, [{"id": 1, "question": "Mấy giờ mở cửa?", "answer": "6h-22h"}], FaqOutput,
+     {"answers": ["Mấy giờ mở cửa? -> 6h-22h"]}),
+    ("calculate_bill", {"order_id": 7}, {"total_amount": 145000, "breakdown": "2x50.000 + 1x45.000"},
+     CalculateTotalOutput,
+     {"total_amount": 145000.0, "delivery_fee": 0.0, "final_total": 145000.0, "breakdown": "2x50.000 + 1x45.000"}),
+]
+
+
+@pytest.mark.parametrize("tool,args,data,schema,expected", TOOL_CASES, ids=[case[0] for case in TOOL_CASES])
+def test_tool_envelope_maps_to_schema(tool, args, data, schema, expected):
+    output = structure_tool_outputs(schema, [(tool, args, envelope(data))])
+    assert output is not None
+    assert output.model_dump() == expected
+
+
+def test_every_mapper_has_a_case():
+    assert {case[0] for case in TOOL_CASES} | {"estimate_delivery_fee"} == set(TOOL_OUTPUT_MAPPERS)
+
+
+def test_empty_menu_search_explains_why():
+    output = structure_tool_outputs(SearchMenuOutput, [("list_menu", {"q": "pizza"}, envelope([]))])
+    assert output.items == []
+    assert output.note == "Không tìm thấy món nào khớp với 'pizza'."
+
+
+def test_bill_and_delivery_fee_combine_into_the_total():
+    output = structure_tool_outputs(CalculateTotalOutput, [
+        ("get_order", {"order_id": 7}, envelope(ORDER)),
+        ("estimate_delivery_fee", {"order_id": 7}, envelope({"delivery_fee": 15000})),
+    ])
+    assert output.model_dump() == {
+        "total_amount": 145000.0,
+        "delivery_fee": 15000.0,
+        "final_total": 160000.0,
+        "breakdown": "145,000 + 15,000 (ship) = 160,000",
+    }
+
+
+@pytest.mark.parametrize("tool_results", [
+    [],
+    [("unknown_tool", {}, envelope({}))],
+    [("get_order", {"order_id": 9}, envelope(None, 404, "Order not found"))],
+    [("get_order", {"order_id": 7}, envelope({"status": "DRAFT"}))],
+    [("list_menu", {}, "not json")],
+], ids=["no-results", "no-mapper", "backend-error", "missing-field", "not-json"])
+def test_unmappable_results_fall_back_to_the_llm(tool_results):
+    assert structure_tool_outputs(CheckOrderOutput, tool_results) is None
+
+
+def test_fields_that_do_not_fit_the_schema_fall_back():
+    # A menu listing cannot fill an order-creation result (status is required).
+    assert structure_tool_outputs(CreateOrderOutput, [("list_menu", {}, envelope([PHO]))]) is None
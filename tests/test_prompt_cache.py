@@ -0,0 +1,61 @@
+from uuid import uuid4
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+
+from multi_agent.metrics import METRICS
+from multi_agent.prompt_cache import PromptCacheStats
+
+PROMPT = [[SystemMessage(content="Bạn là trợ lý đặt món."), HumanMessage(content="Phở bao nhiêu?")]]
+
+
+def result(input_tokens=120, cached=0):
+    usage = {"input_tokens": input_tokens, "output_tokens": 10, "total_tokens": input_tokens + 10,
+             "input_token_details": {"cache_read": cached}}
+    return LLMResult(generations=[[ChatGeneration(message=AIMessage(content="ok", usage_metadata=usage))]])
+
+
+def call(stats, metadata, response=None):
+    run_id = uuid4()
+    stats.on_chat_model_start({}, PROMPT, run_id=run_id, metadata=metadata)
+    stats.on_llm_end(response or result(), run_id=run_id)
+
+
+def llm_calls(agent):
+    return sum(value["count"] for labels, value in METRICS.snapshot("llm_call_duration_seconds").items()
+               if dict(labels).get("agent") == agent)
+
+
+def test_calls_are_counted_per_agent_with_prefix_stability():
+    stats = PromptCacheStats()
+    call(stats, {"langgraph_node": "synthesis_agent"})
+    call(stats, {"langgraph_node": "synthesis_agent"}, result(cached=100))
+
+    report = stats.snapshot()["synthesis"]
+    assert report["calls"] == 2
+    assert report["prefix_stable_rate"] == 0.5
+    assert report["cache_reported_calls"] == 2
+    assert report["cached_token_ratio"] == round(100 / 240, 4)
+
+
+def test_warmup_calls_are_left_out():
+    stats = PromptCacheStats()
+    before = llm_calls("warmup-probe")
+    call(stats, {"agent": "warmup-probe", "warmup": True}, result(cached=0))
+    assert stats.snapshot() == {}
+    assert llm_calls("warmup-probe") == before
+
+    # The first real call after a warmup is still measured against real calls only.
+    call(stats, {"agent": "warmup-probe"}, result(cached=100))
+    report = stats.snapshot()["warmup-probe"]
+    assert report["calls"] == 1
+    assert report["prefix_stable_rate"] == 0.0
+    assert llm_calls("warmup-probe") == before + 1
+
+
+def test_failed_warmup_is_forgotten():
+    stats = PromptCacheStats()
+    run_id = uuid4()
+    stats.on_chat_model_start({}, PROMPT, run_id=run_id, metadata={"warmup": True})
+    stats.on_llm_error(RuntimeError("down"), run_id=run_id)
+    assert not stats._warmup_runs and not stats._inflight
@@ -0,0 +1,61 @@
+from multi_agent.fast_extract import (
+    REDACTED_ADDRESS,
+    REDACTED_EMAIL,
+    REDACTED_NAME,
+    REDACTED_PHONE,
+    redact_personal_info,
+)
+
+MENU = ((1, "Cơm Tấm", 50000.0), (2, "Phở", 45000.0), (3, "Bún Bò", 40000.0))
+
+
+def test_self_introduced_name():
+    assert redact_personal_info("Mình là Nguyễn Văn An, cho 2 Cơm Tấm nhé", MENU) == (
+        f"Mình là {REDACTED_NAME}, cho 2 Cơm Tấm nhé"
+    )
+
+
+def test_honorific_name_phone_and_uncued_address():
+    assert redact_personal_info("Anh Tuấn, 0987654321, 22 Hai Bà Trưng", MENU) == (
+        f"Anh {REDACTED_NAME}, {REDACTED_PHONE}, {REDACTED_ADDRESS}"
+    )
+
+
+def test_street_with_district_without_cue():
+    assert redact_personal_info("123 Nguyễn Văn Linh quận 7", MENU) == REDACTED_ADDRESS
+
+
+def test_lowercase_street_keyword_and_ward_district():
+    assert redact_personal_info("giao 45 đường nguyễn huệ p. 5 q. 1 nhé", MENU) == (
+        f"giao {REDACTED_ADDRESS} nhé"
+    )
+
+
+def test_full_address_with_city():
+    redacted = redact_personal_info("cho chị Lan Anh 1 phở, 7/2 Trần Hưng Đạo, Phường 3, Quận 5, TP HCM", MENU)
+    assert redacted == f"cho chị {REDACTED_NAME} 1 phở, {REDACTED_ADDRESS}"
+
+
+def test_cued_address_and_labelled_name():
+    redacted = redact_personal_info("Cho 2 Cơm Tấm giao đến 12 Lê Duẩn, sđt 0901234567, tên tôi là Hà", MENU)
+    assert redacted == f"Cho 2 Cơm Tấm giao đến {REDACTED_ADDRESS}, sđt {REDACTED_PHONE}, tên tôi là {REDACTED_NAME}"
+
+
+def test_email():
+    assert redact_personal_info("gửi hóa đơn về an.nguyen@gmail.com", MENU) == f"gửi hóa đơn về {REDACTED_EMAIL}"
+
+
+def test_dishes_times_and_questions_are_kept():
+    for text in (
+        "Cho 2 Cơm Tấm và 1 Bún Bò",
+        "em Phở bao nhiêu",
+        "Phở bao nhiêu tiền?",
+        "Quán mở cửa mấy giờ?",
+        "giao tới 5 giờ chiều được không",
+    ):
+        assert redact_personal_info(text, MENU) == text
+
+
+def test_redaction_is_stable():
+    once = redact_personal_info("Anh Tuấn, 0987654321, 22 Hai Bà Trưng", MENU)
+    assert redact_personal_info(once, MENU) == once
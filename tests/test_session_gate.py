@@ -0,0 +1,181 @@
+import asyncio
+
+import pytest
+
+from multi_agent.session_gate import SessionGate, SessionQueueFull
+
+
+def test_turns_of_one_session_run_one_at_a_time():
+    async def scenario():
+        gate = SessionGate(max_pending=4)
+        running, peak, order = 0, 0, []
+
+        async def turn(name):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            order.append(name)
+            running -= 1
+            return name
+
+        results = await asyncio.gather(*(gate.run("s1", f"msg {i}", lambda i=i: turn(i)) for i in range(3)))
+        return gate, results, peak, order
+
+    gate, results, peak, order = asyncio.run(scenario())
+    assert results == [0, 1, 2]
+    assert peak == 1
+    assert order == [0, 1, 2]
+    assert gate.serialized == 2
+    assert gate.stats()["pending_turns"] == 0
+
+
+def test_other_sessions_are_not_serialized():
+    async def scenario():
+        gate = SessionGate(max_pending=4)
+        started = []
+
+        async def turn(session_id):
+            started.append(session_id)
+            await asyncio.sleep(0.01)
+            return len(started)
+
+        return await asyncio.gather(gate.run("a", "hi", lambda: turn("a")), gate.run("b", "hi", lambda: turn("b")))
+
+    # Both turns started before either finished.
+    assert asyncio.run(scenario()) == [2, 2]
+
+
+def test_duplicate_message_joins_the_in_flight_turn():
+    async def scenario():
+        gate = SessionGate(max_pending=4)
+        executions = 0
+
+        async def turn():
+            nonlocal executions
+            executions += 1
+            await asyncio.sleep(0.01)
+            return "answer"
+
+        results = await asyncio.gather(gate.run("s1", "cho 2 phở", turn), gate.run("s1", " cho 2 phở ", turn))
+        return gate, results, executions
+
+    gate, results, executions = asyncio.run(scenario())
+    assert results == ["answer", "answer"]
+    assert executions == 1
+    assert gate.stats()["duplicates_coalesced"] == 1
+    assert gate.serialized == 0
+
+
+def test_overflow_is_rejected():
+    async def scenario():
+        gate = SessionGate(max_pending=2)
+        release = asyncio.Event()
+
+        async def turn():
+            await release.wait()
+            return "ok"
+
+        first = asyncio.ensure_future(gate.run("s1", "one", turn))
+        second = asyncio.ensure_future(gate.run("s1", "two", turn))
+        await asyncio.sleep(0)
+        assert gate.is_full("s1")
+        with pytest.raises(SessionQueueFull):
+            await gate.run("s1", "three", turn)
+        release.set()
+        return gate, await asyncio.gather(first, second)
+
+    gate, results = asyncio.run(scenario())
+    assert results == ["ok", "ok"]
+    assert gate.rejected == 1
+    assert not gate.is_full("s1")
+
+
+def test_pending_count_follows_reservations():
+    async def scenario():
+        gate = SessionGate(max_pending=4)
+        release = asyncio.Event()
+        seen = []
+
+        async def turn():
+            seen.append(gate.stats()["pending_turns"])
+            await release.wait()
+
+        tasks = [asyncio.ensure_future(gate.run("s1", f"m{i}", turn)) for i in range(3)]
+        await asyncio.sleep(0)
+        during = gate.stats()
+        release.set()
+        await asyncio.gather(*tasks)
+        return gate, during, seen
+
+    gate, during, seen = asyncio.run(scenario())
+    assert during["pending_turns"] == 3
+    assert during["active_sessions"] == 1
+    assert seen == [3, 2, 1]
+    assert gate.stats()["pending_turns"] == 0
+    assert gate.stats()["active_sessions"] == 0
+    assert gate._locks == {}
+
+
+def test_cancelled_queued_turn_releases_its_reservation():
+    async def scenario():
+        gate = SessionGate(max_pending=2)
+        release = asyncio.Event()
+        ran = []
+
+        async def turn(name):
+            ran.append(name)
+            await release.wait()
+            return name
+
+        first = asyncio.ensure_future(gate.run("s1", "one", lambda: turn("one")))
+        queued = asyncio.ensure_future(gate.run("s1", "two", lambda: turn("two")))
+        await asyncio.sleep(0)
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        await asyncio.sleep(0)
+        after_cancel = gate.stats()["pending_turns"]
+        release.set()
+        await first
+        return gate, after_cancel, ran
+
+    gate, after_cancel, ran = asyncio.run(scenario())
+    assert after_cancel == 1
+    assert ran == ["one"]
+    assert gate.stats()["pending_turns"] == 0
+
+
+def test_turn_cancelled_before_it_starts_does_not_leak():
+    async def scenario():
+        gate = SessionGate(max_pending=1)
+
+        async def turn():
+            return "ok"
+
+        caller = asyncio.ensure_future(gate.run("s1", "one", turn))
+        await asyncio.sleep(0)
+        # The gate's task exists but has not taken its first step yet.
+        flight_task = gate._duplicates._in_flight[("s1", "one")][0]
+        flight_task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        await asyncio.sleep(0)
+        return gate, await gate.run("s1", "two", turn)
+
+    gate, result = asyncio.run(scenario())
+    assert result == "ok"
+    assert gate.stats()["pending_turns"] == 0
+
+
+def test_turn_context_manager_releases_on_error():
+    async def scenario():
+        gate = SessionGate(max_pending=1)
+        with pytest.raises(ValueError):
+            async with gate.turn("s1"):
+                raise ValueError("boom")
+        return gate
+
+    gate = asyncio.run(scenario())
+    assert gate.stats()["pending_turns"] == 0
+    assert not gate.is_full("s1")
@@ -0,0 +1,177 @@
+import asyncio
+
+import pytest
+
+from multi_agent.single_flight import SingleFlight
+
+
+def test_concurrent_callers_share_one_execution():
+    async def scenario():
+        flight = SingleFlight("test")
+        executions = 0
+
+        async def call():
+            nonlocal executions
+            executions += 1
+            await asyncio.sleep(0.01)
+            return "result"
+
+        results = await asyncio.gather(*(flight.do("key", call) for _ in range(3)))
+        return flight, results, executions
+
+    flight, results, executions = asyncio.run(scenario())
+    assert results == [("result", False), ("result", True), ("result", True)]
+    assert executions == 1
+    assert flight.stats() == {
+        "calls": 3,
+        "executions": 1,
+        "coalesced": 2,
+        "cancelled": 0,
+        "coalescing_ratio": round(2 / 3, 4),
+        "in_flight": 0,
+    }
+
+
+def test_finished_call_is_not_reused():
+    async def scenario():
+        flight = SingleFlight("test")
+        counter = iter(range(10))
+
+        async def call():
+            return next(counter)
+
+        return flight, [await flight.do("key", call), await flight.do("key", call)]
+
+    flight, results = asyncio.run(scenario())
+    assert results == [(0, False), (1, False)]
+    assert flight.stats()["executions"] == 2
+    assert flight.stats()["coalesced"] == 0
+
+
+def test_errors_reach_every_waiter():
+    async def scenario():
+        flight = SingleFlight("test")
+
+        async def call():
+            await asyncio.sleep(0.01)
+            raise ValueError("backend down")
+
+        return flight, await asyncio.gather(flight.do("key", call), flight.do("key", call), return_exceptions=True)
+
+    flight, results = asyncio.run(scenario())
+    assert [type(result) for result in results] == [ValueError, ValueError]
+    assert "key" not in flight
+
+
+def test_cancelled_follower_does_not_cancel_the_call():
+    async def scenario():
+        flight = SingleFlight("test")
+        release = asyncio.Event()
+
+        async def call():
+            await release.wait()
+            return "result"
+
+        leader = asyncio.ensure_future(flight.do("key", call))
+        follower = asyncio.ensure_future(flight.do("key", call))
+        await asyncio.sleep(0)
+        follower.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await follower
+        release.set()
+        return flight, await leader
+
+    flight, result = asyncio.run(scenario())
+    assert result == ("result", False)
+    assert flight.stats()["cancelled"] == 0
+
+
+def test_cancelled_leader_is_shielded_while_others_wait():
+    async def scenario():
+        flight = SingleFlight("test")
+        release = asyncio.Event()
+
+        async def call():
+            await release.wait()
+            return "result"
+
+        leader = asyncio.ensure_future(flight.do("key", call))
+        follower = asyncio.ensure_future(flight.do("key", call))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        release.set()
+        return flight, await follower
+
+    flight, result = asyncio.run(scenario())
+    assert result == ("result", True)
+    assert flight.stats()["cancelled"] == 0
+
+
+def test_last_waiter_cancel_stops_the_call():
+    async def scenario():
+        flight = SingleFlight("test")
+        started, stopped = asyncio.Event(), asyncio.Event()
+
+        async def call():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                stopped.set()
+                raise
+
+        first = asyncio.ensure_future(flight.do("key", call))
+        second = asyncio.ensure_future(flight.do("key", call))
+        await started.wait()
+        for waiter in (first, second):
+            waiter.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiter
+        await asyncio.wait_for(stopped.wait(), 1)
+        return flight
+
+    flight = asyncio.run(scenario())
+    assert flight.stats()["cancelled"] == 1
+    assert flight.stats()["in_flight"] == 0
+    assert "key" not in flight
+
+
+def test_new_caller_after_cancel_starts_a_fresh_call():
+    async def scenario():
+        flight = SingleFlight("test")
+        executions = 0
+
+        async def call():
+            nonlocal executions
+            executions += 1
+            await asyncio.sleep(0.01)
+            return executions
+
+        cancelled = asyncio.ensure_future(flight.do("key", call))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        return await flight.do("key", call)
+
+    assert asyncio.run(scenario()) == (2, False)
+
+
+def test_on_done_runs_once_for_the_caller_that_started_the_call():
+    async def scenario():
+        flight = SingleFlight("test")
+        done = []
+
+        async def call():
+            await asyncio.sleep(0.01)
+            return "result"
+
+        await asyncio.gather(
+            flight.do("key", call, on_done=lambda: done.append("leader")),
+            flight.do("key", call, on_done=lambda: done.append("follower")),
+        )
+        return done
+
+    assert asyncio.run(scenario()) == ["leader"]
@@ -0,0 +1,155 @@
+from dataclasses import replace
+
+import pytest
+
+from multi_agent.business_context import EMPTY_CONTEXT, get_business_context, set_business_context
+from multi_agent.tool_dispatch import (
+    planned_order_id,
+    plan_tool_calls,
+    resolve_order_id,
+    stored_order_id,
+)
+
+MENU = ((1, "Cơm Tấm", 50000.0), (2, "Phở", 45000.0), (3, "Bún Bò", 40000.0))
+TOOLS = dict.fromkeys([
+    "list_menu", "create_draft_order", "add_item_to_order", "get_order", "estimate_delivery_fee",
+    "get_order_history", "cancel_order", "confirm_order", "list_faqs",
+])
+
+
+@pytest.fixture(autouse=True)
+def menu_context():
+    previous = get_business_context()
+    set_business_context(replace(EMPTY_CONTEXT, version="test", menu=MENU))
+    yield
+    set_business_context(previous)
+
+
+def calls(action, **state):
+    planned = plan_tool_calls(action, state, TOOLS)
+    return None if planned is None else [(call["name"], call["args"]) for call in planned]
+
+
+# ---- resolve_order_id ----
+
+
+@pytest.mark.parametrize("plan,expected", [
+    ("Gọi add_item với order_id: 12, item_id 1", 12),
+    ("Hủy đơn số 5 cho khách", 5),
+    ("Cancel order #31", 31),
+    ("Hủy đơn hàng #8", 8),
+    ("Thêm 2 Phở vào đơn", None),
+])
+def test_planned_order_id(plan, expected):
+    assert planned_order_id({"planner_plan": plan}) == expected
+
+
+def test_stored_order_id_reads_earlier_tool_outputs():
+    assert stored_order_id({"task_outputs": {"create_order": {"order_id": 4, "status": "DRAFT"}}}) == 4
+    assert stored_order_id({"task_outputs": {"add_item": {"order_id": 6}}}) == 6
+    assert stored_order_id({"task_outputs": {"check_order": {"orders": [{"id": 9, "status": "PENDING"}]}}}) == 9
+    # Several recent orders: no single answer.
+    assert stored_order_id({"task_outputs": {"check_order": {"orders": [{"id": 9}, {"id": 8}]}}}) is None
+    assert stored_order_id({}) is None
+
+
+def test_planned_order_id_wins_over_stored_outputs():
+    state = {"planner_plan": "Hủy đơn số 3", "task_outputs": {"create_order": {"order_id": 7}}}
+    assert resolve_order_id(state) == 3
+    assert resolve_order_id({"task_outputs": {"create_order": {"order_id": 7}}}) == 7
+
+
+# ---- dispatchers ----
+
+
+def test_search_menu_uses_the_dish_named_in_the_plan():
+    assert calls("search_menu", planner_plan="Tra giá Phở", user_input="món nước bao nhiêu?") == [
+        ("list_menu", {"q": "Phở"}),
+    ]
+
+
+def test_search_menu_falls_back_to_the_user_input_and_lists_several_dishes():
+    assert calls("search_menu", planner_plan="tra giá", user_input="Cơm tấm giá sao?") == [("list_menu", {"q": "Cơm Tấm"})]
+    assert calls("search_menu", user_input="Phở và Bún Bò giá sao?") == [("list_menu", {})]
+
+
+def test_search_menu_without_a_dish_needs_the_llm():
+    assert calls("search_menu", user_input="có món gì ngon?") is None
+    assert calls("search_menu", user_input="pizza bao nhiêu?", intent_fast_path=True) is None
+
+
+def test_search_menu_resolves_missing_cart_ids():
+    one = [{"item_name": "Phở", "quantity": 1}, {"item_name": "Cơm Tấm", "item_id": 1, "quantity": 2}]
+    assert calls("search_menu", cart=one) == [("list_menu", {"q": "Phở"})]
+    two = [{"item_name": "Phở", "quantity": 1}, {"item_name": "Bún Bò", "quantity": 1}]
+    assert calls("search_menu", cart=two) == [("list_menu", {})]
+
+
+def test_create_order_needs_an_address():
+    assert calls("create_order", user_info={"address": "12 Lê Duẩn"}) == [
+        ("create_draft_order", {"address": "12 Lê Duẩn"}),
+    ]
+    assert calls("create_order", user_info={"phone": "0901234567"}) is None
+
+
+def test_add_item_adds_every_cart_line_to_the_resolved_order():
+    state = {
+        "cart": [{"item_name": "Cơm Tấm", "item_id": 1, "quantity": 2}, {"item_name": "Phở", "item_id": 2}],
+        "task_outputs": {"create_order": {"order_id": 7}},
+    }
+    assert calls("add_item", **state) == [
+        ("add_item_to_order", {"order_id": 7, "item_id": 1, "quantity": 2}),
+        ("add_item_to_order", {"order_id": 7, "item_id": 2, "quantity": 1}),
+    ]
+    assert calls("add_item", **state, planner_plan="add_item vào order_id 9")[0][1]["order_id"] == 9
+
+
+def test_add_item_is_skipped_when_items_were_already_added():
+    state = {
+        "cart": [{"item_name": "Phở", "item_id": 2, "quantity": 1}],
+        "task_outputs": {"create_order": {"order_id": 7}, "add_item": {"success": True, "order_id": 7}},
+    }
+    assert calls("add_item", **state) is None
+
+
+def test_add_item_needs_ids_and_an_order():
+    assert calls("add_item", cart=[{"item_name": "Phở"}], task_outputs={"create_order": {"order_id": 7}}) is None
+    assert calls("add_item", cart=[{"item_name": "Phở", "item_id": 2}]) is None
+    assert calls("add_item", task_outputs={"create_order": {"order_id": 7}}) is None
+
+
+def test_calculate_total_and_check_order():
+    assert calls("calculate_total", task_outputs={"create_order": {"order_id": 7}}) == [
+        ("get_order", {"order_id": 7}), ("estimate_delivery_fee", {"order_id": 7}),
+    ]
+    assert calls("calculate_total") is None
+    assert calls("check_order") == [("get_order_history", {"limit": 5})]
+    assert calls("check_order", planner_plan="Kiểm tra đơn số 4") == [("get_order", {"order_id": 4})]
+
+
+@pytest.mark.parametrize("action", ["cancel_order", "confirm_order"])
+def test_order_transition_uses_the_planned_or_stored_id(action):
+    assert calls(action, planner_plan=f"{action} order #5") == [(action, {"order_id": 5})]
+    assert calls(action, task_outputs={"create_order": {"order_id": 7}}) == [(action, {"order_id": 7})]
+    assert calls(action, planner_plan="order #7", task_outputs={"create_order": {"order_id": 7}}) == [
+        (action, {"order_id": 7}),
+    ]
+    assert calls(action) is None
+
+
+@pytest.mark.parametrize("action", ["cancel_order", "confirm_order"])
+def test_order_transition_falls_back_to_the_llm_when_ids_disagree(action):
+    state = {"planner_plan": "Hủy đơn số 3", "task_outputs": {"create_order": {"order_id": 7}}}
+    assert calls(action, **state) is None
+
+
+def test_unknown_actions_and_missing_tools_fall_back():
+    assert calls("remove_item", cart=[{"item_name": "Phở", "item_id": 2}]) is None
+    assert plan_tool_calls("ask_faq", {}, {"list_menu": None}) is None
+    assert calls("ask_faq") == [("list_faqs", {})]
+
+
+def test_direct_calls_carry_tool_call_ids():
+    planned = plan_tool_calls("ask_faq", {}, TOOLS)
+    assert planned[0]["type"] == "tool_call"
+    assert planned[0]["id"].startswith("direct_")
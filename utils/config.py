@@ -9,16 +9,105 @@ MODEL_NAME = os.getenv("MODEL_NAME", "gpt-oss:20b")
 MCP_SERVER_ID = os.getenv("MCP_SERVER_ID", "sandbox")
 MCP_SERVER_URL = os.getenv("MCP_SERVER_URL", "http://mcp-backend:8000/mcp")
 
+# Shared LLM HTTP connection pool
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "64"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "32"))
+LLM_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("LLM_KEEPALIVE_EXPIRY_SECONDS", "60.0"))
+LLM_CONNECT_TIMEOUT_SECONDS = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "5.0"))
+LLM_READ_TIMEOUT_SECONDS = float(os.getenv("LLM_READ_TIMEOUT_SECONDS", "300.0"))
+
+# LLM admission control: keep concurrency at the inference server's parallel slots (OLLAMA_NUM_PARALLEL)
+LLM_SCHEDULER_MAX_CONCURRENCY = int(os.getenv("LLM_SCHEDULER_MAX_CONCURRENCY", "4"))
+LLM_SCHEDULER_MAX_QUEUE = int(os.getenv("LLM_SCHEDULER_MAX_QUEUE", "64"))
+LLM_QUEUE_BUDGET_CHECKOUT_SECONDS = float(os.getenv("LLM_QUEUE_BUDGET_CHECKOUT_SECONDS", "30"))
+LLM_QUEUE_BUDGET_DEFAULT_SECONDS = float(os.getenv("LLM_QUEUE_BUDGET_DEFAULT_SECONDS", "20"))
+LLM_QUEUE_BUDGET_BROWSE_SECONDS = float(os.getenv("LLM_QUEUE_BUDGET_BROWSE_SECONDS", "10"))
+
+# Exact-match LLM call cache: "off", "on" (memory LRU + optional SQLite file) or "replay" (read only, misses fail)
+LLM_CACHE_MODE = os.getenv("LLM_CACHE_MODE", "off").lower()
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2048"))
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "")
+
+# Load-testing stand-in for the inference server (python -m multi_agent.llm_standin)
+LLM_STANDIN_PORT = int(os.getenv("LLM_STANDIN_PORT", "11434"))
+LLM_STANDIN_SLOTS = int(os.getenv("LLM_STANDIN_SLOTS", "4"))
+LLM_STANDIN_MAX_QUEUE = int(os.getenv("LLM_STANDIN_MAX_QUEUE", "512"))
+LLM_STANDIN_TTFT_MS = float(os.getenv("LLM_STANDIN_TTFT_MS", "300"))
+LLM_STANDIN_PREFILL_TOKENS_PER_SECOND = float(os.getenv("LLM_STANDIN_PREFILL_TOKENS_PER_SECOND", "0"))
+LLM_STANDIN_TOKENS_PER_SECOND = float(os.getenv("LLM_STANDIN_TOKENS_PER_SECOND", "40"))
+LLM_STANDIN_REPLY_TOKENS = int(os.getenv("LLM_STANDIN_REPLY_TOKENS", "60"))
+LLM_STANDIN_RULES_PATH = os.getenv("LLM_STANDIN_RULES_PATH", "")
+
 # Orchestrator limits
 MAX_ITERATIONS = int(os.getenv("MAX_ITERATIONS", "20"))
 MAX_TOTAL_TOOL_CALLS = int(os.getenv("MAX_TOTAL_TOOL_CALLS", "32"))
+# Wall-clock budget per turn (0 disables); synthesis always gets at least the grace period
+TURN_DEADLINE_SECONDS = float(os.getenv("TURN_DEADLINE_SECONDS", "90"))
+TURN_SYNTHESIS_GRACE_SECONDS = float(os.getenv("TURN_SYNTHESIS_GRACE_SECONDS", "20"))
+DISCONNECT_POLL_SECONDS = float(os.getenv("DISCONNECT_POLL_SECONDS", "0.5"))
 TOOL_TIMEOUT_SECONDS = float(os.getenv("TOOL_TIMEOUT_SECONDS", "15.0"))
 TOOL_MAX_RETRIES = int(os.getenv("TOOL_MAX_RETRIES", "2"))
+TOOL_MAX_CONCURRENCY = int(os.getenv("TOOL_MAX_CONCURRENCY", "4"))
+
+# Share one in-flight call between identical concurrent requests
+TOOL_COALESCE_ENABLED = os.getenv("TOOL_COALESCE_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_COALESCE_ENABLED = os.getenv("LLM_COALESCE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Token budgets for task memory injected into planner/synthesis prompts
+PLANNER_CONTEXT_TOKEN_BUDGET = int(os.getenv("PLANNER_CONTEXT_TOKEN_BUDGET", "600"))
+SYNTHESIS_CONTEXT_TOKEN_BUDGET = int(os.getenv("SYNTHESIS_CONTEXT_TOKEN_BUDGET", "800"))
+
+# How often the menu-based prompt prefix is re-checked (and re-warmed if it changed)
+BUSINESS_CONTEXT_REFRESH_SECONDS = float(os.getenv("BUSINESS_CONTEXT_REFRESH_SECONDS", "300"))
+
+# Intent short-circuit in front of the orchestrator
+INTENT_MODEL_PATH = os.getenv("INTENT_MODEL_PATH", "multi_agent/data/intent_model.npz")
+INTENT_SEED_PATH = os.getenv("INTENT_SEED_PATH", "multi_agent/data/intent_seed.jsonl")
+INTENT_CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.9"))
+
+# Return a per-turn `Server-Timing` breakdown on every /v1/chat response
+# (otherwise only when the request sends `X-Debug-Timing: 1`)
+TIMING_HEADER_ENABLED = os.getenv("TIMING_HEADER_ENABLED", "false").lower() in ("1", "true", "yes")
+
+# Final-answer cache for stateless FAQ / price / out-of-scope turns
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1024"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+
+# Opt-in capture of anonymized /v1/chat turns (JSONL) for multi_agent.replay; empty path disables it
+TURN_CAPTURE_PATH = os.getenv("TURN_CAPTURE_PATH", "")
+TURN_CAPTURE_SAMPLE_RATE = float(os.getenv("TURN_CAPTURE_SAMPLE_RATE", "1.0"))
+TURN_CAPTURE_SALT = os.getenv("TURN_CAPTURE_SALT", "")
+
+# Conversation history retention for AgentState.messages
+HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", "3"))
+HISTORY_SUMMARY_ENABLED = os.getenv("HISTORY_SUMMARY_ENABLED", "true").lower() in ("1", "true", "yes")
+HISTORY_SUMMARY_MAX_CHARS = int(os.getenv("HISTORY_SUMMARY_MAX_CHARS", "600"))
+
+# AgentLogger: structured trace records go through a background thread; rich
+# panels are rendered only with AGENT_LOG_RICH=true and AGENT_LOG_LEVEL=DEBUG
+AGENT_LOG_LEVEL = os.getenv("AGENT_LOG_LEVEL", "INFO").upper()
+AGENT_LOG_RICH = os.getenv("AGENT_LOG_RICH", "false").lower() in ("1", "true", "yes")
+AGENT_LOG_MAX_CHARS = int(os.getenv("AGENT_LOG_MAX_CHARS", "2000"))
 
 # Redis configuration for multi-turn conversation caching
 REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
 REDIS_PREFIX = os.getenv("REDIS_PREFIX", "mcp_ollama:")
 
+# LangGraph checkpointer: "memory" (bounded, single process), "memory_unbounded" or "redis" (shared across workers)
+CHECKPOINTER_BACKEND = os.getenv("CHECKPOINTER_BACKEND", "memory").lower()
+REDIS_CHECKPOINT_TTL_SECONDS = int(os.getenv("REDIS_CHECKPOINT_TTL_SECONDS", "86400"))
+REDIS_CHECKPOINT_KEEP = int(os.getenv("REDIS_CHECKPOINT_KEEP", "3"))
+REDIS_CHECKPOINT_COMPRESS_MIN_BYTES = int(os.getenv("REDIS_CHECKPOINT_COMPRESS_MIN_BYTES", "1024"))
+
+# Bounded in-memory session store
+SESSION_MAX_CHECKPOINTS = int(os.getenv("SESSION_MAX_CHECKPOINTS", "3"))
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "3600"))
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Turns allowed per session at once (running + queued); further requests get 429
+SESSION_MAX_PENDING_TURNS = int(os.getenv("SESSION_MAX_PENDING_TURNS", "3"))
+
 
 
 SYSTEM_PROMPT = os.getenv(